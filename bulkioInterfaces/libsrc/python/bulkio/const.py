@@ -27,4 +27,19 @@ NON_BLOCKING=0.0
 # Constants for getPacket API calls for input Ports
 BLOCKING=-1.0
 
+# Queue policies for output port fan-out, used when a connection's queue is
+# full
+FANOUT_BLOCK='block'
+FANOUT_DROP_OLDEST='drop-oldest'
+FANOUT_DROP_NEWEST='drop-newest'
 
+# Scheduling modes for selecting the current stream on input ports
+SCHEDULE_FIFO='fifo'
+SCHEDULE_ROUND_ROBIN='round-robin'
+
+# Overflow policies for input port queues, used when the queue is full and
+# blocking is not on
+FLUSH_ALL='flush-all'
+FLUSH_DROP_OLDEST='drop-oldest'
+FLUSH_DROP_NEWEST='drop-newest'
+FLUSH_KEEP_EVERY='keep-every'
@@ -18,19 +18,36 @@
 # along with this program.  If not, see http://www.gnu.org/licenses/.
 #
 
-import itertools
+try:
+    import numpy
+except ImportError:
+    numpy = None
 
 import bulkio.sri
 
 def _get_drift(begin, end, xdelta):
     real = end.time - begin.time
-    expected = (end.offset - begin.offset) * self._sri.xdelta
+    expected = (end.offset - begin.offset) * xdelta
     return real - expected
 
 def _interleaved_to_complex(values):
-    real = itertools.islice(values, 0, len(values), 2)
-    imag = itertools.islice(values, 1, len(values), 2)
-    return [complex(re,im) for re, im in zip(real, imag)]
+    # Ignore a trailing real value, if any, so that the real and imaginary
+    # parts always pair up
+    size = len(values) & ~1
+    if numpy is not None and isinstance(values, numpy.ndarray):
+        values = values[:size]
+        if values.dtype == numpy.float32:
+            # Reinterpret pairs of floats as complex values without copying
+            return values.view(numpy.complex64)
+        elif values.dtype == numpy.float64:
+            return values.view(numpy.complex128)
+        # Integer types have no complex equivalent; group the values into
+        # (real, imag) rows and convert them to double in a single pass, which
+        # can then be reinterpreted as complex
+        pairs = values.reshape(-1, 2).astype(numpy.float64)
+        return pairs.view(numpy.complex128).reshape(-1)
+    # Extended slices and map() both run in C, avoiding a Python-level loop
+    return map(complex, values[0:size:2], values[1:size:2])
 
 class SampleTimestamp(object):
     """
@@ -81,17 +98,23 @@ class DataBlock(object):
     While it is possible to create DataBlocks in user code, they are usually
     obtained by reading from an input stream.
 
+    Values derived from the time stamps, such as the time drift, are computed
+    on first use and cached until another time stamp is added.
+
     See Also:
         InputStream.read()
         InputStream.tryread()
     """
-    __slots__ = ('_sri', '_data', '_sriChangeFlags', '_inputQueueFlushed', '_timestamps')
+    __slots__ = ('_sri', '_data', '_sriChangeFlags', '_inputQueueFlushed', '_timestamps',
+                 '_netTimeDrift', '_maxTimeDrift')
     def __init__(self, sri, data, sriChangeFlags, inputQueueFlushed):
         self._sri = sri
         self._data = data
         self._timestamps = []
         self._sriChangeFlags = sriChangeFlags
         self._inputQueueFlushed = inputQueueFlushed
+        self._netTimeDrift = None
+        self._maxTimeDrift = None
 
     @property
     def sri(self):
@@ -187,6 +210,9 @@ class DataBlock(object):
 
     def addTimestamp(self, timestamp, offset=0, synthetic=False):
         self._timestamps.append(SampleTimestamp(timestamp, offset, synthetic))
+        # Invalidate the cached time drift values
+        self._netTimeDrift = None
+        self._maxTimeDrift = None
 
     def getTimestamps(self):
         """
@@ -228,8 +254,10 @@ class DataBlock(object):
         Returns:
             float: Difference, in seconds, between expected and actual value.
         """
-        self._validateTimestamps()
-        return _get_drift(self._timestamps[0], self._timestamps[-1], self.xdelta)
+        if self._netTimeDrift is None:
+            self._validateTimestamps()
+            self._netTimeDrift = _get_drift(self._timestamps[0], self._timestamps[-1], self.xdelta)
+        return self._netTimeDrift
 
     def getMaxTimeDrift(self):
         """
@@ -250,13 +278,16 @@ class DataBlock(object):
         Returns:
             float: Difference, in seconds, between expected and actual value.
         """
-        self._validateTimestamps()
-        max_drift = 0.0
-        for index in xrange(1, len(self._timestamps)):
-            drift = _get_drift(self._timestamps[index-1], self._timestamps[index], self.xdelta)
-            if abs(drift) > abs(max):
-                max_drift = drift
-        return max_drift
+        if self._maxTimeDrift is None:
+            self._validateTimestamps()
+            xdelta = self.xdelta
+            max_drift = 0.0
+            for index in xrange(1, len(self._timestamps)):
+                drift = _get_drift(self._timestamps[index-1], self._timestamps[index], xdelta)
+                if abs(drift) > abs(max_drift):
+                    max_drift = drift
+            self._maxTimeDrift = max_drift
+        return self._maxTimeDrift
 
     def _validateTimestamps(self):
         if not self._timestamps:
@@ -287,7 +318,16 @@ class SampleDataBlock(DataBlock):
         else:
             for value in block.data:
                 ...
+
+    The complex view of the data is created on first access to cxdata and
+    cached. If the data is a list, the cached complex values are a copy, so
+    changes made to the list afterwards are not reflected in cxdata.
     """
+    __slots__ = ('_cxdata',)
+    def __init__(self, sri, data, sriChangeFlags, inputQueueFlushed):
+        DataBlock.__init__(self, sri, data, sriChangeFlags, inputQueueFlushed)
+        self._cxdata = None
+
     @property
     def data(self):
         """
@@ -297,6 +337,9 @@ class SampleDataBlock(DataBlock):
         return int or long values, while floating point types return float
         values.
 
+        If numpy is enabled on the input port, the data is a numpy array of
+        the port's native type.
+
         To intepret the data as complex samples, use cxdata.
         """
         return self._data
@@ -325,9 +368,15 @@ class SampleDataBlock(DataBlock):
         """
         list(complex): Sample data interpreted as Python complex values.
 
+        If numpy is enabled on the input port, the data is a numpy array. For
+        float and double data, the array is a complex-typed view of the real
+        data, and no copy is made.
+
         To interpret the data as real samples, use data.
         """
-        return _interleaved_to_complex(self.data)
+        if self._cxdata is None:
+            self._cxdata = _interleaved_to_complex(self._data)
+        return self._cxdata
 
     @property
     def cxsize(self):
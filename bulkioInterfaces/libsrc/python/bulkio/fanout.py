@@ -0,0 +1,217 @@
+#
+# This file is protected by Copyright. Please refer to the COPYRIGHT file
+# distributed with this source distribution.
+#
+# This file is part of REDHAWK bulkioInterfaces.
+#
+# REDHAWK bulkioInterfaces is free software: you can redistribute it and/or modify it under
+# the terms of the GNU Lesser General Public License as published by the Free
+# Software Foundation, either version 3 of the License, or (at your option) any
+# later version.
+#
+# REDHAWK bulkioInterfaces is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE.  See the GNU Lesser General Public License for more
+# details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this program.  If not, see http://www.gnu.org/licenses/.
+#
+
+import threading
+import collections
+
+from bulkio.const import FANOUT_DROP_OLDEST, FANOUT_DROP_NEWEST
+
+class _ConnectionQueue(object):
+    def __init__(self, connectionId, policy, depth):
+        self.connectionId = connectionId
+        self.policy = policy
+        self.depth = depth
+        self.items = collections.deque()
+        # True while the queue is scheduled or being serviced by a worker;
+        # ensures that each connection's items are sent in order
+        self.active = False
+        self.dropped = 0
+
+    def full(self):
+        return self.depth >= 0 and len(self.items) >= self.depth
+
+    def dropOldest(self):
+        for index, item in enumerate(self.items):
+            if item[2]:
+                del self.items[index]
+                return True
+        return False
+
+
+class FanoutDispatcher(object):
+    """
+    Bounded pool of worker threads that services per-connection queues on
+    behalf of an output port.
+
+    Each connection has its own queue of calls, which are executed in order
+    by at most one worker at a time; connections with pending calls are
+    serviced round-robin, so that a slow connection delays only its own
+    queue. When a queue is full, the connection's policy determines whether
+    the producer blocks or a call is discarded. Only calls enqueued as
+    droppable (i.e., data packets other than end-of-stream) are ever
+    discarded.
+    """
+    def __init__(self, threads, logger=None):
+        self._log = logger
+        self._lock = threading.Lock()
+        self._workAvailable = threading.Condition(self._lock)
+        self._spaceAvailable = threading.Condition(self._lock)
+        self._idle = threading.Condition(self._lock)
+        self._queues = {}
+        self._ready = collections.deque()
+        self._running = True
+        self._threads = []
+        for index in xrange(max(threads, 1)):
+            thread = threading.Thread(target=self._run)
+            thread.setDaemon(True)
+            thread.start()
+            self._threads.append(thread)
+
+    def addConnection(self, connectionId, policy, depth):
+        with self._lock:
+            queue = self._queues.get(connectionId, None)
+            if queue is None:
+                self._queues[connectionId] = _ConnectionQueue(connectionId, policy, depth)
+            else:
+                queue.policy = policy
+                queue.depth = depth
+                # A larger depth may unblock waiting producers
+                self._spaceAvailable.notifyAll()
+
+    def removeConnection(self, connectionId):
+        """
+        Waits for all calls queued for `connectionId` to complete, then
+        removes its queue.
+        """
+        with self._lock:
+            queue = self._queues.get(connectionId, None)
+            if queue is None:
+                return
+            self._waitIdle(queue)
+            del self._queues[connectionId]
+            self._spaceAvailable.notifyAll()
+
+    def enqueue(self, connectionId, droppable, func, *args):
+        """
+        Queues a call to `func` with `args` for the given connection.
+
+        Returns:
+            True if the call was queued.
+            False if it was discarded due to the connection's policy.
+        """
+        with self._lock:
+            queue = self._queues.get(connectionId, None)
+            if queue is None:
+                return False
+            if droppable and queue.full():
+                if queue.policy == FANOUT_DROP_NEWEST:
+                    queue.dropped += 1
+                    return False
+                elif queue.policy == FANOUT_DROP_OLDEST:
+                    # If only non-droppable calls (SRI and end-of-stream)
+                    # are queued, discard this one instead, so the queue does
+                    # not grow beyond its depth
+                    queue.dropped += 1
+                    if not queue.dropOldest():
+                        return False
+                else:
+                    while self._running and queue.full() and self._queues.get(connectionId) is queue:
+                        self._spaceAvailable.wait()
+                    if self._queues.get(connectionId) is not queue:
+                        # Connection was removed while waiting
+                        return False
+            queue.items.append((func, args, droppable))
+            if not queue.active:
+                queue.active = True
+                self._ready.append(queue)
+                self._workAvailable.notify()
+            return True
+
+    def pending(self, connectionId):
+        """
+        Returns the number of calls waiting in the queue for `connectionId`.
+        """
+        queue = self._queues.get(connectionId, None)
+        if queue is None:
+            return 0
+        return len(queue.items)
+
+    def full(self, connectionId):
+        """
+        Returns True if the queue for `connectionId` is at its maximum depth.
+        """
+        queue = self._queues.get(connectionId, None)
+        if queue is None:
+            return False
+        return queue.full()
+
+    def dropped(self, connectionId):
+        """
+        Returns the number of calls discarded for `connectionId`.
+        """
+        queue = self._queues.get(connectionId, None)
+        if queue is None:
+            return 0
+        return queue.dropped
+
+    def flush(self):
+        """
+        Waits for all queued calls to complete.
+        """
+        with self._lock:
+            for queue in self._queues.values():
+                self._waitIdle(queue)
+
+    def stop(self):
+        """
+        Waits for all queued calls to complete, then terminates the worker
+        threads.
+        """
+        self.flush()
+        with self._lock:
+            self._running = False
+            self._workAvailable.notifyAll()
+            self._spaceAvailable.notifyAll()
+        for thread in self._threads:
+            if thread is not threading.currentThread():
+                thread.join()
+        self._threads = []
+
+    def _waitIdle(self, queue):
+        # Prerequisite: caller holds self._lock
+        while queue.active:
+            self._idle.wait()
+
+    def _run(self):
+        while True:
+            with self._lock:
+                while self._running and not self._ready:
+                    self._workAvailable.wait()
+                if not self._ready:
+                    return
+                queue = self._ready.popleft()
+                func, args, droppable = queue.items.popleft()
+                self._spaceAvailable.notifyAll()
+
+            try:
+                func(*args)
+            except Exception, e:
+                if self._log:
+                    self._log.exception("Fan-out call for connection %s failed: %s", queue.connectionId, e)
+
+            with self._lock:
+                if queue.items:
+                    # Go to the back of the line to give other connections a
+                    # turn
+                    self._ready.append(queue)
+                    self._workAvailable.notify()
+                else:
+                    queue.active = False
+                    self._idle.notifyAll()
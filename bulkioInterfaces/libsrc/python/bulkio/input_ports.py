@@ -23,10 +23,17 @@ import threading
 import collections
 import copy
 import time
-import struct
+import array
+import socket
+import uuid
 
-from ossie.utils import uuid
-from ossie.cf import CF
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+from ossie.cf import CF, ExtendedCF
+from ossie import properties
 from ossie.utils.notify import notification
 from ossie.utils.log4py import logging
 from redhawk.bitbuffer import bitbuffer
@@ -35,9 +42,22 @@ from bulkio.statistics import InStats
 import bulkio.sri
 import bulkio.timestamp
 from bulkio.const import BLOCKING, NON_BLOCKING
+from bulkio.const import SCHEDULE_FIFO, SCHEDULE_ROUND_ROBIN
+from bulkio.const import FLUSH_ALL, FLUSH_DROP_OLDEST, FLUSH_DROP_NEWEST, FLUSH_KEEP_EVERY
 from bulkio.input_streams import InputStream, BufferedInputStream
 from bulkio.datablock import DataBlock
 from bulkio.bulkioInterfaces import BULKIO, BULKIO__POA
+from bulkio import transport
+
+try:
+    from bulkio.bulkioInterfaces.BULKIO__POA import internal as _internal__POA
+except ImportError:
+    _internal__POA = None
+
+def _providesSkeleton(name):
+    # Use the extended skeleton, which adds transport negotiation, if it is
+    # available
+    return getattr(_internal__POA, name+'Ext', None) or getattr(BULKIO__POA, name)
 
 class InPort(object):
     DATA_BUFFER=0
@@ -69,7 +89,6 @@ class InPort(object):
     def __init__(self, name, bits, logger, sriCompare, newSriCallback, sriChangeCallback,  maxsize):
         self.name = name
         self._portLog = logger
-        self.queue = collections.deque()
         self._maxSize = maxsize
         self._breakBlock = False
         self.stats = InStats(name, bits=bits)
@@ -77,16 +96,63 @@ class InPort(object):
         self.sri_cmp = sriCompare
         self.newSriCallback = newSriCallback
         self.sriChangeCallback = sriChangeCallback
-        self.sriDict = {} # key=streamID, value=StreamSRI
-
+        self.sriDict = {} # key=streamID, value=(StreamSRI, sriChanged)
+        # Fingerprint of the SRI last stored for each stream, used instead of
+        # sriCompare when it is the default comparison (key=streamID,
+        # value=(StreamSRI, fingerprint))
+        self._sriFingerprints = {}
+
+        # Protects the packet queue and the SRI map, so that a packet can be
+        # queued with a single lock acquisition
         self._dataBufferLock = threading.Lock()
         self._dataAvailable = threading.Condition(self._dataBufferLock)
         self._queueAvailable = threading.Condition(self._dataBufferLock)
 
+        # Number of threads waiting on each condition; notifications are only
+        # sent when there is a waiter to receive them
+        self._dataWaiters = 0
+        self._queueWaiters = 0
+
         # Backwards-compatibility
         self.port_lock = self._dataBufferLock
 
-        # Synchronizes access to the SRIs
+        # Queued packets are held in a separate queue for each stream ID. The
+        # order in which packets were received across all streams is kept as
+        # a queue of stream IDs, one per packet; when a packet is taken from
+        # the front of a stream's queue, its entry is skipped later instead of
+        # being searched for.
+        self._streamQueues = {} # key=streamID, value=deque of Packet
+        self._queueOrder = collections.deque()
+        self._skippedOrder = {} # key=streamID, value=number of entries to skip
+        self._queueSize = 0
+
+        # Per-stream queue depth; if None, the port-wide depth applies
+        self._streamQueueDepth = None
+
+        # Policy for a full queue when not blocking, with its packet count;
+        # streams that lost packets to a partial flush have their next queued
+        # packet flagged
+        self._flushPolicy = FLUSH_ALL
+        self._flushCount = 0
+        self._droppedStreams = set()
+
+        # Flow control: once the queue reaches the high watermark, the port is
+        # congested until it drains to the low watermark (disabled if None)
+        self._highWatermark = None
+        self._lowWatermark = None
+        self._congested = False
+
+        # Stream selection for getCurrentStream(); under round-robin, streams
+        # with queued packets take turns in the order given by _scheduleOrder
+        self._scheduling = SCHEDULE_FIFO
+        self._streamWeights = {}
+        self._scheduleOrder = collections.deque()
+        self._scheduled = set()
+        self._currentStreamID = None
+        self._currentTurns = 0
+
+        # Serializes SRI updates and calls to the SRI callbacks; if both locks
+        # are needed, this one must be acquired first
         self._sriUpdateLock = threading.Lock()
 
         # Streams that are currently active (map of streamID to stream objects)
@@ -100,6 +166,7 @@ class InPort(object):
 
         if self._portLog is None:
             self._portLog = logging.getLogger("redhawk.bulkio.input."+name)
+        self.refreshLogLevel()
 
         _cmpMsg  = "DEFAULT"
         _newSriMsg  = "EMPTY"
@@ -126,6 +193,39 @@ class InPort(object):
         """
         pass
 
+    @notification
+    def congestionChanged(self, congested):
+        """
+        The queue crossed a watermark.
+
+        Args:
+            congested: True if the queue reached the high watermark, False if
+                       it drained to the low watermark.
+        """
+        pass
+
+    def addCongestionListener(self, callback):
+        """
+        Registers a callback for changes in congestion (see setWatermarks()).
+
+        The callback is called with one argument, True when the queue reaches
+        the high watermark and False when it drains to the low watermark. It
+        is called without any port locks held.
+
+        Args:
+            callback: Callable object that takes one argument.
+        """
+        self.congestionChanged.addListener(callback)
+
+    def removeCongestionListener(self, callback):
+        """
+        Unregisters a callback for changes in congestion.
+
+        Args:
+            callback: Previous registered callable object.
+        """
+        self.congestionChanged.removeListener(callback)
+
     def addStreamListener(self, callback):
         """
         Registers a callback for new streams.
@@ -160,30 +260,67 @@ class InPort(object):
 
     def setLogger(self, logger):
         self._portLog = logger
+        self.refreshLogLevel()
+
+    def refreshLogLevel(self):
+        """
+        Updates the port's cached logging state.
+
+        To avoid the cost of formatting messages for every packet, the port
+        checks whether its logger is enabled for TRACE messages only when the
+        logger or log level changes. Resources call this method after changing
+        log levels via setLogLevel(); it must be called explicitly if the
+        level of the port's logger is changed by other means.
+        """
+        self._traceEnabled = bool(self._portLog) and self._portLog.isEnabledFor(logging.TRACE)
 
     def enableStats(self, enabled):
         self.stats.setEnabled(enabled)
 
+    def setStatsWindow(self, window):
+        """
+        Sets the number of recent packets used to compute the port statistics.
+        """
+        with self._dataBufferLock:
+            self.stats.setHistoryWindow(window)
+
+    def setStatsSampling(self, count):
+        """
+        Records statistics for only every count-th packet, to reduce overhead
+        at high packet rates. Data rates still account for every packet.
+        """
+        with self._dataBufferLock:
+            self.stats.setSampling(count)
+
     def _get_statistics(self):
         with self._dataBufferLock:
             return self.stats.retrieve()
 
+    @property
+    def queue(self):
+        # Backwards-compatibility: a snapshot of the queued packets, in the
+        # order they were received
+        with self._dataBufferLock:
+            return collections.deque(self._queuedPackets())
+
     def _get_state(self):
+        # A congested port reports BUSY so that remote producers can apply
+        # flow control
         with self._dataBufferLock:
-            if len(self.queue) == 0:
+            if self._queueSize == 0:
                 return BULKIO.IDLE
-            elif len(self.queue) == self._maxSize:
+            elif self._queueSize == self._maxSize or self._congested:
                 return BULKIO.BUSY
             else:
                 return BULKIO.ACTIVE
 
     def _get_activeSRIs(self):
-        with self._sriUpdateLock:
+        with self._dataBufferLock:
             return [self.sriDict[entry][0] for entry in self.sriDict]
 
     def getCurrentQueueDepth(self):
         with self._dataBufferLock:
-            return len(self.queue)
+            return self._queueSize
 
     def getMaxQueueDepth(self):
         with self._dataBufferLock:
@@ -194,6 +331,212 @@ class InPort(object):
         with self._dataBufferLock:
             self._maxSize = int(newDepth)
 
+    def getFlushPolicy(self):
+        """
+        Gets the policy for a full queue when blocking is not on.
+
+        Returns:
+            Tuple of (policy, count).
+        """
+        with self._dataBufferLock:
+            return (self._flushPolicy, self._flushCount)
+
+    def setFlushPolicy(self, policy, count=None):
+        """
+        Sets the policy for a full queue when blocking is not on:
+            FLUSH_ALL          - all queued data packets are discarded (the
+                                 default)
+            FLUSH_DROP_OLDEST  - the `count` oldest data packets are
+                                 discarded (default 1)
+            FLUSH_DROP_NEWEST  - the new data packet is discarded
+            FLUSH_KEEP_EVERY   - only every `count`-th queued data packet is
+                                 kept (default 2)
+        The partial policies limit the discontinuity caused by a brief
+        overload. End-of-stream packets are never discarded, and the first
+        packet of a stream after discarded packets has its inputQueueFlushed
+        flag set. When a per-stream queue depth is set, the policy applies
+        only to the stream that reached its limit. The number of samples
+        discarded for each stream is reported in the port statistics.
+
+        Args:
+            policy: Flush policy.
+            count:  Number of packets for FLUSH_DROP_OLDEST or
+                    FLUSH_KEEP_EVERY.
+
+        Raises:
+            ValueError: If `policy` is not a valid flush policy or `count` is
+                        out of range.
+        """
+        if policy == FLUSH_DROP_OLDEST:
+            count = 1 if count is None else int(count)
+            if count < 1:
+                raise ValueError("Drop count must be at least 1")
+        elif policy == FLUSH_KEEP_EVERY:
+            count = 2 if count is None else int(count)
+            if count < 2:
+                raise ValueError("Keep count must be at least 2")
+        elif policy in (FLUSH_ALL, FLUSH_DROP_NEWEST):
+            count = 0
+        else:
+            raise ValueError("Invalid flush policy '%s'" % policy)
+        with self._dataBufferLock:
+            self._flushPolicy = policy
+            self._flushCount = count
+
+    def getWatermarks(self):
+        """
+        Gets the queue depths used for flow control.
+
+        Returns:
+            Tuple of (high, low) watermarks, or None if disabled.
+        """
+        with self._dataBufferLock:
+            if self._highWatermark is None:
+                return None
+            return (self._highWatermark, self._lowWatermark)
+
+    def setWatermarks(self, high, low=None):
+        """
+        Sets the queue depths used for flow control.
+
+        When the number of queued packets reaches `high`, the port becomes
+        congested, and remains so until the queue drains to `low`. Producers
+        can check congested(), or register a listener with
+        addCongestionListener(), to reduce their rate before the queue fills
+        and is flushed (or, for blocking streams, pushes wait). A congested
+        port also reports its state as BUSY.
+
+        Args:
+            high: Queue depth at which the port is congested, or None to
+                  disable flow control.
+            low:  Queue depth at which the port is no longer congested; if
+                  None, half of `high`.
+
+        Raises:
+            ValueError: If `high` is less than 1, or `low` is negative or not
+                        less than `high`.
+        """
+        if high is not None:
+            high = int(high)
+            if low is None:
+                low = high / 2
+            low = int(low)
+            if high < 1:
+                raise ValueError("High watermark must be at least 1")
+            if low < 0 or low >= high:
+                raise ValueError("Low watermark must be non-negative and less than the high watermark")
+        with self._dataBufferLock:
+            self._highWatermark = high
+            self._lowWatermark = low
+            if high is None:
+                changed = False if self._congested else None
+                self._congested = False
+            else:
+                changed = self._checkCongestion()
+        if changed is not None:
+            self.congestionChanged(changed)
+
+    def congested(self):
+        """
+        Checks whether the queue has reached the high watermark, and not yet
+        drained to the low watermark.
+
+        Returns:
+            bool: True if producers should reduce their rate.
+        """
+        return self._congested
+
+    def getMaxStreamQueueDepth(self):
+        """
+        Gets the maximum number of packets that may be queued for each stream.
+
+        Returns:
+            Maximum packets per stream, -1 for no limit, or None if the
+            port-wide queue depth applies.
+        """
+        with self._dataBufferLock:
+            return self._streamQueueDepth
+
+    def setMaxStreamQueueDepth(self, newDepth):
+        """
+        Sets the maximum number of packets that may be queued for each stream.
+
+        When a per-stream depth is set, it replaces the port-wide queue depth
+        in deciding when to flush the queue (or, for blocking streams, when to
+        wait). Only the packets for the stream that reached its limit are
+        flushed, so that a bursty stream does not cause data from other
+        streams to be lost or delayed.
+
+        Args:
+            newDepth: Maximum packets per stream; -1 for no limit, or None to
+                      use the port-wide queue depth.
+        """
+        with self._dataBufferLock:
+            if newDepth is not None:
+                newDepth = int(newDepth)
+            self._streamQueueDepth = newDepth
+            # Blocked writers may now have room
+            self._queueAvailable.notifyAll()
+
+    def getStreamScheduling(self):
+        """
+        Gets the mode used by getCurrentStream() to choose among streams.
+
+        Returns:
+            SCHEDULE_FIFO or SCHEDULE_ROUND_ROBIN.
+        """
+        with self._dataBufferLock:
+            return self._scheduling
+
+    def setStreamScheduling(self, mode):
+        """
+        Sets the mode used by getCurrentStream() to choose among streams.
+
+        With SCHEDULE_FIFO (the default), the current stream is the one that
+        owns the oldest queued packet, so a stream that sends many packets can
+        monopolize readers. With SCHEDULE_ROUND_ROBIN, streams with queued
+        packets take turns, each getting a number of consecutive turns equal
+        to its weight (see setStreamWeight()).
+
+        Args:
+            mode: SCHEDULE_FIFO or SCHEDULE_ROUND_ROBIN.
+
+        Raises:
+            ValueError: If `mode` is not a valid scheduling mode.
+        """
+        if mode not in (SCHEDULE_FIFO, SCHEDULE_ROUND_ROBIN):
+            raise ValueError("Invalid stream scheduling mode '%s'" % mode)
+        with self._dataBufferLock:
+            if mode == self._scheduling:
+                return
+            self._scheduling = mode
+            if mode == SCHEDULE_ROUND_ROBIN:
+                self._scheduleOrder = collections.deque(stream_id for stream_id, queue in self._streamQueues.iteritems() if queue)
+            else:
+                self._scheduleOrder = collections.deque()
+            self._scheduled = set(self._scheduleOrder)
+            self._currentStreamID = None
+            self._currentTurns = 0
+
+    def setStreamWeight(self, streamID, weight):
+        """
+        Sets the number of consecutive turns given to a stream by
+        getCurrentStream() under round-robin scheduling.
+
+        Args:
+            streamID: Stream identifier; the weight also applies to later
+                      streams with the same stream ID.
+            weight:   Number of turns, at least 1 (the default).
+
+        Raises:
+            ValueError: If `weight` is less than 1.
+        """
+        weight = int(weight)
+        if weight < 1:
+            raise ValueError("Stream weight must be at least 1")
+        with self._dataBufferLock:
+            self._streamWeights[streamID] = weight
+
     def unblock(self):
         with self._dataBufferLock:
             self._breakBlock = False
@@ -214,13 +557,16 @@ class InPort(object):
         if self._portLog:
             self._portLog.trace( "bulkio::InPort pushSRI ENTER (port=" + str(self.name) +")" )
 
-        # If the updated SRI is blocking, ensure port blocking mode is set
-        if H.blocking:
+        with self._sriUpdateLock:
             with self._dataBufferLock:
-                self.blocking = True
+                current = self.sriDict.get(H.streamID, None)
 
-        with self._sriUpdateLock:
-            if H.streamID not in self.sriDict:
+            if self.sri_cmp is bulkio.sri.compare:
+                fingerprint = bulkio.sri.fingerprint(H)
+            else:
+                fingerprint = None
+
+            if current is None:
                 new_stream = True
                 sri_changed = True
                 if self._portLog:
@@ -229,14 +575,23 @@ class InPort(object):
                     self.newSriCallback(H)
             else:
                 new_stream = False
-                sri, sri_changed = self.sriDict[H.streamID]
-                if self.sri_cmp and not self.sri_cmp(sri, H):
-                    sri_changed = True
-                    if self.sriChangeCallback:
-                        self.sriChangeCallback(H)
-
-            if sri_changed:
-                self.sriDict[H.streamID] = (copy.deepcopy(H), True)
+                sri, _ = current
+                sri_changed = self._sriChanged(sri, H, fingerprint)
+                if sri_changed and self.sriChangeCallback:
+                    self.sriChangeCallback(H)
+
+            if sri_changed or H.blocking:
+                # Update the SRI and, if the updated SRI is blocking, ensure
+                # port blocking mode is set; an unchanged SRI is not copied,
+                # and any pending change flag is left for the next packet
+                with self._dataBufferLock:
+                    if sri_changed:
+                        sri = copy.deepcopy(H)
+                        self.sriDict[H.streamID] = (sri, True)
+                        if fingerprint is not None:
+                            self._sriFingerprints[H.streamID] = (sri, fingerprint)
+                    if H.blocking:
+                        self.blocking = True
 
         if new_stream:
             self._createStream(H)
@@ -244,8 +599,23 @@ class InPort(object):
         if self._portLog:
             self._portLog.trace( "bulkio::InPort pushSRI EXIT (port=" + str(self.name) +")" )
 
+    def _sriChanged(self, sri, H, fingerprint):
+        # Prerequisite: caller holds self._sriUpdateLock
+        if fingerprint is None:
+            # User-defined comparison
+            return bool(self.sri_cmp) and not self.sri_cmp(sri, H)
+
+        # The cached fingerprint is only valid if it belongs to the current
+        # SRI for the stream, which may have been replaced by other means
+        # (e.g., a default SRI for a stream with no pushSRI)
+        cached = self._sriFingerprints.get(H.streamID, None)
+        if cached is None or cached[0] is not sri:
+            cached = (sri, bulkio.sri.fingerprint(sri))
+            self._sriFingerprints[H.streamID] = cached
+        return cached[1] != fingerprint
+
     def getPacket(self, timeout=NON_BLOCKING):
-        if self._portLog:
+        if self._traceEnabled:
             self._portLog.trace( "bulkio::InPort getPacket ENTER (port=" + str(self.name) +")" )
 
         packet = self._nextPacket(timeout)
@@ -256,11 +626,41 @@ class InPort(object):
         else:
             packet = InPort.DataTransfer(packet.buffer, packet.T, packet.EOS, packet.streamID, packet.SRI, packet.sriChanged, packet.inputQueueFlushed)
 
-        if self._portLog:
+        if self._traceEnabled:
             self._portLog.trace( "bulkio::InPort getPacket EXIT (port=" + str(self.name) +")" )
 
         return packet
 
+    def getPackets(self, max_count=None, timeout=NON_BLOCKING):
+        """
+        Gets multiple packets from the queue.
+
+        Waits up to `timeout` seconds for at least one packet to be available,
+        then removes all of the queued packets, up to `max_count`, in a single
+        operation. This has less overhead than calling getPacket() for each
+        packet, which is significant when receiving many small packets.
+
+        Args:
+            max_count: Maximum number of packets to return; if None, returns
+                       all queued packets.
+            timeout:   Seconds to wait for a packet; a negative value waits
+                       indefinitely.
+
+        Returns:
+            list: DataTransfer packets in queue order; empty if the timeout
+                  expires or the port is stopped.
+        """
+        if self._traceEnabled:
+            self._portLog.trace( "bulkio::InPort getPackets ENTER (port=" + str(self.name) +")" )
+
+        packets = [InPort.DataTransfer(packet.buffer, packet.T, packet.EOS, packet.streamID, packet.SRI, packet.sriChanged, packet.inputQueueFlushed)
+                   for packet in self._nextPackets(max_count, timeout)]
+
+        if self._traceEnabled:
+            self._portLog.trace( "bulkio::InPort getPackets EXIT (port=" + str(self.name) +")" )
+
+        return packets
+
     def getCurrentStream(self, timeout=BLOCKING):
         """
         Gets the stream that should be used for the next basic read.
@@ -279,13 +679,13 @@ class InPort(object):
                 if stream._hasBufferedData():
                     return stream
 
-        # Otherwise, return the stream that owns the next packet on the queue,
+        # Otherwise, return the next scheduled stream with queued packets,
         # potentially waiting for one to be received
         with self._dataBufferLock:
-            packet = self._peekPacket(timeout)
+            stream_id = self._scheduleStream(timeout)
 
-        if packet:
-            return self.getStream(packet.streamID)
+        if stream_id is not None:
+            return self.getStream(stream_id)
         else:
             return None
 
@@ -314,17 +714,20 @@ class InPort(object):
             return self._streams.values()
 
     def pushPacket(self, data, T, EOS, streamID):
-        self._portLog.trace("pushPacket ENTER")
+        if self._traceEnabled:
+            self._portLog.trace("pushPacket ENTER")
         self._queuePacket(data, T, EOS, streamID)
-        self._portLog.trace("pushPacket EXIT")
+        if self._traceEnabled:
+            self._portLog.trace("pushPacket EXIT")
 
     def _queuePacket(self, data, T, EOS, streamID):
         # Discard packets for disabled streams
         if not self._acceptPacket(streamID, EOS):
-            if EOS and self._disableBlockingOnEOS(streamID):
+            if EOS:
                 # If this was the only blocking stream, turn off blocking
                 with self._dataBufferLock:
-                    self.blocking = False;
+                    if self._noBlockingStreams():
+                        self.blocking = False
             return
 
         # Discard empty packets if EOS is not set, as there is no useful data or
@@ -336,93 +739,302 @@ class InPort(object):
         if self._maxSize == 0:
             return
 
-        new_stream = False
+        # In the common case, where the SRI for the stream has already been
+        # received, the packet is queued with a single lock acquisition
+        with self._dataBufferLock:
+            queued = streamID in self.sriDict
+            if queued:
+                changed = self._enqueuePacket(data, T, EOS, streamID)
+
+        if not queued:
+            # Unknown stream ID, register a new default SRI following the logic
+            # in pushSRI; the stream must be created without any locks held
+            sri = self._registerDefaultSRI(streamID)
+            if sri:
+                self._createStream(sri)
+
+            with self._dataBufferLock:
+                changed = self._enqueuePacket(data, T, EOS, streamID)
+
+        # Listeners are notified without the lock, so they may call back into
+        # the port
+        if changed is not None:
+            self.congestionChanged(changed)
+
+    def _registerDefaultSRI(self, streamID):
+        # Returns the new SRI, or None if another thread registered an SRI for
+        # the stream first
         with self._sriUpdateLock:
-            sri, sri_changed = self.sriDict.get(streamID, (None, True))
-            if not sri:
-                # Unknown stream ID, register a new default SRI following the
-                # logic in pushSRI
-                self._portLog.warn("received data for stream '%s' with no SRI", streamID)
-                new_stream = True
-                sri = bulkio.sri.create(streamID)
-                if self.newSriCallback:
-                    self.newSriCallback(sri)
+            with self._dataBufferLock:
+                if streamID in self.sriDict:
+                    return None
 
-            # Acknowledge SRI change was received; in the unknown stream case,
-            # this also records it in the map
-            self.sriDict[streamID] = (sri, False)
+            self._portLog.warn("received data for stream '%s' with no SRI", streamID)
+            sri = bulkio.sri.create(streamID)
+            if self.newSriCallback:
+                self.newSriCallback(sri)
 
-        # If a new stream needs to be created for an unrecognized stream ID, do
-        # it here after the lock is released
-        if new_stream:
-            self._createStream(sri)
+            with self._dataBufferLock:
+                self.sriDict[streamID] = (sri, True)
+            return sri
 
-        with self._dataBufferLock:
-            queue_flushed = False
+    def _enqueuePacket(self, data, T, EOS, streamID):
+        # Prerequisite: caller holds self._dataBufferLock
+
+        # Take the current SRI for the packet and acknowledge any change; the
+        # SRI change flag is carried by the packet from here on
+        sri, sri_changed = self.sriDict.get(streamID, (None, True))
+        if sri is None:
+            # The stream was ended by another thread after the SRI was
+            # registered
+            sri = bulkio.sri.create(streamID)
+        elif sri_changed:
+            self.sriDict[streamID] = (sri, False)
 
-            if self.blocking:
-                while self._maxSize >= 0 and len(self.queue) >= self._maxSize:
+        queue_flushed = False
+        if self.blocking:
+            while self._queueFull(streamID):
+                self._queueWaiters += 1
+                try:
                     self._queueAvailable.wait()
-            else:
-                # Flush the queue if not using infinite queue (maxSize < 0),
-                # blocking is not on, and queue is currently full
-                if len(self.queue) >= self._maxSize and self._maxSize > -1:
-                    queue_flushed = True
-                    self._portLog.debug("bulkio::InPort pushPacket PURGE INPUT QUEUE (SIZE=%d)", len(self.queue))
-
-                    # Need to hold the SRI mutex while flushing the queue
-                    # because it may update SRI change state
-                    with self._sriUpdateLock:
-                        self._flushQueue()
-
-                        # Update the SRI change flag for this stream, which may
-                        # have been modified during the queue flush
-                        sri, sri_changed = self.sriDict[streamID]
+                finally:
+                    self._queueWaiters -= 1
+        else:
+            # Flush the queue if not using infinite queue (maxSize < 0),
+            # blocking is not on, and queue is currently full
+            if self._queueFull(streamID) and self._flushPolicy == FLUSH_DROP_NEWEST:
+                # Discard the new packet instead, unless it is an end-of-stream
+                # (which is queued regardless); any SRI change is carried by
+                # the stream's next packet
+                if not EOS:
+                    if self._traceEnabled:
+                        self._portLog.trace("bulkio::InPort pushPacket DROP NEWEST '%s' (SIZE=%d)", streamID, self._queueSize)
+                    if sri_changed and streamID in self.sriDict:
+                        self.sriDict[streamID] = (sri, True)
+                    self.stats.dropped(streamID, self._packetSize(data))
+                    self._droppedStreams.add(streamID)
+                    return None
+            elif self._queueFull(streamID):
+                queue_flushed = True
+                if self._streamQueueDepth is None:
+                    self._portLog.debug("bulkio::InPort pushPacket PURGE INPUT QUEUE (SIZE=%d)", self._queueSize)
+                    self._flushQueue()
+                else:
+                    self._portLog.debug("bulkio::InPort pushPacket PURGE STREAM QUEUE '%s' (SIZE=%d)", streamID, self._streamQueueDepth)
+                    self._flushStreamQueue(streamID)
+
+                # Update the SRI change flag for this stream, which may have
+                # been modified during the queue flush
+                if streamID in self.sriDict:
+                    sri, flushed_change = self.sriDict[streamID]
+                    if flushed_change:
+                        sri_changed = True
                         self.sriDict[streamID] = (sri, False)
 
-            self._portLog.trace("bulkio::InPort pushPacket NEW Packet (QUEUE=%d)", len(self.queue))
-            self.stats.update(self._packetSize(data), float(len(self.queue))/float(self._maxSize), EOS, streamID, queue_flushed)
-            packet = InPort.Packet(data, T, EOS, sri, sri_changed, False)
-            self.queue.append(packet)
+        if self._traceEnabled:
+            self._portLog.trace("bulkio::InPort pushPacket NEW Packet (QUEUE=%d)", self._queueSize)
+        self.stats.update(self._packetSize(data), float(self._queueSize)/float(self._maxSize), EOS, streamID, queue_flushed)
+        packet = InPort.Packet(data, T, EOS, sri, sri_changed, False)
+        if self._droppedStreams and streamID in self._droppedStreams:
+            # Packets for this stream were dropped since the last one queued
+            packet.inputQueueFlushed = True
+            self._droppedStreams.discard(streamID)
+        self._pushQueue(packet, streamID)
+
+        if EOS:
+            self.sriDict.pop(streamID, None)
+            self._sriFingerprints.pop(streamID, None)
+
+        # If a flush occurred, always set the flag on the first packet (of the
+        # stream, if only its packets were flushed); this may not be the packet
+        # that was just inserted if there were any EOS packets on the queue.
+        # Partial flushes instead flag the packet after each gap.
+        if queue_flushed and self._flushPolicy == FLUSH_ALL:
+            if self._streamQueueDepth is None:
+                self._headPacket().inputQueueFlushed = True
+            else:
+                self._streamQueues[streamID][0].inputQueueFlushed = True
 
-            with self._sriUpdateLock:
-                if EOS:
-                    sri, _ = self.sriDict.pop(streamID, (None, None))
+        # Let one waiting getPacket call know there is a packet available
+        if self._dataWaiters:
+            self._dataAvailable.notify()
 
-            # If a flush occurred, always set the flag on the first packet;
-            # this may not be the packet that was just inserted if there were
-            # any EOS packets on the queue
-            if queue_flushed:
-                self.queue[0].inputQueueFlushed = True
+        # Returns the new congestion state if it changed, for the caller to
+        # notify listeners once the lock is released
+        if self._highWatermark is not None:
+            return self._checkCongestion()
+        return None
 
-            # Let one waiting getPacket call know there is a packet available
-            self._dataAvailable.notify()
+    def _checkCongestion(self):
+        # Prerequisite: caller holds self._dataBufferLock, and watermarks are
+        # enabled
+        # Returns the new congestion state if it changed, otherwise None
+        if self._congested:
+            if self._queueSize <= self._lowWatermark:
+                self._congested = False
+                return False
+        elif self._queueSize >= self._highWatermark:
+            self._congested = True
+            return True
+        return None
+
+    def _queueFull(self, streamID):
+        # Prerequisite: caller holds self._dataBufferLock
+        if self._streamQueueDepth is None:
+            return self._maxSize >= 0 and self._queueSize >= self._maxSize
+        queue = self._streamQueues.get(streamID, ())
+        return self._streamQueueDepth >= 0 and len(queue) >= self._streamQueueDepth
+
+    def _pushQueue(self, packet, streamID):
+        # Prerequisite: caller holds self._dataBufferLock
+        queue = self._streamQueues.get(streamID, None)
+        if queue is None:
+            queue = collections.deque()
+            self._streamQueues[streamID] = queue
+        if not queue and self._scheduling == SCHEDULE_ROUND_ROBIN and streamID not in self._scheduled:
+            self._scheduled.add(streamID)
+            self._scheduleOrder.append(streamID)
+        queue.append(packet)
+        self._queueOrder.append(streamID)
+        self._queueSize += 1
+
+    def _popStreamQueue(self, streamID):
+        # Prerequisite: caller holds self._dataBufferLock, and the stream has
+        # queued packets
+        queue = self._streamQueues[streamID]
+        packet = queue.popleft()
+        if packet.EOS and not queue:
+            # Empty queues are kept until the stream ends, to avoid re-creating
+            # them whenever the reader catches up
+            del self._streamQueues[streamID]
+        self._queueSize -= 1
+        return packet
+
+    def _discardSkipped(self):
+        # Prerequisite: caller holds self._dataBufferLock
+        # Removes order entries for packets that were already taken from their
+        # stream's queue, up to the entry for the oldest queued packet
+        while self._queueOrder:
+            stream_id = self._queueOrder[0]
+            skipped = self._skippedOrder.get(stream_id, 0)
+            if not skipped:
+                return
+            self._queueOrder.popleft()
+            if skipped == 1:
+                del self._skippedOrder[stream_id]
+            else:
+                self._skippedOrder[stream_id] = skipped - 1
+
+    def _headPacket(self):
+        # Prerequisite: caller holds self._dataBufferLock
+        if self._skippedOrder:
+            self._discardSkipped()
+        if not self._queueOrder:
+            return None
+        return self._streamQueues[self._queueOrder[0]][0]
+
+    def _popQueue(self):
+        # Prerequisite: caller holds self._dataBufferLock, and the queue is not
+        # empty
+        if self._skippedOrder:
+            self._discardSkipped()
+        stream_id = self._queueOrder.popleft()
+        queue = self._streamQueues[stream_id]
+        packet = queue.popleft()
+        if packet.EOS and not queue:
+            del self._streamQueues[stream_id]
+        self._queueSize -= 1
+        return packet
+
+    def _popStream(self, streamID):
+        # Prerequisite: caller holds self._dataBufferLock, and the stream has
+        # queued packets
+        self._skippedOrder[streamID] = self._skippedOrder.get(streamID, 0) + 1
+        return self._popStreamQueue(streamID)
+
+    def _queuedPackets(self):
+        # Prerequisite: caller holds self._dataBufferLock
+        # Generates all queued packets in the order they were received
+        queues = dict((stream_id, iter(queue)) for stream_id, queue in self._streamQueues.iteritems())
+        skipped = dict(self._skippedOrder)
+        for stream_id in self._queueOrder:
+            if skipped.get(stream_id, 0):
+                skipped[stream_id] -= 1
+            else:
+                yield queues[stream_id].next()
+
+    def _rebuildQueue(self, packets):
+        # Prerequisite: caller holds self._dataBufferLock
+        self._streamQueues = {}
+        self._queueOrder = collections.deque()
+        self._skippedOrder = {}
+        self._queueSize = 0
+        for packet in packets:
+            self._pushQueue(packet, packet.streamID)
 
     def _flushQueue(self):
-        # Prerequisite: caller holds self._dataBufferLock and
-        # self._sriUpdateLock
+        # Prerequisite: caller holds self._dataBufferLock
+        self._rebuildQueue(self._flushPackets(self._queuedPackets()))
+
+    def _flushStreamQueue(self, streamID):
+        # Prerequisite: caller holds self._dataBufferLock
+        # Flushes only the packets for one stream, keeping any EOS packets in
+        # their original order relative to other streams
+        saved = set(id(packet) for packet in self._flushPackets(self._streamQueues.get(streamID, ())))
+        packets = [packet for packet in self._queuedPackets() if packet.streamID != streamID or id(packet) in saved]
+        self._rebuildQueue(packets)
+
+    def _flushPackets(self, packets):
+        # Prerequisite: caller holds self._dataBufferLock
+        # Returns the packets that must be kept after a flush, according to
+        # the flush policy; EOS packets are always kept
+        policy = self._flushPolicy
+        count = self._flushCount
         sri_changed = set()
-        saved_packets = collections.deque()
-        for packet in self.queue:
+        dropped = set()
+        saved_packets = []
+        data_index = 0
+        for packet in packets:
             if packet.EOS:
-                # Remove the SRI change flag for this stream, as further SRI
-                # changes apply to a different stream; set the SRI change flag
-                # for the EOS packet if there was one for this stream earlier
-                # in the queue
-                if packet.streamID in sri_changed:
-                    packet.sriChanged = True
-                sri_changed.discard(packet.streamID)
-
+                keep = True
+            else:
+                if policy == FLUSH_DROP_OLDEST:
+                    keep = data_index >= count
+                elif policy == FLUSH_KEEP_EVERY:
+                    keep = (data_index % count) == (count - 1)
+                else:
+                    keep = False
+                data_index += 1
+
+            if not keep:
+                self.stats.dropped(packet.streamID, self._packetSize(packet.buffer))
+                if packet.sriChanged:
+                    sri_changed.add(packet.streamID)
+                dropped.add(packet.streamID)
+                continue
+
+            # Set the SRI change flag for the kept packet if there was one for
+            # this stream earlier in the queue
+            if packet.streamID in sri_changed:
+                packet.sriChanged = True
+            sri_changed.discard(packet.streamID)
+
+            if policy == FLUSH_ALL:
                 # Discard data (using a 0-length slice works with any sequence)
                 # and preserve the EOS packet
+                if packet.buffer:
+                    self.stats.dropped(packet.streamID, self._packetSize(packet.buffer))
                 packet.buffer = packet.buffer[:0]
                 packet.inputQueueFlushed = False
-                saved_packets.append(packet)
-            elif packet.sriChanged:
-                sri_changed.add(packet.streamID)
-
-        self.queue = saved_packets
-
+            elif packet.streamID in dropped:
+                # First packet after a gap in the stream
+                packet.inputQueueFlushed = True
+                dropped.discard(packet.streamID)
+            saved_packets.append(packet)
+
+        # Remaining SRI changes apply to the next packet received for each
+        # stream (for EOS packets, the change was already handled above, as
+        # further SRI changes apply to a different stream)
         for stream_id in sri_changed:
             # It should be safe to assume that an entry exists for the stream
             # ID, but just in case, use get instead of operator[]
@@ -430,7 +1042,18 @@ class InPort(object):
             if sri is not None:
                 self.sriDict[stream_id] = (sri, True)
 
+        if policy != FLUSH_ALL:
+            self._droppedStreams.update(dropped)
+
+        return saved_packets
+
     def _acceptPacket(self, streamID, EOS):
+        # Packets for unknown or enabled streams are always accepted; looking
+        # up a stream is atomic, so skip the lock for the common case
+        stream = self._streams.get(streamID, None)
+        if not stream or stream.enabled:
+            return True
+
         # Acquire streamsMutex for the duration of this call to ensure that
         # end-of-stream is handled atomically for disabled streams
         with self._streamsMutex:
@@ -467,21 +1090,51 @@ class InPort(object):
     def _peekPacket(self, timeout):
         # Requires self._dataBufferLock
         to_time = time.time() + timeout
-        while not self._breakBlock and not self.queue:
+        while not self._breakBlock and not self._queueSize:
             if timeout == 0.0:
                 break
             elif timeout > 0:
                 wait_time = to_time - time.time()
                 if wait_time <= 0.0:
                     break
-                self._dataAvailable.wait(wait_time)
+                self._waitForData(wait_time)
             else:
-                self._dataAvailable.wait()
+                self._waitForData()
 
-        if self._breakBlock or not self.queue:
+        if self._breakBlock or not self._queueSize:
             return None
         else:
-            return self.queue[0]
+            return self._headPacket()
+
+    def _scheduleStream(self, timeout):
+        # Requires self._dataBufferLock
+        # Returns the stream ID that getCurrentStream() should return next,
+        # potentially waiting for a packet to be received
+        packet = self._peekPacket(timeout)
+        if packet is None:
+            return None
+        elif self._scheduling == SCHEDULE_FIFO:
+            return packet.streamID
+
+        # Give the current stream its remaining turns, as long as it still has
+        # queued packets
+        if self._currentTurns > 0 and self._streamQueues.get(self._currentStreamID, None):
+            self._currentTurns -= 1
+            return self._currentStreamID
+
+        while self._scheduleOrder:
+            stream_id = self._scheduleOrder.popleft()
+            if not self._streamQueues.get(stream_id, None):
+                # Stream has no queued packets; it is scheduled again when it
+                # receives one
+                self._scheduled.discard(stream_id)
+                continue
+            self._scheduleOrder.append(stream_id)
+            self._currentStreamID = stream_id
+            self._currentTurns = self._streamWeights.get(stream_id, 1) - 1
+            return stream_id
+
+        return packet.streamID
 
     def _nextPacket(self, timeout, streamID=None):
         if self._breakBlock:
@@ -498,42 +1151,116 @@ class InPort(object):
                     wait_time = to_time - time.time()
                     if wait_time <= 0.0:
                         return None
-                    self._dataAvailable.wait(wait_time)
+                    self._waitForData(wait_time)
                 else:
-                    self._dataAvailable.wait()
+                    self._waitForData()
                 if self._breakBlock:
                     return None
                 packet = self._fetchPacket(streamID)
 
             #LOG_TRACE(logger, "InPort::nextPacket PORT:" << name << " (QUEUE="<< packetQueue.size() << ")");
-            self._queueAvailable.notify()
+            if self._queueWaiters:
+                if self._streamQueueDepth is None:
+                    self._queueAvailable.notify()
+                else:
+                    # Blocked writers may be waiting on other streams' queues
+                    self._queueAvailable.notifyAll()
 
-        if packet and packet.EOS and self._disableBlockingOnEOS(packet.streamID):
-            with self._dataBufferLock:
+            if packet.EOS and self._noBlockingStreams():
                 self.blocking = False
 
+            if self._highWatermark is not None:
+                changed = self._checkCongestion()
+            else:
+                changed = None
+
+        if changed is not None:
+            self.congestionChanged(changed)
         return packet
 
+    def _nextPackets(self, count, timeout, streamID=None):
+        if self._breakBlock:
+            return []
+
+        to_time = time.time() + timeout
+
+        with self._dataBufferLock:
+            packets = self._fetchPackets(count, streamID)
+            while not packets:
+                if timeout == 0.0:
+                    return []
+                elif timeout > 0.0:
+                    wait_time = to_time - time.time()
+                    if wait_time <= 0.0:
+                        return []
+                    self._waitForData(wait_time)
+                else:
+                    self._waitForData()
+                if self._breakBlock:
+                    return []
+                packets = self._fetchPackets(count, streamID)
+
+            # Wake up all blocked writers at once, since more than one slot
+            # may have opened up
+            if self._queueWaiters:
+                self._queueAvailable.notifyAll()
+
+            for packet in packets:
+                if packet.EOS and self._noBlockingStreams():
+                    self.blocking = False
+                    break
+
+            if self._highWatermark is not None:
+                changed = self._checkCongestion()
+            else:
+                changed = None
+
+        if changed is not None:
+            self.congestionChanged(changed)
+        return packets
+
+    def _waitForData(self, timeout=None):
+        # Prerequisite: caller holds self._dataBufferLock
+        self._dataWaiters += 1
+        try:
+            self._dataAvailable.wait(timeout)
+        finally:
+            self._dataWaiters -= 1
+
     def _fetchPacket(self, streamID):
         # Prerequisite: caller holds self._dataBufferLock
         if not streamID:
-            if not self.queue:
+            if not self._queueSize:
                 return None
-            return self.queue.popleft()
+            return self._popQueue()
 
-        for index in xrange(len(self.queue)):
-            if self.queue[index].streamID == streamID:
-                packet = self.queue[index]
-                del self.queue[index]
-                return packet
-        return None
+        if not self._streamQueues.get(streamID, None):
+            return None
+        return self._popStream(streamID)
 
-    def _disableBlockingOnEOS(self, streamID):
-        with self._sriUpdateLock:
-            for hdr, _ in self.sriDict.itervalues():
-                if hdr.blocking:
-                    return False
-            return True
+    def _fetchPackets(self, count, streamID):
+        # Prerequisite: caller holds self._dataBufferLock
+        if not streamID:
+            if count is None or count > self._queueSize:
+                count = self._queueSize
+            return [self._popQueue() for _ in xrange(count)]
+
+        # Extract the packets for the stream, stopping after an end-of-stream;
+        # any later packets with the same stream ID belong to a new stream
+        packets = []
+        while self._streamQueues.get(streamID, None) and len(packets) != count:
+            packet = self._popStream(streamID)
+            packets.append(packet)
+            if packet.EOS:
+                break
+        return packets
+
+    def _noBlockingStreams(self):
+        # Prerequisite: caller holds self._dataBufferLock
+        for hdr, _ in self.sriDict.itervalues():
+            if hdr.blocking:
+                return False
+        return True
 
     def _createStream(self, sri):
         with self._streamsMutex:
@@ -574,7 +1301,12 @@ class InPort(object):
 
     def _discardPacketsForStream(self, streamID):
         with self._dataBufferLock:
-            self.queue = [pkt for pkt in self.queue if pkt.streamID != streamID]
+            queue = self._streamQueues.pop(streamID, None)
+            if queue is None:
+                return
+            self._queueSize -= len(queue)
+            self._queueOrder = collections.deque(stream_id for stream_id in self._queueOrder if stream_id != streamID)
+            self._skippedOrder.pop(streamID, None)
 
     def _streamType(self, sri, port):
         return InputStream(sri, port)
@@ -587,57 +1319,199 @@ class InPort(object):
         return data
 
 class InNumericPort(InPort):
+    # Element type code (as used by struct and numpy) for the port's data
+    TRANSFER_TYPE = None
+
     def __init__(self, name, bits, logger, sriCompare, newSriCallback, sriChangeCallback, maxsize):
         InPort.__init__(self, name, bits, logger, sriCompare, newSriCallback, sriChangeCallback, maxsize)
+        self._useNumpy = False
+        self._transports = {} # key=transportId, value=ShmInputTransport
+        self._transportLock = threading.Lock()
+
+    def enableNumpy(self, enabled):
+        """
+        Enables or disables numpy array data for input streams.
+
+        When enabled, each packet's data is wrapped in a numpy array of the
+        port's native type when it is fetched by an input stream. Reads that
+        fall within a single packet return views into that array, and reads
+        that span multiple packets are assembled with a single copy. The
+        `data` and `cxdata` attributes of the data blocks read from streams
+        are numpy arrays.
+
+        The classic getPacket() API is not affected.
+
+        Args:
+            enabled: True to use numpy arrays, False to use lists.
+
+        Raises:
+            ImportError: If `enabled` is True and numpy is not available.
+        """
+        if enabled and numpy is None:
+            raise ImportError('numpy is not available')
+        self._useNumpy = bool(enabled)
+
+    def numpyEnabled(self):
+        """
+        Checks whether numpy array data is enabled for input streams.
+
+        Returns:
+            bool: True if stream data is returned as numpy arrays.
+        """
+        return self._useNumpy
 
     def _streamType(self, sri, port):
         return BufferedInputStream(sri, port)
 
-class InCharPort(InNumericPort, BULKIO__POA.dataChar):
-    def __init__(self, name, logger=None, sriCompare=bulkio.sri.compare, newSriCallback=None, sriChangeCallback=None, maxsize=100):
-        InNumericPort.__init__(self, name, 8, logger, sriCompare, newSriCallback, sriChangeCallback, maxsize)
+    def _get_supportedTransports(self):
+        # Only Python output ports on the same host can use shared memory
+        props = properties.props_from_dict({'hostname': socket.gethostname()})
+        return [ExtendedCF.TransportInfo(transport.SHM_TRANSPORT, props)]
+
+    def negotiateTransport(self, transportType, transportProperties):
+        if transportType != transport.SHM_TRANSPORT:
+            raise ExtendedCF.NegotiationError("Unsupported transport type '%s'" % transportType)
+        props = properties.props_to_dict(transportProperties)
+        if props.get('hostname', None) != socket.gethostname():
+            raise ExtendedCF.NegotiationError("Shared memory transport requires the same host")
+
+        transport_id = str(uuid.uuid4())
+        try:
+            reader = transport.ShmInputTransport(self, transport_id, props, self._portLog)
+        except Exception, e:
+            raise ExtendedCF.NegotiationError(str(e))
+        with self._transportLock:
+            self._transports[transport_id] = reader
+        if self._portLog:
+            self._portLog.debug("Negotiated shared memory transport '%s'", transport_id)
+        return ExtendedCF.NegotiationResult(transport_id, [])
+
+    def disconnectTransport(self, transportId):
+        with self._transportLock:
+            reader = self._transports.pop(transportId, None)
+        if reader is None:
+            raise ExtendedCF.NegotiationError("Invalid transport ID '%s'" % transportId)
+        reader.stop()
+
+    def _transportExited(self, transportId, reader):
+        # Called from the reader thread when it exits on its own (e.g., the
+        # writer went away without disconnecting)
+        with self._transportLock:
+            if self._transports.get(transportId, None) is reader:
+                del self._transports[transportId]
+
+    def _unpackTransportData(self, data):
+        # Convert binary data from the shared memory transport into a list,
+        # as would be received via CORBA
+        return transport.unpackData(data, self.TRANSFER_TYPE)
 
     def _reformat(self, data):
-        # Unpack the binary string as a list of signed bytes
-        return list(struct.unpack('%db' % len(data), data))
+        if self._useNumpy:
+            # Avoids a copy if the data is already an array of the right type
+            return numpy.asarray(data, dtype=self.TRANSFER_TYPE)
+        return data
 
-class InOctetPort(InNumericPort, BULKIO__POA.dataOctet):
-    def __init__(self, name, logger=None, sriCompare=bulkio.sri.compare, newSriCallback=None, sriChangeCallback=None, maxsize=100):
-        InNumericPort.__init__(self, name, 8, logger, sriCompare, newSriCallback, sriChangeCallback, maxsize)
+class InBytePort(InNumericPort):
+    """
+    Common implementation for char and octet input ports, which receive their
+    data as binary strings.
+    """
+    def __init__(self, name, bits, logger, sriCompare, newSriCallback, sriChangeCallback, maxsize):
+        InNumericPort.__init__(self, name, bits, logger, sriCompare, newSriCallback, sriChangeCallback, maxsize)
+        self._useByteArray = False
+
+    def enableByteArray(self, enabled):
+        """
+        Enables or disables bytearray data for input streams.
+
+        When enabled, each packet's binary string is copied into a bytearray
+        instead of being unpacked into a list of integers. The elements of a
+        bytearray are always unsigned; for char data, values greater than 127
+        represent negative numbers.
+
+        If numpy arrays are also enabled, they take precedence.
+
+        Args:
+            enabled: True to use bytearrays, False to use lists.
+        """
+        self._useByteArray = bool(enabled)
+
+    def byteArrayEnabled(self):
+        """
+        Checks whether bytearray data is enabled for input streams.
+
+        Returns:
+            bool: True if stream data is returned as bytearrays.
+        """
+        return self._useByteArray
+
+    def _unpackTransportData(self, data):
+        # Binary strings are received as-is
+        return data
 
     def _reformat(self, data):
-        # Unpack the binary string as a list of unsigned bytes
-        return list(struct.unpack('%dB' % len(data), data))
+        if numpy is not None and isinstance(data, numpy.ndarray):
+            # Data has already been converted (e.g., by a local connection)
+            if self._useNumpy:
+                return data
+            data = data.tostring()
+
+        if self._useNumpy:
+            # Interpret the binary string in-place as the port's element type
+            return numpy.frombuffer(data, dtype=self.TRANSFER_TYPE)
+        elif self._useByteArray:
+            return bytearray(data)
+        # Unpack the binary string as a list of integers; array does this in a
+        # single pass in C, without building an argument tuple
+        return array.array(self.TRANSFER_TYPE, data).tolist()
+
+class InCharPort(InBytePort, _providesSkeleton('dataChar')):
+    TRANSFER_TYPE = 'b'
+    def __init__(self, name, logger=None, sriCompare=bulkio.sri.compare, newSriCallback=None, sriChangeCallback=None, maxsize=100):
+        InBytePort.__init__(self, name, 8, logger, sriCompare, newSriCallback, sriChangeCallback, maxsize)
+
+class InOctetPort(InBytePort, _providesSkeleton('dataOctet')):
+    TRANSFER_TYPE = 'B'
+    def __init__(self, name, logger=None, sriCompare=bulkio.sri.compare, newSriCallback=None, sriChangeCallback=None, maxsize=100):
+        InBytePort.__init__(self, name, 8, logger, sriCompare, newSriCallback, sriChangeCallback, maxsize)
 
-class InShortPort(InNumericPort, BULKIO__POA.dataShort):
+class InShortPort(InNumericPort, _providesSkeleton('dataShort')):
+    TRANSFER_TYPE = 'h'
     def __init__(self, name, logger=None, sriCompare=bulkio.sri.compare, newSriCallback=None, sriChangeCallback=None, maxsize=100):
         InNumericPort.__init__(self, name, 16, logger, sriCompare, newSriCallback, sriChangeCallback, maxsize)
 
-class InUShortPort(InNumericPort, BULKIO__POA.dataUshort):
+class InUShortPort(InNumericPort, _providesSkeleton('dataUshort')):
+    TRANSFER_TYPE = 'H'
     def __init__(self, name, logger=None, sriCompare=bulkio.sri.compare, newSriCallback=None, sriChangeCallback=None, maxsize=100):
         InNumericPort.__init__(self, name, 16, logger, sriCompare, newSriCallback, sriChangeCallback, maxsize)
 
-class InLongPort(InNumericPort, BULKIO__POA.dataLong):
+class InLongPort(InNumericPort, _providesSkeleton('dataLong')):
+    TRANSFER_TYPE = 'i'
     def __init__(self, name, logger=None, sriCompare=bulkio.sri.compare, newSriCallback=None, sriChangeCallback=None, maxsize=100):
         InNumericPort.__init__(self, name, 32, logger, sriCompare, newSriCallback, sriChangeCallback, maxsize)
 
-class InULongPort(InNumericPort, BULKIO__POA.dataUlong):
+class InULongPort(InNumericPort, _providesSkeleton('dataUlong')):
+    TRANSFER_TYPE = 'I'
     def __init__(self, name, logger=None, sriCompare=bulkio.sri.compare, newSriCallback=None, sriChangeCallback=None, maxsize=100):
         InNumericPort.__init__(self, name, 32, logger, sriCompare, newSriCallback, sriChangeCallback, maxsize)
 
-class InLongLongPort(InNumericPort, BULKIO__POA.dataLongLong):
+class InLongLongPort(InNumericPort, _providesSkeleton('dataLongLong')):
+    TRANSFER_TYPE = 'q'
     def __init__(self, name, logger=None, sriCompare=bulkio.sri.compare, newSriCallback=None, sriChangeCallback=None, maxsize=100):
         InNumericPort.__init__(self, name, 64, logger, sriCompare, newSriCallback, sriChangeCallback, maxsize)
 
-class InULongLongPort(InNumericPort, BULKIO__POA.dataUlongLong):
+class InULongLongPort(InNumericPort, _providesSkeleton('dataUlongLong')):
+    TRANSFER_TYPE = 'Q'
     def __init__(self, name, logger=None, sriCompare=bulkio.sri.compare, newSriCallback=None, sriChangeCallback=None, maxsize=100):
         InNumericPort.__init__(self, name, 64, logger, sriCompare, newSriCallback, sriChangeCallback, maxsize)
 
-class InFloatPort(InNumericPort, BULKIO__POA.dataFloat):
+class InFloatPort(InNumericPort, _providesSkeleton('dataFloat')):
+    TRANSFER_TYPE = 'f'
     def __init__(self, name, logger=None, sriCompare=bulkio.sri.compare, newSriCallback=None, sriChangeCallback=None, maxsize=100):
         InNumericPort.__init__(self, name, 32, logger, sriCompare, newSriCallback, sriChangeCallback, maxsize)
 
-class InDoublePort(InNumericPort, BULKIO__POA.dataDouble):
+class InDoublePort(InNumericPort, _providesSkeleton('dataDouble')):
+    TRANSFER_TYPE = 'd'
     def __init__(self, name, logger=None, sriCompare=bulkio.sri.compare, newSriCallback=None, sriChangeCallback=None, maxsize=100):
         InNumericPort.__init__(self, name, 64, logger, sriCompare, newSriCallback, sriChangeCallback, maxsize)
 
@@ -646,11 +1520,13 @@ class InBitPort(InPort, BULKIO__POA.dataBit):
         InPort.__init__(self, name, 1, logger, sriCompare, newSriCallback, sriChangeCallback, maxsize)
 
     def pushPacket(self, data, T, EOS, streamID):
-        self._portLog.trace("pushPacket ENTER")
+        if self._traceEnabled:
+            self._portLog.trace("pushPacket ENTER")
         if isinstance(data, BULKIO.BitSequence):
             data = bitbuffer(bytearray(data.data), data.bits)
         self._queuePacket(data, T, EOS, streamID)
-        self._portLog.trace("pushPacket EXIT")
+        if self._traceEnabled:
+            self._portLog.trace("pushPacket EXIT")
 
     def _streamType(self, sri, port):
         return BufferedInputStream(sri, port, DataBlock)
@@ -759,7 +1635,7 @@ class InAttachablePort:
     def _get_state(self):
         self.port_lock.acquire()
         try:
-            numAttachedStreams = len(self._attachedStreams.values())
+            numAttachedStreams = len(self._attachedStreams)
         finally:
             self.port_lock.release()
         if numAttachedStreams == 0:
@@ -784,7 +1660,7 @@ class InAttachablePort:
     def _get_usageState(self):
         self.port_lock.acquire()
         try:
-            numAttachedStreams = len(self._attachedStreams.values())
+            numAttachedStreams = len(self._attachedStreams)
         finally:
             self.port_lock.release()
         if numAttachedStreams == 0:
@@ -804,15 +1680,15 @@ class InAttachablePort:
     def attach(self, streamDef, userid):
 
         if self._portLog:
-            self._portLog.trace("bulkio::InAttachablePort attach ENTER  (port=" + str(self.name) +")" )
-            self._portLog.debug("InAttachablePort.attach() - ATTACH REQUEST, STREAM/USER"  + str(streamDef) + '/' + str(userid))
+            self._portLog.trace("bulkio::InAttachablePort attach ENTER  (port=%s)", self.name)
+            self._portLog.debug("InAttachablePort.attach() - ATTACH REQUEST, STREAM/USER%s/%s", streamDef, userid)
 
         attachId = None
         self.port_lock.acquire()
         try:
             try:
                 if self._portLog:
-                    self._portLog.debug("InAttachablePort.attach() - CALLING ATTACH CALLBACK, STREAM/USER"  + str(streamDef) + '/' + str(userid) )
+                    self._portLog.debug("InAttachablePort.attach() - CALLING ATTACH CALLBACK, STREAM/USER%s/%s", streamDef, userid)
                 if self._attach_cb != None:
                     attachId = self._attach_cb(streamDef, userid)
             except Exception, e:
@@ -829,23 +1705,23 @@ class InAttachablePort:
             self.port_lock.release()
 
         if self._portLog:
-            self._portLog.debug("InAttachablePort.attach() - ATTACH COMPLETED,  ID:" + str(attachId) + " STREAM/USER: " + str(streamDef) + '/' + str(userid))
-            self._portLog.trace("bulkio::InAttachablePort attach EXIT (port=" + str(self.name) +")" )
+            self._portLog.debug("InAttachablePort.attach() - ATTACH COMPLETED,  ID:%s STREAM/USER: %s/%s", attachId, streamDef, userid)
+            self._portLog.trace("bulkio::InAttachablePort attach EXIT (port=%s)", self.name)
 
         return attachId
 
     def detach(self, attachId):
 
         if self._portLog:
-            self._portLog.trace("bulkio::InAttachablePort detach ENTER (port=" + str(self.name) +")" )
-            self._portLog.debug("InAttachablePort.detach() - DETACH REQUESTED, ID:" + str(attachId) )
+            self._portLog.trace("bulkio::InAttachablePort detach ENTER (port=%s)", self.name)
+            self._portLog.debug("InAttachablePort.detach() - DETACH REQUESTED, ID:%s", attachId)
 
         self.port_lock.acquire()
         try:
             if not self._attachedStreams.has_key(attachId):
 
                 if self._portLog:
-                    self._portLog.debug("InAttachablePort.detach() - DETACH UNKNOWN ID:" + str(attachId) )
+                    self._portLog.debug("InAttachablePort.detach() - DETACH UNKNOWN ID:%s", attachId)
 
                 if attachId:
                     raise self.interface.DetachError("Stream %s not attached" % str(attachId))
@@ -859,7 +1735,7 @@ class InAttachablePort:
             #
             try:
                 if self._portLog:
-                    self._portLog.debug("InAttachablePort.detach() - CALLING DETACH CALLBACK, ID:" + str(attachId) )
+                    self._portLog.debug("InAttachablePort.detach() - CALLING DETACH CALLBACK, ID:%s", attachId)
 
                 if self._detach_cb != None:
                     self._detach_cb(attachId)
@@ -875,8 +1751,8 @@ class InAttachablePort:
             self.port_lock.release()
 
         if self._portLog:
-            self._portLog.debug("InAttachablePort.detach() - DETACH SUCCESS, ID:" + str(attachId) )
-            self._portLog.trace("bulkio::InAttachablePort detach EXIT (port=" + str(self.name) +")" )
+            self._portLog.debug("InAttachablePort.detach() - DETACH SUCCESS, ID:%s", attachId)
+            self._portLog.trace("bulkio::InAttachablePort detach EXIT (port=%s)", self.name)
 
     def getStreamDefinition(self, attachId):
         try:
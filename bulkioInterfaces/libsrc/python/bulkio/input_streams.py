@@ -18,6 +18,13 @@
 # along with this program.  If not, see http://www.gnu.org/licenses/.
 #
 
+import collections
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
 from bulkio.stream_base import StreamBase
 from bulkio.datablock import DataBlock, SampleDataBlock
 import bulkio.const
@@ -112,6 +119,44 @@ class InputStream(StreamBase):
         """
         return self._readPacket(False)
 
+    def readBlocks(self, max_blocks=None):
+        """
+        Blocking read of all available packets for this stream.
+
+        Waits until at least one packet is available, then reads all of the
+        packets that are queued for this stream, up to `max_blocks`, without
+        waiting for more. The packets are removed from the input port in a
+        single operation, which has less overhead than calling read() for each
+        packet when there are many small packets.
+
+        Reading stops after an end-of-stream packet. The read may fail if:
+            * End-of-stream has been reached
+            * The input port is stopped
+
+        Args:
+            max_blocks: Maximum number of data blocks to read; if None, reads
+                        all queued packets.
+
+        Returns:
+            list: DataBlocks in the order they were received; empty if the read
+                  failed.
+        """
+        return self._readPackets(max_blocks, True)
+
+    def tryreadBlocks(self, max_blocks=None):
+        """
+        Non-blocking version of readBlocks().
+
+        Args:
+            max_blocks: Maximum number of data blocks to read; if None, reads
+                        all queued packets.
+
+        Returns:
+            list: DataBlocks in the order they were received; empty if no data
+                  is available or the read failed.
+        """
+        return self._readPackets(max_blocks, False)
+
     @property
     def enabled(self):
         """
@@ -224,6 +269,22 @@ class InputStream(StreamBase):
             self._reportIfEosReached()
             return None
 
+        return self._packetToBlock(packet)
+
+    def _readPackets(self, count, blocking):
+        packets = self._fetchNextPackets(count, blocking)
+
+        # An end-of-stream packet with no data does not produce a block
+        blocks = [self._packetToBlock(packet) for packet in packets if not (packet.EOS and (len(packet.buffer) == 0))]
+        if not blocks:
+            # Treat like a failed read of a single packet, reporting the end-
+            # of-stream if it has been reached
+            if self._eosState == EOS_RECEIVED:
+                self._eosState = EOS_REACHED
+            self._reportIfEosReached()
+        return blocks
+
+    def _packetToBlock(self, packet):
         # Turn packet into a data block
         sri_flags = self._getSriChangeFlags(packet)
         block = self._createBlock(packet.SRI, packet.buffer, sri_flags, packet.inputQueueFlushed)
@@ -237,6 +298,22 @@ class InputStream(StreamBase):
         self._sri = packet.SRI
         return block
 
+    def _fetchNextPackets(self, count, blocking):
+        # Batch version of _fetchNextPacket
+        if not self.__enabled or self._eosState != EOS_NONE:
+            return []
+
+        if blocking:
+            timeout = bulkio.const.BLOCKING
+        else:
+            timeout = bulkio.const.NON_BLOCKING
+        packets = self._port._nextPackets(count, timeout, self.streamID)
+        for packet in packets:
+            packet.buffer = self._port._reformat(packet.buffer)
+        if packets and packets[-1].EOS:
+            self._eosState = EOS_RECEIVED
+        return packets
+
     def _fetchNextPacket(self, blocking):
         # Don't fetch a packet from the port if stream is disabled
         if not self.__enabled:
@@ -280,6 +357,57 @@ class InputStream(StreamBase):
         return self.__blockType(*args, **kwargs)
 
 
+class _SampleBuffer(object):
+    # Contiguous storage for the queued samples of a stream that receives
+    # numpy arrays. Packet data is appended at the end and consumed from the
+    # front by advancing an index, so that reads spanning multiple packets, or
+    # overlapping previous reads, return views instead of copies.
+    #
+    # When there is no more room at the end, the unconsumed samples are moved
+    # to a newly-allocated array rather than compacted in place; views that
+    # were returned from earlier reads may still be in use, and must never be
+    # overwritten.
+    def __init__(self, dtype):
+        self.dtype = dtype
+        self.reserve = 0
+        self._data = numpy.empty(0, dtype)
+        self._start = 0
+        self._end = 0
+
+    def __len__(self):
+        return self._end - self._start
+
+    def append(self, values):
+        # Copies values onto the end of the buffer, returning a view of the
+        # newly-added samples
+        count = len(values)
+        if (self._end + count) > len(self._data):
+            self._reallocate(count)
+        start = self._end
+        self._end += count
+        view = self._data[start:self._end]
+        view[:] = values
+        return view
+
+    def read(self, count):
+        return self._data[self._start:self._start+count]
+
+    def consume(self, count):
+        self._start += count
+
+    def _reallocate(self, count):
+        # Size the new array to hold at least twice the queued data or the
+        # largest read size, whichever is larger, so that the cost of moving
+        # samples is amortized over many packets
+        queued = len(self)
+        capacity = 2 * max(queued + count, self.reserve)
+        data = numpy.empty(capacity, self.dtype)
+        data[:queued] = self._data[self._start:self._end]
+        self._data = data
+        self._start = 0
+        self._end = queued
+
+
 class BufferedInputStream(InputStream):
     """
     BulkIO input stream class with data buffering.
@@ -321,6 +449,12 @@ class BufferedInputStream(InputStream):
     read. This can be thought of as a separate read pointer that trails behind
     the stream's internal buffer.
 
+    When the input port delivers numpy arrays, queued samples are kept in a
+    single contiguous buffer. Reads, including those that span packets or
+    overlap the previous read, return views into this buffer, and consuming
+    data only advances the read pointer. The returned arrays remain valid
+    after subsequent reads.
+
     When an overlapped read needs to span multiple packets, but an SRI change,
     input queue flush, or end-of-stream is encountered, all of the available
     data is returned and consumed, equivalent to read with no consume length
@@ -355,7 +489,8 @@ class BufferedInputStream(InputStream):
             InPort.getStream
         """        
         InputStream.__init__(self, sri, port, blockType)
-        self.__queue = []
+        self.__queue = collections.deque()
+        self.__samples = None
         self.__samplesQueued = 0
         self.__sampleOffset = 0
         self.__pending = None
@@ -495,7 +630,8 @@ class BufferedInputStream(InputStream):
         # the stream
 
         # Clear queued packets and pending packet
-        self.__queue = []
+        self.__queue.clear()
+        self.__samples = None
         self.__sampleOffset = 0
         self.__samplesQueued = 0
         self.__pending = 0
@@ -531,6 +667,24 @@ class BufferedInputStream(InputStream):
         samples = len(self.__queue[0].buffer) - self.__sampleOffset;
         return self._readData(samples, samples)
 
+    def _readPackets(self, count, blocking):
+        if not self.__queue:
+            return InputStream._readPackets(self, count, blocking)
+
+        # Return the remainder of the buffered packets first
+        blocks = []
+        while self.__queue and (count is None or len(blocks) < count):
+            blocks.append(self._readPacket(blocking))
+
+        # Continue with any packets that are waiting in the port, as long as
+        # the end of the stream has not been reached
+        if not self.__queue and self._eosState == EOS_NONE:
+            if count is not None:
+                count -= len(blocks)
+            if count != 0:
+                blocks += InputStream._readPackets(self, count, False)
+        return blocks
+
     def _read(self, count, consume, blocking):
         # Consume length not specified, consume entire read
         if consume is None:
@@ -552,6 +706,11 @@ class BufferedInputStream(InputStream):
             count = count * 2
             consume = consume * 2
 
+        # Keep enough room in the sample buffer (if any) to satisfy reads of
+        # this size without reallocating
+        if self.__samples is not None:
+            self.__samples.reserve = max(self.__samples.reserve, count)
+
         # Queue up packets from the port until we have enough data to satisfy
         # the requested read amount
         while self.__samplesQueued < count:
@@ -586,6 +745,9 @@ class BufferedInputStream(InputStream):
         return self._readData(samples, consume)
 
     def _consumeData(self, count):
+        if self.__samples is not None:
+            self.__samples.consume(count)
+
         while count > 0:
             data = self.__queue[0].buffer
             data_len = len(data)
@@ -604,7 +766,7 @@ class BufferedInputStream(InputStream):
 
     def _consumePacket(self):
         # Acknowledge any end-of-stream flag and delete the packet
-        front = self.__queue.pop(0)
+        front = self.__queue.popleft()
         if front.EOS:
             self._eosState = EOS_REACHED
 
@@ -652,7 +814,12 @@ class BufferedInputStream(InputStream):
         # packets
         front = self.__queue[0]
 
-        data = type(front.buffer)()
+        # When the samples are stored contiguously, the data can be returned
+        # as a single view, and only the time stamps need to be calculated
+        if self.__samples is not None:
+            data = self.__samples.read(count)
+        else:
+            data = type(front.buffer)()
         time_stamps = []
         data_offset = 0
 
@@ -667,7 +834,8 @@ class BufferedInputStream(InputStream):
             nelem = min(available, count);
 
             # Append chunk to buffer and advance counters
-            data += packet.buffer[packet_offset:packet_offset+nelem]
+            if self.__samples is None:
+                data += packet.buffer[packet_offset:packet_offset+nelem]
             data_offset += nelem
             count -= nelem
 
@@ -727,7 +895,9 @@ class BufferedInputStream(InputStream):
             return False
 
     def _queuePacket(self, packet):
-        if packet.EOS and not packet.buffer:
+        # Check the length explicitly, because the truth value of a numpy
+        # array is ambiguous
+        if packet.EOS and len(packet.buffer) == 0:
             # Handle end-of-stream packet with no data (assuming that
             # timestamps, SRI changes, and queue flushes are irrelevant at this
             # point)
@@ -741,6 +911,19 @@ class BufferedInputStream(InputStream):
             # Let the caller know that no more sample data is forthcoming
             return False
         else:
+            if not self.__queue:
+                # Starting a new run of packets; if the data is in numpy
+                # arrays, store the samples contiguously
+                if numpy is not None and isinstance(packet.buffer, numpy.ndarray):
+                    if self.__samples is None or self.__samples.dtype != packet.buffer.dtype:
+                        self.__samples = _SampleBuffer(packet.buffer.dtype)
+                else:
+                    self.__samples = None
+            if self.__samples is not None:
+                # Replace the packet data with a view of the copy in the
+                # sample buffer
+                packet.buffer = self.__samples.append(packet.buffer)
+
             # Add the packet to the queue
             self.__samplesQueued += len(packet.buffer)
             self.__queue.append(packet);
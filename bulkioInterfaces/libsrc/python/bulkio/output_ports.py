@@ -23,10 +23,18 @@ import copy
 import time
 import sys
 import struct
+import array
 
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+from omniORB import CORBA
 from ossie.cf import CF, ExtendedCF
 from ossie.cf.CF import Port
 from ossie.utils import uuid
+from ossie.utils.notify import notification
 from ossie.properties import simple_property
 from ossie.utils.log4py import logging
 from redhawk.bitbuffer import bitbuffer
@@ -36,6 +44,10 @@ import bulkio.sri
 from bulkio import timestamp
 from bulkio.bulkioInterfaces import BULKIO, BULKIO__POA 
 from bulkio.const import MAX_TRANSFER_BYTES
+from bulkio.const import FANOUT_BLOCK, FANOUT_DROP_OLDEST, FANOUT_DROP_NEWEST
+from bulkio.fanout import FanoutDispatcher
+from bulkio import transport
+from bulkio.timer import TimerQueue
 from bulkio.output_streams import *
 import traceback
 
@@ -78,10 +90,11 @@ class connection_descriptor_struct(object):
 class OutPort(BULKIO__POA.UsesPortStatisticsProvider):
 
     class SriMapStruct:
-        def __init__( self, sri=None, connections=None, time=None): 
+        def __init__( self, sri=None, connections=None, time=None, fingerprint=None): 
             self.sri=sri
             self.connections = connections #set of connection ID strings that have received this SRI
             self.time=time
+            self.fingerprint=fingerprint #see OutPort.pushSRI
 
     def __init__(self, name, PortTypeClass, PortTransferType, logger=None, dataType=list, bits=0):
         # Backwards-compatibility: accept an element type string for use with
@@ -93,10 +106,16 @@ class OutPort(BULKIO__POA.UsesPortStatisticsProvider):
         self.PortType = PortTypeClass
         self.PortTransferType=PortTransferType
         self.outConnections = {} # key=connectionId,  value=port
+        self._transports = {} # key=connectionId, value=non-CORBA transport
         self.stats = OutStats(self.name, bits=bits)
         self.port_lock = threading.Lock()
         self.sriDict = {} # key=streamID  value=SriMapStruct
         self.filterTable = []
+        # Index of the connection filter: the set of (streamID, connectionID)
+        # routes for this port, and whether this port appears in the filter
+        # at all (if not, all streams go to all connections)
+        self._filterRoutes = set()
+        self._filterPortListed = False
 
         # Data type class
         self._dataType = dataType
@@ -112,14 +131,49 @@ class OutPort(BULKIO__POA.UsesPortStatisticsProvider):
 
         self._streams = {}
 
+        # Fan-out is disabled by default; when enabled, pushes to each
+        # connection are queued and sent from a pool of worker threads
+        self._fanout = None
+        self._fanoutPolicy = (FANOUT_BLOCK, 100)
+        self._fanoutPolicies = {} # key=connectionId, value=(policy, depth)
+        # Guards statistics updates made by the fan-out workers, which do not
+        # hold the port lock
+        self._statsLock = threading.Lock()
+
+        # Flow control: the last known congestion state of each connection;
+        # connections without a local transport are polled via the remote
+        # port's state, at most once per interval
+        self._congestion = {} # key=connectionId, value=bool
+        self._congestionPolled = {} # key=connectionId, value=time of last poll
+        self._congestionPollInterval = 0.1
+        self._congestionLock = threading.Lock()
+
+        # Buffered streams with a flush latency share a single timer thread,
+        # which is created on first use
+        self._flushTimer = None
+
         if self._portLog == None:
             self._portLog = logging.getLogger("redhawk.bulkio.outport."+name)
+        self.refreshLogLevel()
 
     def getLogger(self):
         return self._portLog
 
     def setLogger(self, logger):
         self._portLog = logger
+        self.refreshLogLevel()
+
+    def refreshLogLevel(self):
+        """
+        Updates the port's cached logging state.
+
+        To avoid the cost of formatting messages for every packet, the port
+        checks whether its logger is enabled for TRACE messages only when the
+        logger or log level changes. Resources call this method after changing
+        log levels via setLogLevel(); it must be called explicitly if the
+        level of the port's logger is changed by other means.
+        """
+        self._traceEnabled = bool(self._portLog) and self._portLog.isEnabledFor(logging.TRACE)
 
     def connectPort(self, connection, connectionId):
         if self._portLog:
@@ -143,14 +197,31 @@ class OutPort(BULKIO__POA.UsesPortStatisticsProvider):
 
         port = connection._narrow(self.PortType)
 
+        # Select a more efficient transport for co-located ports, if possible;
+        # this may involve remote calls, so it is done without the lock
+        port_transport = self._createTransport(connection, port)
+
         # Acquire the state lock before modifying the container
         with self.port_lock:
             # Prevent duplicate connection IDs
             if str(connectionId) in self.outConnections:
+                if port_transport:
+                    port_transport.disconnect()
                 raise Port.OccupiedPort()
 
             self.outConnections[str(connectionId)] = port
-            self.stats.add(connectionId)
+            if port_transport:
+                self._transports[str(connectionId)] = port_transport
+                if hasattr(port_transport, 'setCongestionListener'):
+                    port_transport.setCongestionListener(self._congestionListener(str(connectionId)))
+                if hasattr(port_transport, 'setFailureListener'):
+                    port_transport.setFailureListener(self._transportFailureListener(str(connectionId), port_transport))
+                if self._portLog:
+                    self._portLog.debug('bulkio::OutPort  CONNECTION:%s using %s transport', connectionId, port_transport.transportType)
+            with self._statsLock:
+                self.stats.add(connectionId)
+            if self._fanout:
+                self._fanout.addConnection(str(connectionId), *self._getFanoutPolicy(str(connectionId)))
 
             if self._portLog:
                 self._portLog.debug('bulkio::OutPort  CONNECT PORT:%s CONNECTION:%s', self.name, connectionId)
@@ -167,6 +238,12 @@ class OutPort(BULKIO__POA.UsesPortStatisticsProvider):
             if not port:
                 raise CF.Port.InvalidPort(2, 'No connection '+connectionId)
 
+            if self._fanout:
+                # Wait for any queued pushes to complete, so that end-of-stream
+                # is the last packet the connection receives
+                self._fanout.removeConnection(connectionId)
+
+            port = self._transports.get(connectionId, port)
             for stream_id in self.sriDict.iterkeys():
                 if not self._isStreamRoutedToConnection(stream_id, connectionId):
                     continue
@@ -177,7 +254,14 @@ class OutPort(BULKIO__POA.UsesPortStatisticsProvider):
                     if self._portLog:
                         self._portLog.error("PUSH-PACKET FAILED, PORT/CONNECTION: %s/%s , EXCEPTION: %s", self.name, connectionId, e)
 
-            self.stats.remove(connectionId)
+            port_transport = self._transports.pop(connectionId, None)
+            if port_transport:
+                port_transport.disconnect()
+            with self._statsLock:
+                self.stats.remove(connectionId)
+            with self._congestionLock:
+                self._congestion.pop(connectionId, None)
+                self._congestionPolled.pop(connectionId, None)
             for key in self.sriDict.keys():
                 # if connID exist in set, remove it, otherwise do nothing (that is what discard does)
                 self.sriDict[key].connections.discard(connectionId)
@@ -194,6 +278,280 @@ class OutPort(BULKIO__POA.UsesPortStatisticsProvider):
     def setBitSize(self, bitSize):
         self.stats.setBitSize(bitSize)
 
+    def setStatsWindow(self, window):
+        """
+        Sets the number of recent packets per connection used to compute the
+        port statistics.
+        """
+        with self.port_lock:
+            with self._statsLock:
+                self.stats.setHistoryWindow(window)
+
+    def setStatsSampling(self, count):
+        """
+        Records statistics for only every count-th packet per connection, to
+        reduce overhead at high packet rates. Data rates still account for
+        every packet.
+        """
+        with self.port_lock:
+            with self._statsLock:
+                self.stats.setSampling(count)
+
+    def enableFanout(self, threads=4, queueDepth=100, policy=FANOUT_BLOCK):
+        """
+        Enables parallel fan-out of pushes to connections.
+
+        Instead of pushing to each connection in turn from the caller's
+        thread, pushSRI() and pushPacket() add the push to a queue for each
+        connection, which is serviced by a bounded pool of worker threads. A
+        slow or unresponsive connection therefore does not delay delivery to
+        the other connections. Pushes to any one connection are always made
+        in order.
+
+        When a connection's queue is full, `policy` determines what happens
+        to a new data packet:
+            FANOUT_BLOCK        - the caller waits until there is space
+            FANOUT_DROP_OLDEST  - the oldest queued data packet is discarded
+            FANOUT_DROP_NEWEST  - the new data packet is discarded
+        SRI updates and end-of-stream packets are never discarded.
+
+        While fan-out is enabled, the data passed to pushPacket() must not be
+        modified after the call, because it may not have been sent yet. The
+        per-connection statistics report the average time from queueing to
+        completion of a push as the "averageLatency" keyword, and the number
+        of discarded packets as "packetsDropped".
+
+        Args:
+            threads:    Maximum number of worker threads.
+            queueDepth: Default maximum number of queued pushes per
+                        connection (negative for unbounded).
+            policy:     Default policy for full queues.
+
+        Raises:
+            ValueError: If `policy` is not a valid fan-out policy.
+        """
+        self._checkFanoutPolicy(policy)
+        with self.port_lock:
+            if self._fanout:
+                self._fanout.stop()
+            self._fanoutPolicy = (policy, queueDepth)
+            self._fanout = FanoutDispatcher(threads, self._portLog)
+            for connId in self.outConnections:
+                self._fanout.addConnection(connId, *self._getFanoutPolicy(connId))
+
+    def disableFanout(self):
+        """
+        Disables parallel fan-out, waiting for all queued pushes to complete.
+        """
+        with self.port_lock:
+            if self._fanout:
+                self._fanout.stop()
+                self._fanout = None
+
+    def fanoutEnabled(self):
+        """
+        Returns True if pushes are dispatched via parallel fan-out.
+        """
+        return self._fanout is not None
+
+    def setFanoutPolicy(self, connectionId, policy, queueDepth=None):
+        """
+        Overrides the fan-out queue policy for a single connection.
+
+        The override is kept if fan-out is disabled and enabled again, and
+        applies to a connection made later with the same ID.
+
+        Args:
+            connectionId: Connection identifier.
+            policy:       Policy for when the connection's queue is full.
+            queueDepth:   Maximum number of queued pushes for the connection
+                          (None for the port's default depth).
+
+        Raises:
+            ValueError: If `policy` is not a valid fan-out policy.
+        """
+        self._checkFanoutPolicy(policy)
+        with self.port_lock:
+            self._fanoutPolicies[connectionId] = (policy, queueDepth)
+            if self._fanout and connectionId in self.outConnections:
+                self._fanout.addConnection(connectionId, *self._getFanoutPolicy(connectionId))
+
+    def _checkFanoutPolicy(self, policy):
+        if policy not in (FANOUT_BLOCK, FANOUT_DROP_OLDEST, FANOUT_DROP_NEWEST):
+            raise ValueError("invalid fan-out policy '%s'" % (policy,))
+
+    def _getFanoutPolicy(self, connectionId):
+        default_policy, default_depth = self._fanoutPolicy
+        policy, depth = self._fanoutPolicies.get(connectionId, self._fanoutPolicy)
+        if depth is None:
+            depth = default_depth
+        return policy, depth
+
+    @notification
+    def congestionChanged(self, connectionId, congested):
+        """
+        The congestion state of a connection changed.
+
+        Args:
+            connectionId: Connection identifier.
+            congested:    True if the connection became congested.
+        """
+        pass
+
+    def addCongestionListener(self, callback):
+        """
+        Registers a callback for changes in the congestion state of the
+        connections (see congested()).
+
+        The callback is called with the connection ID and the new state. For
+        connections to input ports in the same process, it is called as soon
+        as the input port's queue crosses a watermark, which may be from
+        within a push; the callback must not push data on this port. For
+        other connections, changes are only detected by congested().
+
+        Args:
+            callback: Callable object that takes two arguments.
+        """
+        self.congestionChanged.addListener(callback)
+
+    def removeCongestionListener(self, callback):
+        """
+        Unregisters a callback for changes in congestion.
+
+        Args:
+            callback: Previous registered callable object.
+        """
+        self.congestionChanged.removeListener(callback)
+
+    def congested(self, connectionId):
+        """
+        Checks whether a connection is congested, so that the producer can
+        reduce its rate (e.g., by decimating or coalescing data) before the
+        receiver's queue overflows.
+
+        A connection is congested if its fan-out queue is full, or if the
+        input port has reached its high watermark (see
+        InPort.setWatermarks()). Input ports in the same process are checked
+        directly; other input ports are polled for their state, which is
+        BUSY when congested, at most once per poll interval.
+
+        Args:
+            connectionId: Connection identifier.
+
+        Returns:
+            bool: True if the connection is congested, False if it is not or
+                  there is no such connection.
+        """
+        # Avoids the port lock, so that it may be called from a congestion
+        # listener during a push
+        port = self.outConnections.get(connectionId, None)
+        if port is None:
+            return False
+
+        fanout = self._fanout
+        port_transport = self._transports.get(connectionId, None)
+        if fanout and fanout.full(connectionId):
+            congested = True
+        elif hasattr(port_transport, 'congested'):
+            congested = port_transport.congested()
+        else:
+            congested = self._pollCongestion(connectionId, port)
+        self._updateCongestion(connectionId, congested)
+        return congested
+
+    def setCongestionPollInterval(self, interval):
+        """
+        Sets the minimum time between queries of a remote input port's state
+        by congested().
+
+        Args:
+            interval: Time in seconds.
+        """
+        with self._congestionLock:
+            self._congestionPollInterval = float(interval)
+            self._congestionPolled = {}
+
+    def _pollCongestion(self, connectionId, port):
+        now = time.time()
+        with self._congestionLock:
+            last_poll = self._congestionPolled.get(connectionId, None)
+            if last_poll is not None and (now - last_poll) < self._congestionPollInterval:
+                return self._congestion.get(connectionId, False)
+            self._congestionPolled[connectionId] = now
+
+        # The remote call is made without any locks held
+        try:
+            return port._get_state() == BULKIO.BUSY
+        except Exception:
+            return False
+
+    def _congestionListener(self, connectionId):
+        def listener(congested):
+            self._updateCongestion(connectionId, congested)
+        return listener
+
+    def _transportFailureListener(self, connectionId, port_transport):
+        def listener(error):
+            self._transportFailed(connectionId, port_transport, error)
+        return listener
+
+    def _transportFailed(self, connectionId, port_transport, error):
+        # Called from the pushing thread, which holds the port lock unless it
+        # is a fan-out worker; in that case, the connection cannot be removed
+        # until its queue is drained, so the transport cannot be replaced
+        # concurrently
+        if self._transports.get(connectionId, None) is port_transport:
+            del self._transports[connectionId]
+        if self._portLog:
+            self._portLog.warn("bulkio::OutPort  CONNECTION:%s %s transport failed (%s), using CORBA",
+                               connectionId, port_transport.transportType, error)
+
+    def _updateCongestion(self, connectionId, congested):
+        with self._congestionLock:
+            changed = self._congestion.get(connectionId, False) != congested
+            self._congestion[connectionId] = congested
+        if changed:
+            self.congestionChanged(connectionId, congested)
+
+    def _streamCongested(self, streamID):
+        # Checks all of the connections that receive the stream, without the
+        # port lock (see congested())
+        for connection_id in self.outConnections.keys():
+            if self._isStreamRoutedToConnection(streamID, connection_id) and self.congested(connection_id):
+                return True
+        return False
+
+    def releasePort(self):
+        """
+        Releases the background resources held by this port, such as the
+        thread used for flush latency timers and the fan-out worker threads.
+
+        Called when the owning component is released. The port remains usable;
+        flush timers are created again on demand, but fan-out must be
+        re-enabled explicitly.
+        """
+        with self.port_lock:
+            timer = self._flushTimer
+            self._flushTimer = None
+        # Stop the timer without the port lock, because a flush that is in
+        # progress may need it to push data
+        if timer:
+            timer.stop()
+        # Any pushes still queued for fan-out are delivered before the workers
+        # exit
+        self.disableFanout()
+
+    def _scheduleFlush(self, when, func, *args):
+        # Runs func with args at time when on the port's shared timer thread,
+        # or sooner if the port is released
+        timer = self._flushTimer
+        if timer is None:
+            with self.port_lock:
+                if self._flushTimer is None:
+                    self._flushTimer = TimerQueue(self._portLog)
+                timer = self._flushTimer
+        timer.schedule(when, func, *args)
+
     def reportConnectionErrors(self, cid):
         retval=False
         if ( self.stats.connectionErrors(cid, 1) < 11 ): retval=True
@@ -213,17 +571,33 @@ class OutPort(BULKIO__POA.UsesPortStatisticsProvider):
         connectionStatus = []
         with self.port_lock:
             for id_, port in self.outConnections.items():
-                connectionStatus.append(ExtendedCF.ConnectionStatus(id_, port, True, 'CORBA', []))
+                port_transport = self._transports.get(id_, None)
+                if port_transport:
+                    connectionStatus.append(ExtendedCF.ConnectionStatus(id_, port, True, port_transport.transportType, port_transport.transportInfo()))
+                else:
+                    connectionStatus.append(ExtendedCF.ConnectionStatus(id_, port, True, 'CORBA', []))
         return connectionStatus
 
     def _get_statistics(self):
         self.port_lock.acquire()
         try:
-            recStat = self.stats.retrieve()
+            with self._statsLock:
+                recStat = self.stats.retrieve()
+            if recStat:
+                for entry in recStat:
+                    entry.statistics.keywords.extend(self._connectionKeywords(entry.connectionId))
         finally:
             self.port_lock.release()
         return recStat
 
+    def _connectionKeywords(self, connectionId):
+        # Prerequisite: caller holds self.port_lock
+        keywords = []
+        if self._fanout:
+            dropped = self._fanout.dropped(connectionId)
+            keywords.append(CF.DataType(id="packetsDropped", value=CORBA.Any(CORBA.TC_ulong, dropped)))
+        return keywords
+
     def _get_state(self):
         self.port_lock.acquire()
         try:
@@ -251,16 +625,39 @@ class OutPort(BULKIO__POA.UsesPortStatisticsProvider):
             if _filterTable == None :
                 _filterTable = []
             self.filterTable = _filterTable
+            self._updateFilterRoutes()
         finally:
             self.port_lock.release()
 
+    def _updateFilterRoutes(self):
+        # Prerequisite: caller holds self.port_lock
+        routes = set()
+        port_listed = False
+        for rule in self.filterTable:
+            if rule.port_name != self.name:
+                continue
+            port_listed = True
+            routes.add((rule.stream_id, rule.connection_id))
+        self._filterRoutes = routes
+        self._filterPortListed = port_listed
+
     def pushSRI(self, H):
         if self._portLog:
             self._portLog.trace('bulkio::OutPort pushSRI ENTER ')
 
+        # The stored copy is sent to late-joining connections and reported by
+        # _get_activeSRIs(), so it must also reflect keyword IDs, which
+        # compare() (and therefore the fingerprint) ignores
+        fingerprint = (bulkio.sri.fingerprint(H), tuple([dt.id for dt in H.keywords]))
         with self.port_lock:
-            sri = copy.deepcopy(H)
-            self.sriDict[H.streamID] = OutPort.SriMapStruct(sri=sri, connections=set()) 
+            # Re-pushing an unchanged SRI is common; reuse the existing copy
+            # rather than making a deep copy every time
+            current = self.sriDict.get(H.streamID, None)
+            if current is not None and current.fingerprint == fingerprint:
+                sri = current.sri
+            else:
+                sri = copy.deepcopy(H)
+            self.sriDict[H.streamID] = OutPort.SriMapStruct(sri=sri, connections=set(), fingerprint=fingerprint)
             if not H.streamID in self._streams:
                 self._streams[H.streamID] = self._createStream(sri)
 
@@ -268,11 +665,21 @@ class OutPort(BULKIO__POA.UsesPortStatisticsProvider):
                 if not self._isStreamRoutedToConnection(H.streamID, connId):
                     continue
 
+                port = self._transports.get(connId, port)
+                if self._fanout:
+                    # Queue a copy, in case the caller modifies the SRI before
+                    # it is pushed
+                    self._fanout.enqueue(connId, False, self._fanoutPushSRI, connId, port, sri)
+                    self.sriDict[H.streamID].connections.add(connId)
+                    continue
+
                 try:
                     port.pushSRI(H)
                     self.sriDict[H.streamID].connections.add(connId)
                 except Exception, e:
-                    if self.reportConnectionErrors(connId) :
+                    with self._statsLock:
+                        report = self.reportConnectionErrors(connId)
+                    if report:
                         if self._portLog:
                             self._portLog.error("PUSH-SRI FAILED, PORT/CONNECTION: %s/%s , EXCEPTION: %s", self.name, connId, str(e))
 
@@ -352,13 +759,17 @@ class OutPort(BULKIO__POA.UsesPortStatisticsProvider):
     def _pushPacket(self, data, T, EOS, streamID):
         # Prerequisite: caller holds self.port_lock
         packet_size = self._packetSize(data)
-        if self._portLog:
+        if self._traceEnabled:
             self._portLog.trace("_pushPacket() sending packet size=%d time=%s EOS=%s streamID='%s'", 
                               packet_size, T, EOS, streamID)
         
         for connId, port in self.outConnections.iteritems():
             if not self._isStreamRoutedToConnection(streamID, connId):
                 continue
+            port = self._transports.get(connId, port)
+            if self._fanout:
+                self._fanoutPacket(connId, port, data, T, EOS, streamID, packet_size)
+                continue
             try:
                 if connId not in self.sriDict[streamID].connections and packet_size == 0:
                     # connection is being closed but no data was ever sent, so ignore
@@ -366,10 +777,17 @@ class OutPort(BULKIO__POA.UsesPortStatisticsProvider):
                 if connId not in self.sriDict[streamID].connections:
                     port.pushSRI(self.sriDict[streamID].sri)
                     self.sriDict[streamID].connections.add(connId)
-                self._sendPacket(port, data, T, EOS, streamID)
-                self.stats.update(packet_size, 0, EOS, streamID, connId)
+                start = time.time()
+                self._sendToConnection(connId, port, data, T, EOS, streamID, self.sriDict[streamID].sri)
+                latency = time.time() - start
+                # The statistics have their own lock, because fan-out workers
+                # update them without the port lock
+                with self._statsLock:
+                    self.stats.update(packet_size, 0, EOS, streamID, connId, latency=latency)
             except Exception, e:
-                if self.reportConnectionErrors(connId)  :
+                with self._statsLock:
+                    report = self.reportConnectionErrors(connId)
+                if report:
                     if self._portLog:
                         self._portLog.exception("PUSH-PACKET FAILED, PORT/CONNECTION: %s/%s , EXCEPTION: %s", self.name, connId, str(e))
 
@@ -380,19 +798,67 @@ class OutPort(BULKIO__POA.UsesPortStatisticsProvider):
     def _sendPacket(self, port, data, T, EOS, streamID):
         port.pushPacket(data, T, EOS, streamID)
 
+    def _createTransport(self, connection, port):
+        """
+        Returns a transport to use instead of CORBA calls on `port`, or None.
+        """
+        # Input ports in the same process can be called directly
+        servant = transport.getLocalServant(connection)
+        if servant is not None:
+            return transport.LocalTransport(servant)
+        return self._negotiateTransport(connection, port)
+
+    def _negotiateTransport(self, connection, port):
+        # Only numeric ports support negotiated transports
+        return None
+
+    def _sendToConnection(self, connId, port, data, T, EOS, streamID, sri):
+        self._sendPacket(port, data, T, EOS, streamID)
+
+    def _fanoutPacket(self, connId, port, data, T, EOS, streamID, packet_size):
+        # Prerequisite: caller holds self.port_lock
+        sri = self.sriDict[streamID].sri
+        connections = self.sriDict[streamID].connections
+        if connId not in connections:
+            if packet_size == 0:
+                # connection is being closed but no data was ever sent, so ignore
+                return
+            self._fanout.enqueue(connId, False, self._fanoutPushSRI, connId, port, sri)
+            connections.add(connId)
+        # End-of-stream packets are never dropped
+        self._fanout.enqueue(connId, not EOS, self._fanoutPushPacket, connId, port, data, T, EOS, streamID, sri, packet_size, time.time())
+
+    def _fanoutPushSRI(self, connId, port, sri):
+        # Called from a fan-out worker thread, without the port lock
+        try:
+            port.pushSRI(sri)
+        except Exception, e:
+            with self._statsLock:
+                report = self.reportConnectionErrors(connId)
+            if report and self._portLog:
+                self._portLog.error("PUSH-SRI FAILED, PORT/CONNECTION: %s/%s , EXCEPTION: %s", self.name, connId, str(e))
+
+    def _fanoutPushPacket(self, connId, port, data, T, EOS, streamID, sri, packet_size, queued):
+        # Called from a fan-out worker thread, without the port lock
+        try:
+            self._sendToConnection(connId, port, data, T, EOS, streamID, sri)
+            latency = time.time() - queued
+            with self._statsLock:
+                self.stats.update(packet_size, self._fanout.pending(connId), EOS, streamID, connId, latency=latency)
+        except Exception, e:
+            with self._statsLock:
+                report = self.reportConnectionErrors(connId)
+            if report and self._portLog:
+                self._portLog.exception("PUSH-PACKET FAILED, PORT/CONNECTION: %s/%s , EXCEPTION: %s", self.name, connId, str(e))
+
     def _isStreamRoutedToConnection(self, streamID, connectionID):
-        port_listed = False
-        for rule in self.filterTable:
-            if rule.port_name != self.name:
-                continue
-            port_listed = True
-            if rule.stream_id == streamID and rule.connection_id == connectionID:
-                return True
-        return not port_listed
+        if not self._filterPortListed:
+            return True
+        return (streamID, connectionID) in self._filterRoutes
 
     def pushPacket(self, data, T, EOS, streamID):
         
-        if self._portLog:
+        if self._traceEnabled:
             self._portLog.trace('bulkio::OutPort  pushPacket ENTER ')
 
         if not self.sriDict.has_key(streamID):
@@ -404,7 +870,7 @@ class OutPort(BULKIO__POA.UsesPortStatisticsProvider):
             if EOS:
                 del self._streams[streamID]
 
-        if self._portLog:
+        if self._traceEnabled:
             self._portLog.trace('bulkio::OutPort  pushPacket EXIT ')
 
     def _reformat(self, data):
@@ -413,31 +879,172 @@ class OutPort(BULKIO__POA.UsesPortStatisticsProvider):
     def _packetSize(self, data):
         return len(data)
 
+class _AdaptivePushSize(object):
+    """
+    Chooses the push size for a single connection based on the observed
+    transport behavior.
+
+    The size starts at the port's static limit. After a window of full-size
+    pushes at the current size, the measured rate (elements per second) is
+    compared to the best rate seen so far: if larger sizes keep improving
+    the rate, the size doubles up to the maximum; otherwise, it settles at
+    the best size, and probes again after a number of windows, in case the
+    conditions have changed. A CORBA.MARSHAL exception means that the
+    transport rejected the size, which then becomes the new upper bound.
+    """
+    # Number of full-size pushes to measure before adjusting the size
+    WINDOW = 8
+    # Number of windows to stay at the best size before probing again
+    SETTLE_WINDOWS = 16
+
+    def __init__(self, initial, maximum):
+        self.size = min(initial, maximum)
+        self.maximum = maximum
+        self._bestSize = self.size
+        self._bestRate = 0.0
+        # Start probing after the first window
+        self._settled = self.SETTLE_WINDOWS - 1
+        self._resetWindow()
+
+    def _resetWindow(self):
+        self._pushes = 0
+        self._elements = 0
+        self._elapsed = 0.0
+
+    def record(self, elements, elapsed):
+        # Pushes smaller than the current size (i.e., the end of a packet)
+        # say nothing about how well the size works
+        if elements < self.size:
+            return
+        self._pushes += 1
+        self._elements += elements
+        self._elapsed += elapsed
+        if self._pushes < self.WINDOW:
+            return
+
+        rate = self._elements / max(self._elapsed, 1e-9)
+        self._resetWindow()
+        if self.size == self._bestSize:
+            # Track the current rate at the best size, and periodically check
+            # whether a larger size does better
+            self._bestRate = rate
+            self._settled += 1
+            if self._settled >= self.SETTLE_WINDOWS:
+                self._probe()
+        elif rate > self._bestRate:
+            # Larger size is an improvement, keep going
+            self._bestSize = self.size
+            self._bestRate = rate
+            self._probe()
+        else:
+            # Larger size did not help, go back
+            self.size = self._bestSize
+            self._settled = 0
+
+    def reject(self, size):
+        # The transport could not handle a push of `size` elements; never try
+        # anything that large again
+        self.maximum = max(size / 2, 1)
+        self.size = min(self.size, self.maximum)
+        self._bestSize = min(self._bestSize, self.maximum)
+        self._bestRate = 0.0
+        self._settled = 0
+        self._resetWindow()
+
+    def _probe(self):
+        self._settled = 0
+        if self.size < self.maximum:
+            self.size = min(self.size * 2, self.maximum)
+
+
 class OutNumericPort(OutPort):
     def __init__(self, *args, **kwargs):
         elemType = kwargs.pop('elemType', int)
         OutPort.__init__(self, *args, **kwargs)
         self._elemType = elemType
 
+        # Adaptive push size is disabled by default
+        self._adaptivePush = False
+        self._maxAdaptiveSamples = self.maxSamplesPerPush
+        self._pushSizes = {} # key=connectionId, value=_AdaptivePushSize
+
+    def enableAdaptivePush(self, enabled, maxTransferBytes=MAX_TRANSFER_BYTES):
+        """
+        Enables or disables adaptive push sizes.
+
+        By default, packets larger than maxSamplesPerPush are split into
+        fixed-size sub-packets. With adaptive push sizes enabled, the port
+        tracks the size and duration of successful pushes to each connection
+        and picks the sub-packet size that gives the highest throughput,
+        probing sizes up to `maxTransferBytes`. If the transport rejects a
+        push with CORBA.MARSHAL, the sub-packet is split further and the
+        connection's size is reduced. The size currently in use is reported
+        in the port statistics as the "maxSamplesPerPush" keyword.
+
+        Args:
+            enabled:          True to enable adaptive push sizes.
+            maxTransferBytes: Largest push, in bytes, to try. This should
+                              match the ORB's configured giopMaxMsgSize.
+        """
+        with self.port_lock:
+            self._adaptivePush = enabled
+            # Leave some margin for the CORBA header, as with the static limit
+            self._maxAdaptiveSamples = 8 * int(maxTransferBytes*.9) / self._bitSize
+            self._pushSizes = {}
+
+    def _negotiateTransport(self, connection, port):
+        return transport.negotiateShmTransport(connection, port, self.PortTransferType, self._portLog)
+
+    def adaptivePushEnabled(self):
+        """
+        Returns True if the push size is chosen per-connection.
+        """
+        return self._adaptivePush
+
+    def disconnectPort(self, connectionId):
+        OutPort.disconnectPort(self, connectionId)
+        with self.port_lock:
+            self._pushSizes.pop(connectionId, None)
+
     def _pushPacket(self, data, T, EOS, streamID):
+        # With adaptive push sizes, only split packets that are larger than
+        # any connection could accept; each connection further divides the
+        # packet as needed
+        if self._adaptivePush:
+            max_samples = self._maxAdaptiveSamples
+        else:
+            max_samples = self.maxSamplesPerPush
+
         # If there is no need to break data into smaller packets, skip straight
         # to the pushPacket call and return.
         elements = len(data)
-        if elements <= self.maxSamplesPerPush:
+        if elements <= max_samples:
             return OutPort._pushPacket(self, data, T, EOS, streamID);
 
         sri = self.sriDict[streamID].sri
+        for start, end, packetTime, packetEOS in self._splitPacket(data, T, EOS, sri, max_samples):
+            # Push the current slice of the input data
+            OutPort._pushPacket(self, data[start:end], packetTime, packetEOS, streamID);
 
+    def _splitPacket(self, data, T, EOS, sri, max_samples):
+        """
+        Generates the (start, end, time, EOS) for each sub-packet of `data`
+        with at most `max_samples` elements.
+        """
         # Quantize the push size (in terms of scalars) to the nearest frame,
         # which takes both the complex mode and subsize into account
         item_size = 2 if sri.mode else 1
-        frame_size = item_size
-        if sri.subsize > 0:
-            frame_size *= sri.subsize
-        max_samples = int(self.maxSamplesPerPush/frame_size) * frame_size
+        frame_size = self._frameSize(sri)
+        max_samples = max(int(max_samples/frame_size), 1) * frame_size
 
-        # Intialize time for the first subpacket
+        # Intialize time for the first subpacket; subsequent times are
+        # advanced in place and only converted to a PrecisionUTCTime for the
+        # push
         packetTime = T
+        if T.tcstatus == BULKIO.TCS_VALID:
+            nextTime = timestamp.UTCTime.fromPrecisionUTCTime(T)
+        else:
+            nextTime = None
 
         # Push sub-packets max_samples at a time
         count = len(data)
@@ -454,37 +1061,103 @@ class OutNumericPort(OutPort):
             else:
                 packetEOS = False
 
-            # Push the current slice of the input data
-            OutPort._pushPacket(self, data[start:end], packetTime, packetEOS, streamID);
+            yield start, end, packetTime, packetEOS
 
             # Synthesize the next packet timestamp
-            if packetTime.tcstatus == BULKIO.TCS_VALID:
-                push_size = min(end, count) - start
-                packetTime = packetTime + (push_size/item_size) * sri.xdelta
+            if nextTime is not None and end < count:
+                nextTime += ((end - start)/item_size) * sri.xdelta
+                packetTime = nextTime.toPrecisionUTCTime()
+
+    def _frameSize(self, sri):
+        frame_size = 2 if sri.mode else 1
+        if sri.subsize > 0:
+            frame_size *= sri.subsize
+        return frame_size
+
+    def _sendToConnection(self, connId, port, data, T, EOS, streamID, sri):
+        count = len(data)
+        if not self._adaptivePush or count == 0:
+            return self._sendPacket(port, data, T, EOS, streamID)
+
+        push_size = self._pushSizes.get(connId, None)
+        if push_size is None:
+            push_size = _AdaptivePushSize(self.maxSamplesPerPush, self._maxAdaptiveSamples)
+            self._pushSizes[connId] = push_size
+
+        for start, end, packetTime, packetEOS in self._splitPacket(data, T, EOS, sri, push_size.size):
+            if start == 0 and end >= count:
+                packet = data
+            else:
+                packet = data[start:end]
+            elements = len(packet)
+            begin = time.time()
+            try:
+                self._sendPacket(port, packet, packetTime, packetEOS, streamID)
+            except CORBA.MARSHAL:
+                if elements <= self._frameSize(sri):
+                    # Cannot split any further
+                    raise
+                if self._portLog:
+                    self._portLog.debug("Push of %d elements to connection '%s' failed, reducing push size", elements, connId)
+                push_size.reject(elements)
+                # Send the remainder of the packet with the reduced size
+                return self._sendToConnection(connId, port, data[start:], packetTime, EOS, streamID, sri)
+            push_size.record(elements, time.time() - begin)
+
+    def _connectionKeywords(self, connectionId):
+        keywords = OutPort._connectionKeywords(self, connectionId)
+        push_size = self._pushSizes.get(connectionId, None)
+        if self._adaptivePush and push_size:
+            keywords.append(CF.DataType(id="maxSamplesPerPush", value=CORBA.Any(CORBA.TC_ulong, push_size.size)))
+        return keywords
 
     def _createStream(self, sri):
         return NumericOutputStream(sri, self, self._dataType, self._elemType)
 
+    def _reformat(self, data):
+        if numpy is not None and isinstance(data, numpy.ndarray):
+            # CORBA sequences must be lists; convert to the port's element
+            # type first so that the values are in range
+            return numpy.asarray(data, dtype=self.PortTransferType).tolist()
+        return data
+
 
-class OutCharPort(OutNumericPort):
-    TRANSFER_TYPE = 'c'
-    def __init__(self, name, logger=None):
-        OutNumericPort.__init__(self, name, BULKIO.dataChar, OutCharPort.TRANSFER_TYPE, logger, dataType=str, bits=8)
+class OutBytePort(OutNumericPort):
+    """
+    Common implementation for char and octet output ports, which send their
+    data as binary strings.
+    """
+    # Element type code (as used by array and numpy) for the port's data
+    ELEMENT_TYPE = None
 
     def _reformat(self, data):
         if isinstance(data, basestring):
             return data
-        return struct.pack('%db' % len(data), *data)
+        elif isinstance(data, (bytearray, buffer)):
+            # Binary data is sent as-is, with a single copy
+            return str(data)
+        elif isinstance(data, memoryview):
+            return data.tobytes()
+        elif numpy is not None and isinstance(data, numpy.ndarray):
+            if data.dtype.itemsize == 1 and data.dtype.kind in 'iub':
+                # Any 1-byte integer array can be sent without conversion
+                return data.tostring()
+            return data.astype(self.ELEMENT_TYPE).tostring()
+        # Pack the values in a single pass in C, without building an argument
+        # tuple
+        return array.array(self.ELEMENT_TYPE, data).tostring()
+
+class OutCharPort(OutBytePort):
+    TRANSFER_TYPE = 'c'
+    ELEMENT_TYPE = 'b'
+    def __init__(self, name, logger=None):
+        OutBytePort.__init__(self, name, BULKIO.dataChar, OutCharPort.TRANSFER_TYPE, logger, dataType=str, bits=8)
 
-class OutOctetPort(OutNumericPort):
+class OutOctetPort(OutBytePort):
     TRANSFER_TYPE = 'B'
+    ELEMENT_TYPE = 'B'
     def __init__(self, name, logger=None):
-        OutNumericPort.__init__(self, name, BULKIO.dataOctet, OutOctetPort.TRANSFER_TYPE, logger, dataType=str, bits=8)
-
-    def _reformat(self, data):
-        if isinstance(data, basestring):
-            return data
-        return struct.pack('%dB' % len(data), *data)
+        OutBytePort.__init__(self, name, BULKIO.dataOctet, OutOctetPort.TRANSFER_TYPE, logger, dataType=str, bits=8)
 
 class OutShortPort(OutNumericPort):
     TRANSFER_TYPE = 'h'
@@ -536,6 +1209,10 @@ class OutBitPort(OutNumericPort):
         data = BULKIO.BitSequence(data.bytes(), len(data))
         port.pushPacket(data, T, EOS, streamID)
 
+    def _negotiateTransport(self, connection, port):
+        # The shared memory transport does not support bit data
+        return None
+
     def _reformat(self, data):
         return bitbuffer(data)
 
@@ -597,51 +1274,83 @@ class OutAttachablePort(OutPort):
             self.streamDef=streamDef
             self.name = name
             self.streamId=streamId
-            self.streamAttachments=streamAttachments[:]
             self.sri=sri
             self.time=time
             self.port = port
             self._s_logger=None
+            # Attachments are indexed by connection ID (a stream has at most
+            # one attachment per connection) and by attachment ID. When the
+            # stream belongs to a container, the container's port-wide indices
+            # are kept up to date as well.
+            self._container = None
+            self._connections = {}
+            self._attachIds = {}
+            for att in streamAttachments:
+                self._addAttachment(att)
+
+        @property
+        def streamAttachments(self):
+            return self._connections.values()
+
+        def _addAttachment(self, att):
+            previous = self._connections.get(att.connectionId, None)
+            if previous is not None:
+                self._removeAttachment(previous)
+            att.stream = self
+            self._connections[att.connectionId] = att
+            self._attachIds.setdefault(att.attachId, set()).add(att)
+            if self._container:
+                self._container._indexAttachment(att)
+
+        def _removeAttachment(self, att):
+            if self._connections.get(att.connectionId, None) is att:
+                del self._connections[att.connectionId]
+            attachments = self._attachIds.get(att.attachId, None)
+            if attachments is not None:
+                attachments.discard(att)
+                if not attachments:
+                    del self._attachIds[att.attachId]
+            if self._container:
+                self._container._unindexAttachment(att)
+
+        def _detachAttachment(self, att):
+            att.detach()
+            self._removeAttachment(att)
 
         def detachAll(self):
-            for att in list(self.streamAttachments):
-                att.detach()
-                self.streamAttachments.remove(att)
+            for att in self._connections.values():
+                self._detachAttachment(att)
 
         def detachByConnectionId(self, connectionId):
-            for att in list(self.streamAttachments):
-                if att.connectionId == connectionId and att.inputPort and att.attachId:
-                    att.detach()
-                    self.streamAttachments.remove(att)
+            att = self._connections.get(connectionId, None)
+            if att and att.inputPort and att.attachId:
+                self._detachAttachment(att)
 
         def detachByAttachId(self, attachId):
-            for att in list(self.streamAttachments):
-                if att.attachId and att.inputPort and att.attachId == attachId:
-                    att.detach()
-                    self.streamAttachments.remove(att)
+            if not attachId:
+                return
+            for att in list(self._attachIds.get(attachId, ())):
+                if att.inputPort:
+                    self._detachAttachment(att)
 
-        def detachByAttachIdConnectionId(self, connectionId):
-            for att in list(self.streamAttachments):
-                if att.attachId and att.inputPort and att.attachId == attachId and att.connectionId == connectionId:
-                    att.detach()
-                    self.streamAttachments.remove(att)
+        def detachByAttachIdConnectionId(self, attachId, connectionId):
+            att = self._connections.get(connectionId, None)
+            if att and att.inputPort and att.attachId and att.attachId == attachId:
+                self._detachAttachment(att)
 
         def createNewAttachment(self,connectionId, port):
             newAttachment = OutAttachablePort.StreamAttachment(connectionId=connectionId, attachId=None, inputPort=port, inStream=self)
             newAttachment.setLogger(self._s_logger)
             try:
                 newAttachment.attachId = port.attach(self.streamDef, self.name)
-                self.streamAttachments.append(newAttachment)
+                self._addAttachment(newAttachment)
             except Exception, e:
                 if self._s_logger:
                     self._s_logger.trace( "ATTACH FAILURE, CONNECTION/STREAM %s/%s , EXCEPTION: %s" , connectionId, self.streamDef.id, str(e))
                 raise
  
         def hasConnectionId(self, connectionId):
-            for att in list(self.streamAttachments):
-                if att.connectionId == connectionId:
-                    return True 
-            return False
+            return connectionId in self._connections
 
         def getPort(self):
             return self.port
@@ -651,63 +1360,64 @@ class OutAttachablePort(OutPort):
 
         def setLogger(self, inlogger):
             self._s_logger=inlogger
-            for att in self.streamAttachments:
+            for att in self._connections.itervalues():
                 att.setLogger(inlogger)
 
         def getConnectionIds(self):
-            connectionIds = []
-            for att in list(self.streamAttachments):
-                connectionIds.append(att.connectionId)
-            return connectionIds 
+            return self._connections.keys()
 
         def updateAttachments(self, expectedAttachments):
-            expectedConnectionIds = []
+            expectedConnectionIds = set()
             # Add new attachments that do not already exist
             for att in expectedAttachments:
                 if not self.hasConnectionId(att.connectionId):
                     self.createNewAttachment(att.connectionId, att.inputPort)
-                expectedConnectionIds.append(att.connectionId)
-
-            # Iterate through attachments and compare to expected connectionIds
-            connectionsToRemove = []
-            for att in self.streamAttachments:
-                existingConnectionId = att.connectionId
-                detachConnection = True
-                for connId in expectedConnectionIds:
-                    if existingConnectionId == connId:
-                        detachConnection = False
-                        break
-                if detachConnection == True:
-                    # Store off and apply detach outside of this loop
-                    # Removing now will mess up iterator
-                    connectionsToRemove.append(existingConnectionId)
-                    
-            for connId in connectionsToRemove:
-                self.detachByConnectionId(connId)
-            
-        def detachAll(self):
-            for att in list(self.streamAttachments):
-                att.detach()
-                self.streamAttachments.remove(att)
+                expectedConnectionIds.add(att.connectionId)
+
+            # Detach any existing connections that are no longer expected
+            for connId in self._connections.keys():
+                if connId not in expectedConnectionIds:
+                    self.detachByConnectionId(connId)
 
 
     class StreamContainer:
         def __init__(self, streams=None):
-            if streams == None:
-                self.streams = []
-            else:
-               self.streams = streams
+            # Streams are indexed by stream ID; attachments across all streams
+            # are indexed by attachment ID and connection ID, so that lookups
+            # and detaches do not have to scan every stream
+            self._streams = {}
+            self._attachIds = {}
+            self._connections = {}
             self._sc_logger = None
+            if streams:
+                for stream in streams:
+                    self.addStream(stream)
+
+        @property
+        def streams(self):
+            return self._streams.values()
+
+        def _indexAttachment(self, att):
+            self._attachIds.setdefault(att.attachId, set()).add(att)
+            self._connections.setdefault(att.connectionId, set()).add(att)
+
+        def _unindexAttachment(self, att):
+            for index, key in ((self._attachIds, att.attachId), (self._connections, att.connectionId)):
+                attachments = index.get(key, None)
+                if attachments is not None:
+                    attachments.discard(att)
+                    if not attachments:
+                        del index[key]
 
         def printState(self, title):
-            if self._sc_logger:
-                self._sc_logger.debug(title)
-            for stream in self.streams:
+            if not self._sc_logger or not self._sc_logger.isEnabledFor(logging.DEBUG):
+                return
+            self._sc_logger.debug(title)
+            for stream in self._streams.itervalues():
                 self.printBlock("Stream", stream.streamId,0)
                 for att in stream.streamAttachments:
                     self.printBlock("Attachment",att.attachId,1)
-            if self._sc_logger:
-                self._sc_logger.debug("")
+            self._sc_logger.debug("")
 
         def printBlock(self, title, id, indents):
             indent = ""
@@ -722,109 +1432,99 @@ class OutAttachablePort(OutPort):
                 self._sc_logger.debug(indent + " |" + line)
 
         def hasStreams(self):
-            if len(self.streams) > 0:
-                return True
-            else:
-                return False
+            return len(self._streams) > 0
 
         def hasStreamId(self, streamId):
-            for stream in self.streams:
-                if stream.streamId == streamId:
-                    return True
-            return False
+            return streamId in self._streams
 
         def getStreamIds(self):
-            streamIds = []
-            for stream in self.streams:
-                streamIds.append(stream.streamId)
-            return streamIds
+            return self._streams.keys()
 
         def addConnectionToAllStreams(self, connectionId, port):
-            for stream in self.streams:
+            for stream in self._streams.itervalues():
                 if not stream.hasConnectionId(connectionId):
                     stream.createNewAttachment(connectionId, port)
 
         def addConnectionToStream(self, connectionId, port, streamId):
-            for stream in self.streams:
-                if stream.streamId == streamId:
-                    if not stream.hasConnectionId(connectionId):
-                        stream.createNewAttachment(connectionId, port)
+            stream = self._streams.get(streamId, None)
+            if stream and not stream.hasConnectionId(connectionId):
+                stream.createNewAttachment(connectionId, port)
 
         def updateSRIForAllStreams(self, currentSRIs):
-            for stream in self.streams:
+            for stream in self._streams.itervalues():
                 if currentSRIs.has_key(stream.streamId):
                     stream.sri = currentSRIs[stream.streamId].sri
                     stream.time = currentSRIs[stream.streamId].time
 
         def updateStreamSRI(self, streamId, sri):
-            for stream in self.streams:
-                if stream.streamId == streamId:
-                    stream.sri = sri
+            stream = self._streams.get(streamId, None)
+            if stream:
+                stream.sri = sri
 
         def updateStreamTime(self, streamId, time):
-            for stream in self.streams:
-                if stream.streamId == streamId:
-                    stream.time = time
+            stream = self._streams.get(streamId, None)
+            if stream:
+                stream.time = time
 
         def updateStreamSRIAndTime(self, streamId, sri, time):
-            for stream in self.streams:
-                if stream.streamId == streamId:
-                    stream.sri = sri
-                    stream.time = time
+            stream = self._streams.get(streamId, None)
+            if stream:
+                stream.sri = sri
+                stream.time = time
 
         def addStream(self, stream):
-            self.streams.append(stream)
+            previous = self._streams.get(stream.streamId, None)
+            if previous is not None:
+                self._removeStream(previous)
+            self._streams[stream.streamId] = stream
+            stream._container = self
+            for att in stream.streamAttachments:
+                self._indexAttachment(att)
+
+        def _removeStream(self, stream):
+            del self._streams[stream.streamId]
+            for att in stream.streamAttachments:
+                self._unindexAttachment(att)
+            stream._container = None
 
         def removeStreamByStreamId(self, streamId):
-            for s in list(self.streams):
-                if s.streamId == streamId:
-                   s.detachAll()
-                   self.streams.remove(s)
+            stream = self._streams.get(streamId, None)
+            if stream:
+                stream.detachAll()
+                self._removeStream(stream)
 
         def findByStreamId(self, streamId):
-            for s in self.streams:
-                if s.streamId == streamId:
-                    return s
-            return None            
+            return self._streams.get(streamId, None)
 
         def detachByAttachIdConnectionId(self, attachId=None, connectionId=None):
-            for stream in self.streams:
-                for atts in list(stream.streamAttachments):
-                    if atts.connectionId == connectionId and atts.inputPort and atts.attachId and atts.attachId == attachId:
-                        atts.detach()
-                        stream.streamAttachments.remove(atts)
+            for att in list(self._attachIds.get(attachId, ())):
+                if att.connectionId == connectionId and att.inputPort and att.attachId:
+                    att.stream._detachAttachment(att)
 
         def detachAllStreams(self):
-            for stream in self.streams:
-                for atts in list(stream.streamAttachments):
-                    if atts.inputPort and atts.attachId:
-                        atts.detach()
-                        stream.streamAttachments.remove(atts)
+            for stream in self._streams.itervalues():
+                for att in stream.streamAttachments:
+                    if att.inputPort and att.attachId:
+                        stream._detachAttachment(att)
 
         def detachByConnectionId(self, connectionId=None):
-            for stream in self.streams:
-                for atts in list(stream.streamAttachments):
-                    if atts.connectionId == connectionId and atts.inputPort and atts.attachId:
-                        atts.detach()
-                        stream.streamAttachments.remove(atts)
+            for att in list(self._connections.get(connectionId, ())):
+                if att.inputPort and att.attachId:
+                    att.stream._detachAttachment(att)
 
         def detachByAttachId(self, attachId=None):
-            for stream in self.streams:
-                for atts in list(stream.streamAttachments):
-                    if atts.attachId and atts.attachId == attachId and atts.inputPort:
-                        atts.detach()
+            if not attachId:
+                return
+            for att in list(self._attachIds.get(attachId, ())):
+                if att.inputPort:
+                    att.stream._detachAttachment(att)
 
         def findStreamAttachmentsByAttachId(self, attachId):
-            attachList = []
-            for stream in self.streams:
-                for att in stream.streamAttachments:
-                    if att.attachId == attachId:
-                        attachList.append(att)    
-            return attachList
+            return list(self._attachIds.get(attachId, ()))
 
         def setLogger(self, inlogger):
             self._sc_logger = inlogger
-            for stream in self.streams:
+            for stream in self._streams.itervalues():
                 stream.setLogger(inlogger)
 
 
@@ -844,12 +1544,18 @@ class OutAttachablePort(OutPort):
     
     def setLogger(self, in_logger):
         self._portLog = in_logger;
+        self.refreshLogLevel()
         self.streamContainer.setLogger(in_logger)
 
+    def _createTransport(self, connection, port):
+        # Attach, detach and SRI calls always go through the CORBA reference,
+        # so there is no use for an alternate transport
+        return None
+
     def _get_state(self):
         self.port_lock.acquire()
         try:
-            numberAttachedStreams = len(self._attachedStreams.values())
+            numberAttachedStreams = len(self.streamContainer.streams)
         finally:
             self.port_lock.release()
         if numberAttachedStreams == 0:
@@ -861,25 +1567,18 @@ class OutAttachablePort(OutPort):
         return self._get_activeSRIs()
 
     def attachedStreams(self):
-        streams = []
-        for stream in self.streamContainer.streams:
-            streams.append(stream.streamDef)
-        return streams 
+        return [stream.streamDef for stream in self.streamContainer.streams]
 
-    def attachmentIds(self):
+    def attachmentIds(self, streamId=None):
+        if streamId is None:
+            streams = self.streamContainer.streams
+        else:
+            stream = self.streamContainer.findByStreamId(streamId)
+            streams = [stream] if stream else []
         ids = []
-        for stream in self.streamContainer.streams:
+        for stream in streams:
             for atts in stream.streamAttachments:
                 ids.append(atts.attachId)
-        return ids 
-
-    def attachmentIds(self,streamId):
-        ids = []
-        for stream in self.streamContainer.streams:
-            if stream.streamId == streamId:
-                for atts in stream.streamAttachments:
-                    ids.append(atts.attachId)
-                break
         return ids
 
     def connectPort(self, connection, connectionId):
@@ -944,19 +1643,14 @@ class OutAttachablePort(OutPort):
         self.port_lock.acquire()
         try:
             if connectionId:
-                for stream in self.streamContainer.streams:
-                    stream.detachByConnectionId(connectionId)
+                self.streamContainer.detachByConnectionId(connectionId)
 
             if attachId:
-                for stream in self.streamContainer.streams:
-                    for atts in list(stream.streamAttachments):
-                        if atts.attachId == attachId:
-                            atts.detach(attachId)
-                            stream.streamAttachments.pop(atts)
+                self.streamContainer.detachByAttachId(attachId)
 
             if not attachId and not connectionId:
                 for stream in self.streamContainer.streams:
-                    for atts in list(stream.streamAttachments):
+                    for atts in stream.streamAttachments:
                         atts.detach()
                 self.streamContainer = OutAttachablePort.StreamContainer()
                 self.streamContainer.setLogger(self._portLog)
@@ -974,13 +1668,15 @@ class OutAttachablePort(OutPort):
         return ""
 
     def updateStream(self, streamData):
-        self.port_lock.acquire()
         streamId = streamData.id
-        if (not self.streamContainer.hasStreamId(streamId)):
-            return False;
+        self.port_lock.acquire()
+        try:
+            if (not self.streamContainer.hasStreamId(streamId)):
+                return False;
 
-        self.streamContainer.removeStreamByStreamId(streamId)
-        self.port_lock.release()
+            self.streamContainer.removeStreamByStreamId(streamId)
+        finally:
+            self.port_lock.release()
         return self.addStream(streamData)
 
 
@@ -1006,7 +1702,7 @@ class OutAttachablePort(OutPort):
                     if ftPtr.port_name == self.name:
                         portListed = True
 
-                    if (ftPtr.port_name == self.name) and (ftPtr.connection_id == connId) and (ftPtr.stream_id == stream.streamId):
+                    if (ftPtr.port_name == self.name) and (ftPtr.connection_id == connId) and (ftPtr.stream_id == stream.streamId) and not stream.hasConnectionId(connId):
                         try:
                            if self.sriDict.has_key(stream.streamId):
                               sriMap = self.sriDict[stream.streamId]
@@ -1039,7 +1735,7 @@ class OutAttachablePort(OutPort):
         for atts in stream.streamAttachments:
             ids.append(atts.attachId)
             if self._portLog:
-                self._portLog.debug("bulkio.OutAttachablePort addStream()  PORT, ATTACH COMPLETED ID " + str(atts.attachId) + " CONNECTION ID:" + str(atts.connectionId))
+                self._portLog.debug("bulkio.OutAttachablePort addStream()  PORT, ATTACH COMPLETED ID %s CONNECTION ID:%s", atts.attachId, atts.connectionId)
 
         if self._portLog:
             self._portLog.trace("bulkio::OutAttachablePort, addStream EXIT ")
@@ -1052,20 +1748,12 @@ class OutAttachablePort(OutPort):
         self.streamContainer.printState("After removeStream")
 
     def getStreamDefinition(self, attachId):
-        streamDefList = []
-        for stream in self.streamContainer.streams:
-            for atts in stream.streamAttachments:
-                if atts.attachId == attachId:
-                    streamDefList.append(stream.streamDef)
-        return streamDefList 
+        attachments = self.streamContainer.findStreamAttachmentsByAttachId(attachId)
+        return [atts.stream.streamDef for atts in attachments]
 
     def getUser(self, attachId):
-        nameList = []
-        for stream in self.streamContainer.streams:
-            for atts in stream.streamAttachments:
-                if atts.attachId == attachId:
-                    nameList.append(stream.name)
-        return nameList 
+        attachments = self.streamContainer.findStreamAttachmentsByAttachId(attachId)
+        return [atts.stream.name for atts in attachments]
     
     def pushSRI(self, H, T):
         if self._portLog:
@@ -19,6 +19,13 @@
 #
 
 import copy
+import threading
+import time as _time
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
 
 from ossie.cf import CF
 from redhawk.bitbuffer import bitbuffer
@@ -182,6 +189,19 @@ class OutputStream(StreamBase):
         self._modifyingStreamMetadata()
         bulkio.sri.eraseKeyword(self._sri, name)
 
+    def congested(self):
+        """
+        Checks whether any connection that receives this stream is congested.
+
+        Producers can use this to reduce their rate (e.g., by decimating or
+        coalescing data) before a receiver's queue overflows. See
+        OutPort.congested().
+
+        Returns:
+            bool: True if at least one connection is congested.
+        """
+        return self._port._streamCongested(self.streamID)
+
     def close(self):
         """
         Closes this stream.
@@ -211,6 +231,94 @@ class OutputStream(StreamBase):
         self.__sriModified = True
 
 
+class _SampleBuffer(object):
+    """
+    Fixed-capacity buffer for BufferedOutputStream.
+
+    The storage is allocated at the full capacity the first time data is
+    added, and filled by slice assignment, avoiding repeated concatenation.
+    Subclasses determine the storage type and how the buffered data is turned
+    into packet data.
+    """
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.count = 0
+        self._data = None
+
+    def __len__(self):
+        return self.count
+
+    def add(self, data, start, count):
+        # Copies count samples from data, beginning at start
+        if self._data is None:
+            self._data = self._allocate(self.capacity)
+        end = self.count + count
+        if start or count != len(data):
+            data = data[start:start+count]
+        self._data[self.count:end] = data
+        self.count = end
+
+    def append(self, data, count):
+        # Copies all of data, which must contain count samples
+        end = self.count + count
+        self._data[self.count:end] = data
+        self.count = end
+
+    def take(self):
+        # Returns the buffered samples and empties the buffer
+        data = self._extract()
+        self.count = 0
+        return data
+
+
+class _ListBuffer(_SampleBuffer):
+    def _allocate(self, capacity):
+        return [0] * capacity
+
+    def _extract(self):
+        # Hand the list itself off to the port, trimmed to size, and allocate
+        # a new one on the next add; the port may still hold a reference
+        data = self._data
+        self._data = None
+        if data is None:
+            return []
+        del data[self.count:]
+        return data
+
+
+class _BytesBuffer(_SampleBuffer):
+    def _allocate(self, capacity):
+        return bytearray(capacity)
+
+    def _extract(self):
+        # Make a single copy into a string, which the CORBA sequence requires;
+        # the storage is reused
+        if self._data is None:
+            return ''
+        return str(buffer(self._data, 0, self.count))
+
+
+class _BitBuffer(_SampleBuffer):
+    def _allocate(self, capacity):
+        return bitbuffer(bits=capacity)
+
+    def _extract(self):
+        # A slice is a view of the same storage, so allocate a new one on the
+        # next add
+        data = self._data
+        self._data = None
+        if data is None:
+            return bitbuffer()
+        return data[:self.count]
+
+
+_SAMPLE_BUFFERS = {
+    list: _ListBuffer,
+    str: _BytesBuffer,
+    bitbuffer: _BitBuffer
+}
+
+
 class BufferedOutputStream(OutputStream):
     """
     BulkIO output stream class with data buffering.
@@ -234,6 +342,14 @@ class BufferedOutputStream(OutputStream):
     it is copied into a new buffer and a new starting time stamp is
     interpolated.
 
+    Flush Latency:
+    At low data rates, buffered data may wait a long time for the buffer to
+    fill. Setting a flush latency via setFlushLatency() bounds that wait: once
+    the oldest buffered data has been held for the given time, the buffer is
+    flushed even if it is not full. The deadlines of all of a port's streams
+    are serviced by a single timer thread owned by the port, so a flush may
+    occur from that thread rather than from a call to write().
+
     Time Stamps:
     When buffering is enabled, the time stamps provided to the write() methods
     may be discarded. Furthermore, when write sizes do not align exactly with
@@ -256,9 +372,17 @@ class BufferedOutputStream(OutputStream):
             OutputPort.getStream
         """
         OutputStream.__init__(self, sri, port, dtype)
-        self.__buffer = self._dtype()
+        self.__bufferType = _SAMPLE_BUFFERS.get(dtype, _ListBuffer)
+        self.__buffer = self.__bufferType(0)
         self.__bufferSize = 0
         self.__bufferTime = bulkio.timestamp.notSet()
+        # Wall clock time at which the oldest buffered data was written, and
+        # the time by which it must be flushed (if a latency is set)
+        self.__bufferStarted = None
+        self.__flushLatency = 0.0
+        self.__flushDeadline = None
+        # Guards the buffer against flushes from the port's timer thread
+        self.__bufferLock = threading.Lock()
 
     def write(self, data, time):
         """
@@ -287,12 +411,18 @@ class BufferedOutputStream(OutputStream):
         # Allow the port to reformat the data in its natural format
         data = self._port._reformat(data)
 
-        # If buffering is disabled, or the buffer is empty and the input data
-        # is large enough for a full buffer, send it immediately
-        if self.__bufferSize == 0 or (not self.__buffer and (len(data) >= self.__bufferSize)):
+        # If buffering is disabled, send it immediately
+        if self.__bufferSize == 0:
             self._send(data, time, False)
-        else:
-            self._doBuffer(data, time)
+            return
+
+        with self.__bufferLock:
+            # If the buffer is empty and the input data is large enough for a
+            # full buffer, send it immediately
+            if not self.__buffer.count and (len(data) >= self.__bufferSize):
+                self._send(data, time, False)
+            else:
+                self._doBuffer(data, time)
 
     def bufferSize(self):
         """
@@ -327,12 +457,67 @@ class BufferedOutputStream(OutputStream):
         size = int(samples)
         if size < 0:
             raise ValueError('buffer size cannot be negative')
-        self.__bufferSize = size
 
-        # If the new buffer size is less than (or exactly equal to) the
-        # currently buffered data size, flush
-        if self.__bufferSize <= len(self.__buffer):
-            self.flush()
+        with self.__bufferLock:
+            self.__bufferSize = size
+
+            # If the new buffer size is less than (or exactly equal to) the
+            # currently buffered data size, flush
+            if self.__buffer.count and self.__bufferSize <= self.__buffer.count:
+                self._flush(False)
+
+            # Resize the internal buffer, keeping any buffered data
+            if self.__bufferSize != self.__buffer.capacity:
+                buffered = self.__buffer.take()
+                self.__buffer = self.__bufferType(self.__bufferSize)
+                if buffered:
+                    self.__buffer.add(buffered, 0, len(buffered))
+
+    def flushLatency(self):
+        """
+        Gets the maximum time that data is held in the internal buffer.
+
+        A flush latency of 0 indicates that buffered data is only sent when
+        the buffer is full, or on an explicit flush.
+
+        Returns:
+            float: Flush latency in seconds.
+        """
+        return self.__flushLatency
+
+    def setFlushLatency(self, seconds):
+        """
+        Sets the maximum time that data is held in the internal buffer.
+
+        When buffering is enabled, buffered data is flushed no later than
+        `seconds` after the oldest buffered data was written, even if the
+        buffer is not full. This trades throughput for bounded latency on
+        low-rate streams. If currently buffered data has already been held
+        longer than the new latency, it is flushed immediately.
+
+        A flush latency of 0 disables time-based flushing.
+
+        Args:
+            seconds: Flush latency in seconds.
+
+        Raises:
+            ValueError: If seconds is negative.
+        """
+        latency = float(seconds)
+        if latency < 0.0:
+            raise ValueError('flush latency cannot be negative')
+
+        with self.__bufferLock:
+            self.__flushLatency = latency
+            self.__flushDeadline = None
+            if not self.__buffer.count or not latency:
+                return
+            deadline = self.__bufferStarted + latency
+            if deadline <= _time.time():
+                self._flush(False)
+            else:
+                self.__flushDeadline = deadline
+                self._port._scheduleFlush(deadline, self._flushExpired, deadline)
 
     def flush(self):
         """
@@ -340,9 +525,9 @@ class BufferedOutputStream(OutputStream):
 
         Any data in the internal buffer is sent to the port to be pushed.
         """
-        if not self.__buffer:
-            return
-        self._flush(False)
+        with self.__bufferLock:
+            if self.__buffer.count:
+                self._flush(False)
 
     def close(self):
         """
@@ -351,12 +536,13 @@ class BufferedOutputStream(OutputStream):
         Sends an end-of-stream packet with any remaining buffered data. No
         further operations should be made on the stream.
         """
-        if self.__buffer:
-            # Add the end-of-stream marker to the buffered data and its
-            # timestamp
-            self._flush(True)
-        else:
-            OutputStream.close(self)
+        with self.__bufferLock:
+            if self.__buffer.count:
+                # Add the end-of-stream marker to the buffered data and its
+                # timestamp
+                self._flush(True)
+            else:
+                OutputStream.close(self)
 
     def _modifyingStreamMetadata(self):
         # Flush any data queued with the old SRI
@@ -366,41 +552,86 @@ class BufferedOutputStream(OutputStream):
         OutputStream._modifyingStreamMetadata(self)
 
     def _flush(self, eos):
-        self._send(self.__buffer, self.__bufferTime, eos)
-        self.__buffer = self._dtype()
+        # Prerequisite: caller holds self.__bufferLock
+        self.__flushDeadline = None
+        self._send(self.__buffer.take(), self.__bufferTime, eos)
+
+    def _flushExpired(self, deadline):
+        # Called from the port's timer thread at the flush deadline (or when
+        # the port is released); the buffer may have been flushed, and possibly
+        # refilled with a later deadline, in the meantime
+        with self.__bufferLock:
+            current = self.__flushDeadline
+            if current is not None and current <= deadline:
+                self._flush(False)
 
     def _doBuffer(self, data, time):
-        # If this is the first data being queued, use its timestamp for the
-        # start time of the buffered data
-        if not self.__buffer:
-            self.__bufferTime = copy.copy(time)
-
-        # Only buffer up to the currently configured buffer size
-        count = min(len(data), self.__bufferSize - len(self.__buffer));
-        self.__buffer += data[:count]
-
-        # Flush if the buffer is full
-        if len(self.__buffer) >= self.__bufferSize:
-            self._flush(False)
-
-        # Handle remaining data
-        if count < len(data):
-            next = time + self.xdelta * count
-            self._doBuffer(data[count:], next)
-
-
-def _unpack_complex(data, dtype):
-    # Yields alternating real and imaginary elements from a sequence of complex
-    # values (or real values treated as complex values, where the imaginary
-    # portion is always 0), converted to a desired data type
-    for item in data:
-        yield dtype(item.real)
-        yield dtype(item.imag)
-    
+        # Prerequisite: caller holds self.__bufferLock
+        buf = self.__buffer
+        remaining = len(data)
+        if buf.count and (buf.count + remaining) < self.__bufferSize:
+            # Common case, data fits in the partially filled buffer
+            buf.append(data, remaining)
+            return
+
+        start = 0
+        while remaining:
+            if not buf.count:
+                if remaining >= self.__bufferSize:
+                    # A full buffer's worth of data can be sent directly
+                    count = self.__bufferSize
+                    self._send(data[start:start+count], time, False)
+                    start += count
+                    remaining -= count
+                    if remaining:
+                        time = time + self.xdelta * count
+                    continue
+
+                # If this is the first data being queued, use its timestamp
+                # for the start time of the buffered data
+                self.__bufferTime = BULKIO.PrecisionUTCTime(time.tcmode, time.tcstatus, time.toff,
+                                                            time.twsec, time.tfsec)
+                self.__bufferStarted = _time.time()
+                if self.__flushLatency:
+                    self.__flushDeadline = self.__bufferStarted + self.__flushLatency
+                    self._port._scheduleFlush(self.__flushDeadline, self._flushExpired, self.__flushDeadline)
+
+            # Only buffer up to the currently configured buffer size
+            count = min(remaining, self.__bufferSize - buf.count)
+            buf.add(data, start, count)
+            start += count
+            remaining -= count
+
+            # Flush if the buffer is full
+            if buf.count >= self.__bufferSize:
+                self._flush(False)
+
+            # The timestamp of the remaining data (if any) is advanced from
+            # that of the data just buffered
+            if remaining:
+                time = time + self.xdelta * count
+
+
 def _complex_to_interleaved(data, dtype):
-    # Turns a sequence of complex values into a list with the real and
-    # imaginary elements interleaved
-    return list(_unpack_complex(data, dtype))
+    # Turns a sequence of complex values (or real values treated as complex
+    # values, where the imaginary portion is always 0) into a list with the
+    # real and imaginary elements interleaved, converted to a desired data type
+    if numpy is not None and isinstance(data, numpy.ndarray):
+        # Real arrays are treated as complex values with an imaginary portion
+        # of 0, which requires promoting them to a complex type first
+        if data.dtype.kind != 'c':
+            data = data.astype(numpy.complex128)
+        # A contiguous complex array has the same memory layout as twice as
+        # many interleaved real values, so a view is all that is needed; the
+        # port converts the element type when the data is sent
+        return numpy.ascontiguousarray(data).reshape(-1).view(data.real.dtype)
+
+    # Fill the even and odd elements with list slice assignment, which is
+    # much faster than generating the elements one at a time
+    interleaved = [dtype()] * (2 * len(data))
+    interleaved[0::2] = [dtype(item.real) for item in data]
+    interleaved[1::2] = [dtype(item.imag) for item in data]
+    return interleaved
 
 class NumericOutputStream(BufferedOutputStream):
     """
@@ -436,6 +667,10 @@ class NumericOutputStream(BufferedOutputStream):
         list of complex values. The real and imaginary elements are interleaved
         into a list of real numbers.
 
+        If `data` is a numpy array with a complex type, the interleaved values
+        are obtained by reinterpreting the array as real values, without
+        copying.
+
         When `data` is already an interleaved list of real values, setting the
         optional `interleaved` keyword argument will skip the complex-to-real
         interleaving.
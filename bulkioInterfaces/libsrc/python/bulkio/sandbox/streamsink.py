@@ -22,11 +22,20 @@ import collections
 import operator
 import threading
 import time
+import struct
+import os
+import tempfile
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
 
 from ossie.utils.sandbox.helper import SandboxHelper
 
 from bulkio.bulkioInterfaces import BULKIO
 from bulkio.input_ports import *
+from bulkio import transport
 
 _PORT_MAP = {
     'char' : (InCharPort, BULKIO.dataChar),
@@ -63,14 +72,76 @@ class StreamData(object):
         offset, sri = self.sris[0]
         return sri
 
+class SpillFile(object):
+    """
+    Internal class to store overflow data from a stream in a temporary file.
+
+    The file has no name on disk, and is removed when it is closed or garbage
+    collected.
+    """
+    def __init__(self, directory=None):
+        self._file = tempfile.TemporaryFile(prefix='streamsink-', dir=directory)
+        self._size = 0
+
+    def write(self, data):
+        # Appends the binary string data, returning the byte offset at which
+        # it was written
+        offset = self._size
+        self._file.seek(0, os.SEEK_END)
+        self._file.write(data)
+        self._size += len(data)
+        return offset
+
+    def read(self, offset, size):
+        self._file.seek(offset)
+        return self._file.read(size)
+
+    def map(self, offset, count, dtype):
+        # Returns a read-only numpy array that is backed by the file, so that
+        # the data is only paged into memory as it is accessed
+        if not count:
+            return numpy.empty(0, dtype)
+        self._file.flush()
+        return numpy.memmap(self._file, dtype=dtype, mode='r', offset=offset, shape=(count,))
+
+    def size(self):
+        return self._size
+
+    def close(self):
+        self._file.close()
+
+class SpilledBlock(object):
+    """
+    Internal class to hold the metadata of a block whose data was moved to a
+    SpillFile.
+    """
+    __slots__ = ('blockType', 'sri', 'sriChangeFlags', 'inputQueueFlushed', 'timestamps',
+                 'offset', 'count')
+    def __init__(self, block, offset, count):
+        self.blockType = type(block)
+        self.sri = block.sri
+        self.sriChangeFlags = block.sriChangeFlags
+        self.inputQueueFlushed = block.inputQueueFlushed
+        self.timestamps = block.getTimestamps()
+        self.offset = offset
+        self.count = count
+
 class StreamContainer(object):
     """
     Internal class to cache data read from a stream.
     """
-    def __init__(self, sri):
+    def __init__(self, sri, port=None):
         self.sri = sri
-        self.blocks = []
+        self.blocks = collections.deque()
         self.eos = False
+        # Number of bytes of block data held in memory
+        self.memory = 0
+        self._spillFile = None
+        self._typecode = getattr(port, 'TRANSFER_TYPE', None) or 'd'
+        # Use struct for the element size, because array has no 64-bit
+        # integer types in Python 2
+        self._itemsize = struct.calcsize(self._typecode)
+        self._useNumpy = hasattr(port, 'numpyEnabled') and port.numpyEnabled()
 
     @property
     def streamID(self):
@@ -78,6 +149,28 @@ class StreamContainer(object):
 
     def append(self, block):
         self.blocks.append(block)
+        self.memory += self.getBlockBytes(block)
+
+    def spill(self, block, directory=None):
+        # Stores the block's data in the spill file, keeping only its metadata
+        # in memory
+        if self._spillFile is None:
+            self._spillFile = SpillFile(directory)
+        offset = self._spillFile.write(self._packData(block.buffer))
+        self.blocks.append(SpilledBlock(block, offset, len(block.buffer)))
+
+    def canSpill(self):
+        return True
+
+    def spilledBytes(self):
+        if self._spillFile is None:
+            return 0
+        return self._spillFile.size()
+
+    def close(self):
+        if self._spillFile is not None:
+            self._spillFile.close()
+            self._spillFile = None
 
     def ready(self):
         if self.eos:
@@ -86,34 +179,63 @@ class StreamContainer(object):
             return bool(self.blocks)
 
     def get(self):
-        # Combine blocks' data and metadata into a single data object
-        data = StreamData([], self._createEmpty(), [], self.eos)
+        return self._combine(self.blocks, self.eos)
+
+    def pop(self):
+        # Removes the first block, returning its data and metadata; the
+        # end-of-stream flag is only set for the stream's last block. The
+        # block's data is returned as-is, so numpy arrays (including memory
+        # maps of spilled data) are not copied.
+        block = self.blocks.popleft()
+        if not isinstance(block, SpilledBlock):
+            self.memory -= self.getBlockBytes(block)
+        return self._combine([block], self.eos and not self.blocks, join=False)
+
+    def getBlockBytes(self, block):
+        return len(block.buffer) * self._itemsize
+
+    def _combine(self, blocks, eos, join=True):
+        # Combine blocks' data and metadata into a single data object; the
+        # blocks' data is collected and then concatenated once at the end
+        data = StreamData([], None, [], eos)
+        pieces = []
+        offset = 0
         framed = False
-        for block in self.blocks:
-            offset = len(data.data)
+        for block in blocks:
+            if isinstance(block, SpilledBlock):
+                block = self._loadBlock(block)
+            block_offset = offset
             block_data = self._getBlockData(block)
 
             # Check for framed data mode
             if block.sri.subsize > 0:
-                # If the data wasn't framed before, turn it into a list
+                # If the data wasn't framed before, any prior data becomes the
+                # first frame
                 if not framed:
-                    if data.data:
-                        # There was some data, put it in a list
-                        data.data = [data.data]
+                    if offset:
+                        pieces = [[self._concatenate(pieces)]]
+                        offset = 1
                     else:
-                        # Replace empty data with a list (this is mostly for
-                        # the benefit of bitbuffer)
-                        data.data = []
+                        pieces = []
                     framed = True
 
                 # Reframe the block's data to match the framing
                 block_data = self._reframeData(block_data, block.sri.subsize)
-            data.data += block_data
+            pieces.append(block_data)
+            offset += len(block_data)
 
             if block.sriChanged or not data.sris:
-                data.sris.append(SRI(offset, block.sri))
+                data.sris.append(SRI(block_offset, block.sri))
             for ts in block.getTimestamps():
-                data.timestamps.append(TimeStamp(ts.offset + offset, ts.time))
+                data.timestamps.append(TimeStamp(ts.offset + block_offset, ts.time))
+
+        if not join:
+            data.data = pieces[0]
+        elif framed:
+            # Frames are always a list, regardless of the data type
+            data.data = StreamContainer._concatenate(self, pieces)
+        else:
+            data.data = self._concatenate(pieces)
 
         # In the event that there were no blocks (which can only happen in the
         # case of an end-of-stream with no data), add the saved SRI
@@ -122,8 +244,29 @@ class StreamContainer(object):
 
         return data
 
-    def _createEmpty(self):
-        return []
+    def _concatenate(self, pieces):
+        # Extending a single list in place is linear in the total size
+        result = []
+        for piece in pieces:
+            result.extend(piece)
+        return result
+
+    def _loadBlock(self, spilled):
+        data = self._loadData(spilled.offset, spilled.count)
+        block = spilled.blockType(spilled.sri, data, spilled.sriChangeFlags, spilled.inputQueueFlushed)
+        for ts in spilled.timestamps:
+            block.addTimestamp(ts.time, ts.offset, ts.synthetic)
+        return block
+
+    def _packData(self, data):
+        if numpy is not None and isinstance(data, numpy.ndarray):
+            return numpy.asarray(data, dtype=self._typecode).tostring()
+        return transport.packData(data, self._typecode)
+
+    def _loadData(self, offset, count):
+        if self._useNumpy:
+            return self._spillFile.map(offset, count, self._typecode)
+        return transport.unpackData(self._spillFile.read(offset, count * self._itemsize), self._typecode)
 
     def _reframeData(self, data, frameSize):
         return [data[pos:pos+frameSize] for pos in xrange(0, len(data), frameSize)]
@@ -144,8 +287,14 @@ class StringStreamContainer(StreamContainer):
     """
     Internal class for storing data from string-type streams (XML, File).
     """
-    def __init__(self, sri):
-        StreamContainer.__init__(self, sri)
+    def __init__(self, sri, port=None):
+        StreamContainer.__init__(self, sri, port)
+
+    def canSpill(self):
+        return False
+
+    def getBlockBytes(self, block):
+        return len(block.buffer)
 
     def _getBlockSize(self, block):
         return 1
@@ -157,11 +306,27 @@ class BitStreamContainer(StreamContainer):
     """
     Internal class for storing data from packed bit streams.
     """
-    def __init__(self, sri):
-        StreamContainer.__init__(self, sri)
+    def __init__(self, sri, port=None):
+        StreamContainer.__init__(self, sri, port)
 
-    def _createEmpty(self):
-        return bitbuffer()
+    def getBlockBytes(self, block):
+        return (len(block.buffer) + 7) / 8
+
+    def _packData(self, data):
+        return data.bytes()
+
+    def _loadData(self, offset, count):
+        data = self._spillFile.read(offset, (count + 7) / 8)
+        return bitbuffer(bytearray(data), count)
+
+    def _concatenate(self, pieces):
+        # Allocate the full result up front, then copy each piece into place
+        result = bitbuffer(bits=sum(len(piece) for piece in pieces))
+        offset = 0
+        for piece in pieces:
+            result[offset:offset+len(piece)] = piece
+            offset += len(piece)
+        return result
 
     def _getBlockSize(self, block):
         return len(block.buffer)
@@ -180,6 +345,14 @@ class StreamSink(SandboxHelper):
     Unlike DataSink, reading from StreamSink returns data from only one stream
     at a time. This avoids problems caused by accidental data interleaving.
 
+    For long captures, the amount of data held in memory can be limited with
+    the `memoryLimit` argument. Once the limit is reached, further data is
+    written to temporary files until it is read. Spilled data is read back
+    from disk when it is read; for ports with numpy enabled, it is returned
+    as read-only memory-mapped arrays. The iterblocks() method processes a
+    stream one block at a time, without combining all of its data, so that
+    captures larger than memory can be analyzed.
+
     If more control over stream reading is desired, the `port` attribute
     provides access to the underlying BulkIO port. The port is an instance of
     the same class used in Python components, and supports the full stream API.
@@ -187,14 +360,20 @@ class StreamSink(SandboxHelper):
     See Also:
         StreamSource
     """
-    def __init__(self, format=None):
+    def __init__(self, format=None, memoryLimit=None, spillDirectory=None):
         """
         Creates a new StreamSink.
 
         Args:
-            format:    BulkIO port type to support (e.g., "float"). If not
-                       given, all BulkIO port types except SDDS and VITA49 are
-                       supported.
+            format:         BulkIO port type to support (e.g., "float"). If not
+                            given, all BulkIO port types except SDDS and VITA49
+                            are supported.
+            memoryLimit:    Maximum number of bytes of data to hold in memory,
+                            across all streams. Data received beyond the limit
+                            is spilled to temporary files. If not given, there
+                            is no limit. XML and file data are never spilled.
+            spillDirectory: Directory for temporary files (default is the
+                            system temporary directory).
         """
         SandboxHelper.__init__(self)
 
@@ -214,6 +393,9 @@ class StreamSink(SandboxHelper):
 
         self._cachedStreams = {}
         self._cacheClass = StreamContainer
+        self._memoryLimit = memoryLimit
+        self._spillDirectory = spillDirectory
+        self._memoryUsed = 0
 
     def _portCreated(self, port, portDict):
         self._cacheClass = portDict['cache']
@@ -301,8 +483,56 @@ class StreamSink(SandboxHelper):
             return None
         # The read consumes all cached data for the stream, so we can discard
         # the cache object
+        data = container.get()
         self._removeStreamCache(container)
-        return container.get()
+        return data
+
+    def iterblocks(self, timeout=-1.0, streamID=None):
+        """
+        Iterates over the data from a stream, one block at a time.
+
+        Unlike read(), which combines all of the available data from a stream,
+        iterblocks() yields the data in the blocks in which it was received.
+        Only the current block must be held in memory; in conjunction with a
+        memory limit, this allows processing captures that are larger than
+        the available memory.
+
+        Iteration continues with the same stream until it ends. The last block
+        of the stream has its `eos` field set; if the end-of-stream is received
+        after the last block has been yielded, a final empty block is yielded.
+
+        Args:
+            timeout:   Maximum time, in seconds, to wait for each block. A
+                       negative time waits indefinitely (this is the default).
+            streamID:  Identifier of stream to read from (default is first
+                       available).
+
+        Yields:
+            StreamData objects, with the same fields as returned by read().
+            Iteration ends early if the timeout elapses or the helper is
+            stopped.
+        """
+        condition = lambda x: x.ready()
+        container = self._read(timeout, streamID, condition)
+        while container:
+            if not container.blocks:
+                # End-of-stream received with no remaining data
+                data = container.get()
+                self._removeStreamCache(container)
+                yield data
+                return
+
+            memory = container.memory
+            data = container.pop()
+            self._memoryUsed -= memory - container.memory
+            if data.eos:
+                self._removeStreamCache(container)
+            yield data
+            if data.eos:
+                return
+
+            if not container.blocks:
+                container = self._read(timeout, container.streamID, condition)
 
     def _read(self, timeout, streamID, condition):
         if timeout >= 0.0:
@@ -310,10 +540,12 @@ class StreamSink(SandboxHelper):
         else:
             end = None
 
+        wait_time = 0.0
         while self.started:
-            # Fetch as much data as possible without blocking
-            while self._fetchData():
-                pass
+            # Fetch as much data as possible, waiting up to wait_time for the
+            # first packet to arrive
+            while self._fetchData(wait_time):
+                wait_time = 0.0
 
             for container in self._cachedStreams.itervalues():
                 if streamID and container.streamID != streamID:
@@ -321,28 +553,29 @@ class StreamSink(SandboxHelper):
                 if condition(container):
                     return container
 
-            # Sleep to allow more data to come in
+            # Wait for more data on the next pass; the port wakes the read as
+            # soon as a packet is received, but the wait is limited so that
+            # the operation can be interrupted by ^C
             wait_time = 0.1
             if end is not None:
                 now = time.time()
                 if now >= end:
                     break
                 wait_time = min(wait_time, end - now)
-            time.sleep(wait_time)
 
         return None
 
-    def _fetchData(self):
-        # Use a polling loop instead of waiting in getCurrentStream so that the
-        # operation can be interrupted by ^C
-        stream = self._port.getCurrentStream(0.0)
+    def _fetchData(self, timeout):
+        # Waits on the port for up to timeout seconds; an indefinite wait
+        # cannot be interrupted by ^C
+        stream = self._port.getCurrentStream(timeout)
         if not stream:
             return False
 
         container = self._getStreamCache(stream)
         block = stream.tryread()
         if block:
-            container.append(block)
+            self._cacheBlock(container, block)
         elif stream.eos():
             container.eos = True
         return True
@@ -350,9 +583,22 @@ class StreamSink(SandboxHelper):
     def _getStreamCache(self, stream):
         container = self._cachedStreams.get(stream.streamID, None)
         if not container:
-            container = self._cacheClass(stream.sri)
+            container = self._cacheClass(stream.sri, self._port)
             self._cachedStreams[stream.streamID] = container
         return container
 
+    def _cacheBlock(self, container, block):
+        # Once the memory limit is reached, store block data in the stream's
+        # spill file instead
+        if self._memoryLimit is not None and container.canSpill():
+            size = container.getBlockBytes(block)
+            if (self._memoryUsed + size) > self._memoryLimit:
+                container.spill(block, self._spillDirectory)
+                return
+        container.append(block)
+        self._memoryUsed += container.getBlockBytes(block)
+
     def _removeStreamCache(self, container):
         del self._cachedStreams[container.streamID]
+        self._memoryUsed -= container.memory
+        container.close()
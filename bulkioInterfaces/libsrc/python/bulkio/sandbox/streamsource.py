@@ -18,6 +18,13 @@
 # along with this program.  If not, see http://www.gnu.org/licenses/.
 #
 
+import time as _time
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
 from ossie.utils.docstring import inherit_doc
 from ossie.utils.sandbox.helper import SandboxHelper
 
@@ -26,7 +33,8 @@ from redhawk.bitbuffer import bitbuffer
 import bulkio
 from bulkio.bulkioInterfaces import BULKIO
 from bulkio.output_ports import *
-from bulkio.output_streams import OutputStream, OutXMLStream
+from bulkio.output_streams import OutputStream, OutXMLStream, NumericOutputStream
+from bulkio.output_streams import _complex_to_interleaved
 
 _PORT_MAP = {
     'char' : (OutCharPort, BULKIO.dataChar),
@@ -82,10 +90,15 @@ class StreamSource(SandboxHelper):
     port. The port is an instance of the same class used in Python components,
     and supports the full stream API.
 
+    Numpy arrays are written in packets of at most the port's
+    maxSamplesPerPush, so that very large arrays never have to be converted to
+    a single list. With throttling enabled, writes are paced to the stream's
+    sample rate (1/xdelta) to emulate a live source.
+
     See Also:
         StreamSink
     """
-    def __init__(self, streamID=None, format=None):
+    def __init__(self, streamID=None, format=None, throttle=False):
         """
         Creates a new StreamSource.
 
@@ -95,10 +108,14 @@ class StreamSource(SandboxHelper):
             format:    BulkIO port type to support (e.g., "float"). If not
                        given, all BulkIO port types except SDDS and VITA49 are
                        supported.
+            throttle:  If True, pace writes to the stream's sample rate.
         """
         SandboxHelper.__init__(self)
         self._streamID = streamID
         self._stream = None
+        self.throttle = throttle
+        # Wall clock time at which the next write may be sent when throttling
+        self._nextWrite = None
 
         if format:
             formats = [format]
@@ -117,6 +134,10 @@ class StreamSource(SandboxHelper):
         """
         Writes data to the stream.
 
+        Numpy arrays, including complex and 2-dimensional (framed) arrays, are
+        sent in packets of at most the port's maxSamplesPerPush, with the time
+        stamp of each packet advanced from `time`.
+
         Args:
             data:        Data to write.
             time:        Optional time stamp for first sample of `data`. If not
@@ -132,20 +153,68 @@ class StreamSource(SandboxHelper):
         # already exist
         stream = self.stream
 
+        if isinstance(stream, OutXMLStream):
+            stream.write(data)
+            return
+
+        if time is None:
+            time = bulkio.timestamp.now()
+
+        if numpy is not None and isinstance(data, numpy.ndarray) and isinstance(stream, NumericOutputStream):
+            self._writeArray(stream, data, time, interleaved)
+            return
+
         # Turn framed input data into a 1-dimensional sequence, but only if the
         # stream is configured for it
         if stream.subsize > 0:
             data = self._unframeData(data)
 
-        args = [data]
         kwargs = {}
-        if not isinstance(stream, OutXMLStream):
-            if time is None:
-                time = bulkio.timestamp.now()
-            kwargs['time'] = time
         if interleaved:
             kwargs['interleaved'] = True
-        stream.write(*args, **kwargs)
+        if self.throttle:
+            samples = len(data)
+            if interleaved and stream.complex:
+                samples /= 2
+            self._throttleWrite(samples, stream.xdelta)
+        stream.write(data, time=time, **kwargs)
+
+    def _writeArray(self, stream, data, time, interleaved):
+        # Framed data is laid out in memory the same as the equivalent 1-D
+        # array; reshaping to 1-D only copies if the array is not contiguous
+        if data.ndim != 1:
+            data = data.reshape(-1)
+
+        # Interleave complex data up front (as a view, where possible) so that
+        # the packet size can be counted in real values
+        if stream.complex and not interleaved:
+            data = _complex_to_interleaved(data, None)
+
+        # Quantize the packet size to a whole number of frames, taking both
+        # the complex mode and subsize into account
+        item_size = 2 if stream.complex else 1
+        frame_size = item_size * max(stream.subsize, 1)
+        max_samples = max(self._port.maxSamplesPerPush / frame_size, 1) * frame_size
+
+        xdelta = stream.xdelta
+        for start in xrange(0, len(data), max_samples):
+            chunk = data[start:start+max_samples]
+            samples = len(chunk) / item_size
+            if self.throttle:
+                self._throttleWrite(samples, xdelta)
+            stream.write(chunk, time=time, interleaved=True)
+            time = time + samples * xdelta
+
+    def _throttleWrite(self, samples, xdelta):
+        # Wait until the previous write's worth of samples would have been
+        # produced in real time, then reserve time for this write. If the
+        # caller has fallen behind, pacing restarts from the current time
+        # instead of trying to catch up.
+        now = _time.time()
+        if self._nextWrite is not None and self._nextWrite > now:
+            _time.sleep(self._nextWrite - now)
+            now = self._nextWrite
+        self._nextWrite = now + samples * xdelta
 
     def close(self):
         """
@@ -154,6 +223,7 @@ class StreamSource(SandboxHelper):
         if self._stream:
             self._stream.close()
             self._stream = None
+        self._nextWrite = None
 
     @property
     def streamID(self):
@@ -191,16 +261,20 @@ class StreamSource(SandboxHelper):
         return self._stream
 
     def _unframeData(self, data):
-        if not data:
+        if not len(data):
             # Assume empty sequence, nothing to do
             return data
         elif isinstance(data[0], bitbuffer):
             # Sequence of bitbuffers, compact down to a single bitbuffer
             return sum(data, bitbuffer())
-        elif isinstance(data[0], (list, tuple)):
+        elif isinstance(data[0], (list, tuple)) or (numpy is not None and isinstance(data[0], numpy.ndarray)):
             # Sequence of sequences, probably numeric data, compact into a
-            # single list
-            return sum(data, [])
+            # single list; extending in place avoids the quadratic cost of
+            # repeated concatenation
+            result = []
+            for frame in data:
+                result.extend(frame)
+            return result
         else:
             # Something else (probably numbers), just pass through
             return data
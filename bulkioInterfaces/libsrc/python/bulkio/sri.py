@@ -89,6 +89,21 @@ def compare(sriA, sriB):
             return False
     return True
 
+def fingerprint(sri):
+    """
+    Returns a summary of all of the fields and keywords of an SRI, such that
+    two SRIs are equal according to compare() if and only if their
+    fingerprints are equal.
+
+    Fingerprints are built and compared with built-in tuple operations, which
+    is much faster than compare() for SRIs with many keywords. Ports keep the
+    fingerprint of the last SRI for each stream, so that re-pushing an
+    unchanged SRI only requires computing the new SRI's fingerprint.
+    """
+    return (sri.hversion, sri.xstart, sri.xdelta, sri.xunits, sri.subsize,
+            sri.ystart, sri.ydelta, sri.yunits, sri.mode, sri.streamID,
+            sri.blocking, tuple([(dt.value._t, dt.value._v) for dt in sri.keywords]))
+
 def compareFields(sriA, sriB):
     """
     Field-by-field comparison of two SRIs, returning a combination of bit flags
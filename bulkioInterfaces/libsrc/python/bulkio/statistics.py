@@ -19,35 +19,107 @@
 #
 
 import time
+import math
+import collections
+import array
 import struct
 from ossie.cf import CF
 from omniORB import CORBA
 from bulkio.bulkioInterfaces.BULKIO import PortStatistics
 from bulkio.bulkioInterfaces.BULKIO import UsesPortStatistics
 
-class InStats:
-    class statPoint:
-        def __init__(self):
-            self.elements = 0
-            self.queueSize = 0.0
-            self.secs = 0.0
+# Percentiles reported for queue depth and latency, as (keyword suffix, rank)
+PERCENTILES = (('P50', 50.0), ('P95', 95.0), ('P99', 99.0))
+
+def _percentile(values, rank):
+    # Nearest-rank percentile of a sorted, non-empty sequence
+    index = int(math.ceil(rank / 100.0 * len(values))) - 1
+    return values[max(index, 0)]
+
+def _percentileKeywords(name, values):
+    if not values:
+        return []
+    values = sorted(values)
+    return [CF.DataType(id=name+suffix, value=CORBA.Any(CORBA.TC_double, float(_percentile(values, rank))))
+            for suffix, rank in PERCENTILES]
+
+class _StatHistory(object):
+    """
+    Ring buffer of the most recent statistics points, stored in parallel
+    arrays. Points are recorded by InStats and OutStats directly. When
+    sampling, the elements from updates that are not recorded are added to
+    the next recorded point, so that data rates remain accurate.
+    """
+    __slots__ = ('window', 'elements', 'queueSize', 'secs', 'latency', 'streamIDs',
+                 'index', 'count', 'pending', 'skip')
+    def __init__(self, window):
+        self.window = window
+        self.elements = array.array('d', [0.0]) * window
+        self.queueSize = array.array('d', [0.0]) * window
+        self.secs = array.array('d', [0.0]) * window
+        # Negative latency means that the point has no latency measurement
+        self.latency = array.array('d', [-1.0]) * window
+        self.streamIDs = [None] * window
+        self.index = 0
+        self.count = 0
+        self.pending = 0
+        self.skip = 0
+
+    def frontTime(self):
+        # Time of the most recent point
+        return self.secs[self.index - 1]
+
+    def backTime(self):
+        # Time of the oldest point
+        return self.secs[self.index]
+
+    def totalElements(self):
+        # Don't count the oldest point, since we're looking at change in time
+        # rather than absolute time
+        return sum(self.elements) - self.elements[self.index]
+
+    def totalQueueSize(self):
+        return sum(self.queueSize) - self.queueSize[self.index]
 
-    def __init__(self, name, element_type='', bits=0):
+    def recentStreamIDs(self):
+        # Unique stream IDs of the recorded points, excluding the oldest, in
+        # order of first appearance
+        found = set()
+        stream_ids = []
+        for offset in xrange(1, self.window):
+            stream_id = self.streamIDs[(self.index + offset) % self.window]
+            if stream_id is not None and stream_id not in found:
+                found.add(stream_id)
+                stream_ids.append(stream_id)
+        return stream_ids
+
+    def queueSizes(self):
+        # Only the points that have been recorded
+        return self.queueSize[:self.count]
+
+    def latencies(self):
+        return [latency for latency in self.latency[:self.count] if latency >= 0.0]
+
+
+class InStats:
+    def __init__(self, name, element_type='', bits=0, window=10):
         # Backwards-compatibility: accept an element type string for use with
         # struct.calcsize
         if bits == 0:
             bits = struct.calcsize(element_type) * 8
         self.enabled = True
         self.flushTime = None
-        self.historyWindow = 10
-        self.receivedStatistics = []
         self.name = name
-        self.receivedStatistics_idx = 0
         self.bitSize = bits
-        self.activeStreamIDs = []
-        for i in range(self.historyWindow):
-            self.receivedStatistics.append(self.statPoint())
+        # Ordered by first appearance; the values are unused
+        self.activeStreamIDs = collections.OrderedDict()
+        self.sampling = 1
+        self.setHistoryWindow(window)
         self.runningStats = None
+        # Samples discarded due to queue overflow, in total and for each
+        # active stream
+        self.samplesDropped = 0
+        self.streamSamplesDropped = {}
 
     def setEnabled(self, enableStats):
         self.enabled = enableStats
@@ -55,28 +127,72 @@ class InStats:
     def setBitSize(self, bitSize ):
         self.bitSize = bitSize
 
+    def setHistoryWindow(self, window):
+        """
+        Sets the number of points used to compute statistics, discarding the
+        existing history.
+        """
+        if window < 2:
+            raise ValueError('history window must be at least 2')
+        self.historyWindow = window
+        self.receivedStatistics = _StatHistory(window)
+
+    def setSampling(self, count):
+        """
+        Records only every count-th update, reducing the per-packet cost of
+        statistics at high packet rates.
+        """
+        if count < 1:
+            raise ValueError('sampling count must be at least 1')
+        self.sampling = count
+        self.receivedStatistics.skip = 0
+
     def update(self, elementsReceived, queueSize, EOS, streamID, flush=False):
         if not self.enabled:
             return
 
-        self.receivedStatistics[self.receivedStatistics_idx].elements = elementsReceived
-        self.receivedStatistics[self.receivedStatistics_idx].queueSize = queueSize
-        self.receivedStatistics[self.receivedStatistics_idx].secs = time.time()
-        self.receivedStatistics_idx += 1
-        self.receivedStatistics_idx = self.receivedStatistics_idx%self.historyWindow
-        if flush:
-            self.flushTime = self.receivedStatistics[self.receivedStatistics_idx].secs
-
-        if EOS :
-            try:
-                self.activeStreamIDs.remove(streamID)
-            except:
-                pass
+        history = self.receivedStatistics
+        if history.skip:
+            history.skip -= 1
+            history.pending += elementsReceived
+            if flush:
+                self.flushTime = time.time()
         else:
-            if streamID not in self.activeStreamIDs:
-                self.activeStreamIDs.append( streamID )
+            # Record the point in the history ring buffer (inlined for speed)
+            history.skip = self.sampling - 1
+            index = history.index
+            if history.pending:
+                elementsReceived += history.pending
+                history.pending = 0
+            history.elements[index] = elementsReceived
+            history.queueSize[index] = queueSize
+            history.secs[index] = now = time.time()
+            index += 1
+            if index == history.window:
+                index = 0
+                history.count = history.window
+            elif history.count < index:
+                history.count = index
+            history.index = index
+            if flush:
+                self.flushTime = now
+
+        if EOS:
+            self.activeStreamIDs.pop(streamID, None)
+            if self.streamSamplesDropped:
+                self.streamSamplesDropped.pop(streamID, None)
+        elif streamID not in self.activeStreamIDs:
+            self.activeStreamIDs[streamID] = None
 
-            
+    def dropped(self, streamID, samples):
+        """
+        Records samples from a stream that were discarded due to queue
+        overflow.
+        """
+        if not self.enabled:
+            return
+        self.samplesDropped += samples
+        self.streamSamplesDropped[streamID] = self.streamSamplesDropped.get(streamID, 0) + samples
 
     def retrieve(self):
         if not self.enabled:
@@ -84,66 +200,78 @@ class InStats:
 
         self.runningStats = PortStatistics(portName=self.name, averageQueueDepth=-1, elementsPerSecond=-1, bitsPerSecond=-1, callsPerSecond=-1, streamIDs=[], timeSinceLastCall=-1, keywords=[])
 
-        listPtr = (self.receivedStatistics_idx + 1) % self.historyWindow    # don't count the first set of data, since we're looking at change in time rather than absolute time
-        frontTime = self.receivedStatistics[(self.receivedStatistics_idx - 1) % self.historyWindow].secs
-        backTime = self.receivedStatistics[self.receivedStatistics_idx].secs
-        totalData = 0.0
-        queueSize = 0.0
-        while (listPtr != self.receivedStatistics_idx):
-            totalData += self.receivedStatistics[listPtr].elements
-            queueSize += self.receivedStatistics[listPtr].queueSize
-            listPtr += 1
-            listPtr = listPtr%self.historyWindow
-
-        # copy stream ids used 
-        streamIDs = []
-        for sid in self.activeStreamIDs:
-            streamIDs.append(sid)
-
-        receivedSize = len(self.receivedStatistics)
+        history = self.receivedStatistics
+        totalData = history.totalElements()
+        queueSize = history.totalQueueSize()
+
+        receivedSize = self.historyWindow
         currentTime = time.time()
-        totalTime = currentTime - backTime
+        totalTime = currentTime - history.backTime()
         if totalTime == 0:
             totalTime = 1e6
         self.runningStats.bitsPerSecond = (totalData * self.bitSize) / totalTime
         self.runningStats.elementsPerSecond = totalData / totalTime
         self.runningStats.averageQueueDepth = queueSize / receivedSize
-        self.runningStats.callsPerSecond = float((receivedSize - 1)) / totalTime
-        self.runningStats.streamIDs = streamIDs
-        self.runningStats.timeSinceLastCall = currentTime - frontTime
+        self.runningStats.callsPerSecond = float((receivedSize - 1) * self.sampling) / totalTime
+        self.runningStats.streamIDs = list(self.activeStreamIDs)
+        self.runningStats.timeSinceLastCall = currentTime - history.frontTime()
         if not self.flushTime == None:
             flushTotalTime = currentTime - self.flushTime
             self.runningStats.keywords = [CF.DataType(id="timeSinceLastFlush", value=CORBA.Any(CORBA.TC_double, flushTotalTime))]
+        if self.samplesDropped:
+            self.runningStats.keywords.append(CF.DataType(id="samplesDropped", value=CORBA.Any(CORBA.TC_ulonglong, self.samplesDropped)))
+            streamDropped = [CF.DataType(id=stream_id, value=CORBA.Any(CORBA.TC_ulonglong, samples))
+                             for stream_id, samples in self.streamSamplesDropped.iteritems()]
+            self.runningStats.keywords.append(CF.DataType(id="streamSamplesDropped", value=CORBA.Any(CF._tc_Properties, streamDropped)))
+        self.runningStats.keywords.extend(_percentileKeywords('queueDepth', history.queueSizes()))
 
         return self.runningStats
 
 
 
 class OutStats:
-    class statPoint:
-        def __init__(self):
-            self.elements = 0
-            self.queueSize = 0.0
-            self.secs = 0.0
-            self.streamID = ""
-
-    def __init__(self, name, element_type='', bits=0):
+    def __init__(self, name, element_type='', bits=0, window=10):
         # Backwards-compatibility: accept an element type string for use with
         # struct.calcsize
         if not bits:
             bits = struct.calcsize(element_type) * 8
         self.enabled = True
         self.bitSize = bits
-        self.historyWindow = 10
+        self.sampling = 1
         self.receivedStatistics = {}
         self.name = name
-        self.receivedStatistics_idx = {}
         self.activeStreamIDs = []
         self.connection_errors={}
+        self.setHistoryWindow(window)
 
     def setEnabled(self, enableStats):
         self.enabled = enableStats
 
+    def setBitSize(self, bitSize ):
+        self.bitSize = bitSize
+
+    def setHistoryWindow(self, window):
+        """
+        Sets the number of points per connection used to compute statistics,
+        discarding the existing history.
+        """
+        if window < 2:
+            raise ValueError('history window must be at least 2')
+        self.historyWindow = window
+        for connectionId in self.receivedStatistics:
+            self.receivedStatistics[connectionId] = _StatHistory(window)
+
+    def setSampling(self, count):
+        """
+        Records only every count-th update per connection, reducing the
+        per-packet cost of statistics at high packet rates.
+        """
+        if count < 1:
+            raise ValueError('sampling count must be at least 1')
+        self.sampling = count
+        for history in self.receivedStatistics.itervalues():
+            history.skip = 0
+
     def connectionErrors(self, connection_id):
         self.connection_errors.setdefault(connection_id,0)
         return self.connection_errors[connection_id]
@@ -154,71 +282,79 @@ class OutStats:
         return self.connection_errors[connection_id]
 
     def add(self, connectionId):
-        self.receivedStatistics[connectionId] = [self.statPoint() for xx in xrange(self.historyWindow)]
-        self.receivedStatistics_idx[connectionId] = 0
+        self.receivedStatistics[connectionId] = _StatHistory(self.historyWindow)
         self.connection_errors[connectionId] = 0
     
     def remove(self, connectionId):
-        if self.receivedStatistics.has_key(connectionId):
-            self.receivedStatistics.pop(connectionId)
-        if self.connection_errors.has_key(connectionId):
-            self.connection_errors.pop(connectionId)
-
-    def update(self, elementsReceived, queueSize, EOS, streamID, connectionId):
-        self.connection_errors.setdefault(connectionId,0)
-        self.connection_errors[connectionId]=0
+        self.receivedStatistics.pop(connectionId, None)
+        self.connection_errors.pop(connectionId, None)
+
+    def update(self, elementsReceived, queueSize, EOS, streamID, connectionId, latency=None):
+        self.connection_errors[connectionId] = 0
         if not self.enabled:
             return
 
-        if not self.receivedStatistics.has_key(connectionId):
+        try:
+            history = self.receivedStatistics[connectionId]
+        except KeyError:
             self.add(connectionId)
-        self.receivedStatistics[connectionId][self.receivedStatistics_idx[connectionId]].elements = elementsReceived
-        self.receivedStatistics[connectionId][self.receivedStatistics_idx[connectionId]].queueSize = queueSize
-        self.receivedStatistics[connectionId][self.receivedStatistics_idx[connectionId]].secs = time.time()
-        self.receivedStatistics[connectionId][self.receivedStatistics_idx[connectionId]].streamID = streamID
-        self.receivedStatistics_idx[connectionId] += 1
-        self.receivedStatistics_idx[connectionId] = self.receivedStatistics_idx[connectionId]%self.historyWindow
+            history = self.receivedStatistics[connectionId]
+        if history.skip:
+            history.skip -= 1
+            history.pending += elementsReceived
+            return
+
+        # Record the point in the history ring buffer (inlined for speed)
+        history.skip = self.sampling - 1
+        index = history.index
+        if history.pending:
+            elementsReceived += history.pending
+            history.pending = 0
+        history.elements[index] = elementsReceived
+        history.queueSize[index] = queueSize
+        history.secs[index] = time.time()
+        history.streamIDs[index] = streamID
+        if latency is None:
+            latency = -1.0
+        history.latency[index] = latency
+        index += 1
+        if index == history.window:
+            index = 0
+            history.count = history.window
+        elif history.count < index:
+            history.count = index
+        history.index = index
 
     def retrieve(self):
         if not self.enabled:
             return
 
         retVal = []
-        for entry in self.receivedStatistics:
+        for entry, history in self.receivedStatistics.iteritems():
             runningStats = PortStatistics(portName=self.name,averageQueueDepth=-1,elementsPerSecond=-1,bitsPerSecond=-1,callsPerSecond=-1,streamIDs=[],timeSinceLastCall=-1,keywords=[])
 
-            listPtr = (self.receivedStatistics_idx[entry] + 1) % self.historyWindow    # don't count the first set of data, since we're looking at change in time rather than absolute time
-            frontTime = self.receivedStatistics[entry][(self.receivedStatistics_idx[entry] - 1) % self.historyWindow].secs
-            backTime = self.receivedStatistics[entry][self.receivedStatistics_idx[entry]].secs
-            totalData = 0.0
-            queueSize = 0.0
-            streamIDs = []
-            while (listPtr != self.receivedStatistics_idx[entry]):
-                totalData += self.receivedStatistics[entry][listPtr].elements
-                queueSize += self.receivedStatistics[entry][listPtr].queueSize
-                streamIDptr = 0
-                foundstreamID = False
-                while (streamIDptr != len(streamIDs)):
-                    if (streamIDs[streamIDptr] == self.receivedStatistics[entry][listPtr].streamID):
-                        foundstreamID = True
-                        break
-                    streamIDptr += 1
-                if (not foundstreamID):
-                    streamIDs.append(self.receivedStatistics[entry][listPtr].streamID)
-                listPtr += 1
-                listPtr = listPtr % self.historyWindow
+            totalData = history.totalElements()
+            queueSize = history.totalQueueSize()
 
             currentTime = time.time()
-            totalTime = currentTime - backTime
+            totalTime = currentTime - history.backTime()
             if totalTime == 0:
                 totalTime = 1e6
-            receivedSize = len(self.receivedStatistics[entry])
+            receivedSize = self.historyWindow
             runningStats.bitsPerSecond = (totalData * self.bitSize) / totalTime
             runningStats.elementsPerSecond = totalData/totalTime
             runningStats.averageQueueDepth = queueSize / receivedSize
-            runningStats.callsPerSecond = float((receivedSize - 1)) / totalTime
-            runningStats.streamIDs = streamIDs
-            runningStats.timeSinceLastCall = currentTime - frontTime
+            runningStats.callsPerSecond = float((receivedSize - 1) * self.sampling) / totalTime
+            runningStats.streamIDs = history.recentStreamIDs()
+            runningStats.timeSinceLastCall = currentTime - history.frontTime()
+            latencies = history.latencies()
+            if latencies:
+                # Only reported when the port measures latency (i.e., not for
+                # direct use of OutStats)
+                averageLatency = sum(latencies) / len(latencies)
+                runningStats.keywords = [CF.DataType(id="averageLatency", value=CORBA.Any(CORBA.TC_double, averageLatency))]
+                runningStats.keywords.extend(_percentileKeywords('latency', latencies))
+            runningStats.keywords.extend(_percentileKeywords('queueDepth', history.queueSizes()))
             usesPortStat = UsesPortStatistics(connectionId=entry, statistics=runningStats)
             retVal.append(usesPortStat)
         return retVal
@@ -0,0 +1,107 @@
+#
+# This file is protected by Copyright. Please refer to the COPYRIGHT file
+# distributed with this source distribution.
+#
+# This file is part of REDHAWK bulkioInterfaces.
+#
+# REDHAWK bulkioInterfaces is free software: you can redistribute it and/or modify it under
+# the terms of the GNU Lesser General Public License as published by the Free
+# Software Foundation, either version 3 of the License, or (at your option) any
+# later version.
+#
+# REDHAWK bulkioInterfaces is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE.  See the GNU Lesser General Public License for more
+# details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this program.  If not, see http://www.gnu.org/licenses/.
+#
+import threading
+import itertools
+import heapq
+import time
+
+class TimerQueue(object):
+    """
+    Single thread that runs calls at scheduled times on behalf of an output
+    port.
+
+    All of a port's timed work (e.g., flushing buffered streams that have
+    reached their latency limit) shares one thread, regardless of how many
+    streams are using it. Calls are run in order of their scheduled time; a
+    call cannot be cancelled, so it must check whether it still has work to
+    do when it runs.
+    """
+    def __init__(self, logger=None):
+        self._log = logger
+        self._lock = threading.Lock()
+        self._cond = threading.Condition(self._lock)
+        # Heap of (when, sequence, func, args); the sequence number keeps
+        # calls scheduled for the same time in order
+        self._queue = []
+        self._sequence = itertools.count()
+        self._running = True
+        self._thread = threading.Thread(target=self._run)
+        self._thread.setDaemon(True)
+        self._thread.start()
+
+    def schedule(self, when, func, *args):
+        """
+        Queues a call to `func` with `args` at the absolute time `when`, in
+        seconds since the epoch.
+        """
+        with self._lock:
+            if not self._running:
+                return
+            entry = (when, self._sequence.next(), func, args)
+            heapq.heappush(self._queue, entry)
+            # Only wake the thread if its next deadline changed
+            if self._queue[0] is entry:
+                self._cond.notify()
+
+    def pending(self):
+        """
+        Returns the number of calls waiting to run.
+        """
+        return len(self._queue)
+
+    def stop(self):
+        """
+        Terminates the thread, then immediately runs any calls that have not
+        yet run, in order, so that their work (e.g., flushing buffered data)
+        is not lost.
+        """
+        with self._lock:
+            self._running = False
+            pending = sorted(self._queue)
+            self._queue = []
+            self._cond.notify()
+        if self._thread is not threading.currentThread():
+            self._thread.join()
+        for when, sequence, func, args in pending:
+            self._call(func, args)
+
+    def _call(self, func, args):
+        try:
+            func(*args)
+        except Exception, e:
+            if self._log:
+                self._log.exception("Timed call failed: %s", e)
+
+    def _run(self):
+        while True:
+            with self._lock:
+                while self._running:
+                    if not self._queue:
+                        self._cond.wait()
+                        continue
+                    delay = self._queue[0][0] - time.time()
+                    if delay <= 0:
+                        break
+                    self._cond.wait(delay)
+                if not self._running:
+                    return
+                when, sequence, func, args = heapq.heappop(self._queue)
+
+            self._call(func, args)
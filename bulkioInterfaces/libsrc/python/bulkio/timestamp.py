@@ -18,9 +18,13 @@
 # along with this program.  If not, see http://www.gnu.org/licenses/.
 #
 import time
-import copy
 import math
 
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
 from bulkio.bulkioInterfaces import BULKIO
 
 def now():
@@ -82,13 +86,13 @@ def compare(T1, T2):
     return True
 
 def addSampleOffset(T, numSamples=0, xdelta=0.0):
-    tstamp = copy.deepcopy(T)
-    tstamp.twsec += int(numSamples*xdelta)
-    tstamp.tfsec += numSamples*xdelta - int(numSamples*xdelta)
-    if tstamp.tfsec >= 1.0:
-        tstamp.twsec += 1
-        tstamp.tfsec -= 1.0
-    return tstamp
+    offset = numSamples*xdelta
+    twsec = T.twsec + int(offset)
+    tfsec = T.tfsec + offset - int(offset)
+    if tfsec >= 1.0:
+        twsec += 1
+        tfsec -= 1.0
+    return BULKIO.PrecisionUTCTime(T.tcmode, T.tcstatus, T.toff, twsec, tfsec)
 
 def normalize(tstamp):
     # Get fractional adjustment from whole seconds
@@ -108,21 +112,50 @@ def normalize(tstamp):
 def difference(t1, t2):
     return (t1.twsec - t2.twsec) + (t1.tfsec - t2.tfsec)
 
+def _addOffset(twsec, tfsec, offset):
+    # Same steps as iadd() followed by normalize(), without modifying the
+    # time stamp, so that the results are identical
+    fractional, whole = math.modf(offset)
+    fadj, twsec = math.modf(twsec + whole)
+    tfsec, wadj = math.modf(tfsec + fractional + fadj)
+    if tfsec < 0.0:
+        tfsec += 1.0
+        wadj -= 1.0
+    return twsec + wadj, tfsec
+
 def add(t1, offset):
-    return iadd(copy.copy(t1), offset)
+    twsec, tfsec = _addOffset(t1.twsec, t1.tfsec, offset)
+    return BULKIO.PrecisionUTCTime(t1.tcmode, t1.tcstatus, t1.toff, twsec, tfsec)
 
 def iadd(t1, offset):
-    fractional, whole = math.modf(offset)
-    t1.twsec += whole
-    t1.tfsec += fractional
-    normalize(t1)
+    t1.twsec, t1.tfsec = _addOffset(t1.twsec, t1.tfsec, offset)
     return t1
 
+def addOffsets(T, offsets):
+    """
+    Computes the time stamps for a sequence of offsets (in seconds) from a
+    BULKIO.PrecisionUTCTime T, such as the start times of N packets, in a
+    single operation. Each result is equal to T + offset. Returns a list of
+    new BULKIO.PrecisionUTCTime objects.
+    """
+    if numpy is None:
+        return [add(T, offset) for offset in offsets]
+
+    fractional, whole = numpy.modf(numpy.asarray(offsets, dtype=numpy.float64))
+    fadj, twsec = numpy.modf(T.twsec + whole)
+    tfsec, wadj = numpy.modf(T.tfsec + fractional + fadj)
+    negative = tfsec < 0.0
+    tfsec[negative] += 1.0
+    wadj[negative] -= 1.0
+    twsec += wadj
+    return [BULKIO.PrecisionUTCTime(T.tcmode, T.tcstatus, T.toff, ws, fs)
+            for ws, fs in zip(twsec.tolist(), tfsec.tolist())]
+
 def sub(t1, other):
     if isinstance(other, BULKIO.PrecisionUTCTime):
         return difference(t1, other)
     else:
-        return isub(copy.copy(t1), other)
+        return add(t1, -other)
 
 def isub(t1, offset):
     return iadd(t1, -offset)
@@ -143,6 +176,75 @@ def toString(tstamp):
     return '%04d:%02d:%02d::%02d:%02d:%02d.%06d' % (gmt.tm_year, gmt.tm_mon, gmt.tm_mday, gmt.tm_hour,
                                                     gmt.tm_min, gmt.tm_sec, fractional)
 
+class UTCTime(object):
+    """
+    Compact, mutable time stamp for repeated arithmetic.
+
+    UTCTime holds the same fields as BULKIO.PrecisionUTCTime, with the whole
+    seconds kept as an integer, and performs addition and subtraction in place
+    without creating intermediate objects. Code that advances a time stamp
+    many times (e.g., once per sub-packet) can use a UTCTime and convert to
+    a BULKIO.PrecisionUTCTime only when the value is needed for a CORBA call.
+    """
+    __slots__ = ('tcmode', 'tcstatus', 'toff', 'twsec', 'tfsec')
+    def __init__(self, tcmode=BULKIO.TCM_OFF, tcstatus=BULKIO.TCS_INVALID, toff=0.0, twsec=0, tfsec=0.0):
+        self.tcmode = tcmode
+        self.tcstatus = tcstatus
+        self.toff = toff
+        self.twsec = twsec
+        self.tfsec = tfsec
+
+    @classmethod
+    def fromPrecisionUTCTime(cls, T):
+        """
+        Creates a UTCTime from a BULKIO.PrecisionUTCTime, normalizing the
+        whole and fractional seconds.
+        """
+        twsec, tfsec = _addOffset(T.twsec, T.tfsec, 0.0)
+        return cls(T.tcmode, T.tcstatus, T.toff, int(twsec), tfsec)
+
+    def toPrecisionUTCTime(self):
+        """
+        Returns a new BULKIO.PrecisionUTCTime with the current value.
+        """
+        return BULKIO.PrecisionUTCTime(self.tcmode, self.tcstatus, self.toff,
+                                       float(self.twsec), self.tfsec)
+
+    def copy(self):
+        return UTCTime(self.tcmode, self.tcstatus, self.toff, self.twsec, self.tfsec)
+
+    def __iadd__(self, offset):
+        fractional, whole = math.modf(offset)
+        tfsec, wadj = math.modf(self.tfsec + fractional)
+        if tfsec < 0.0:
+            tfsec += 1.0
+            wadj -= 1.0
+        self.twsec += int(whole + wadj)
+        self.tfsec = tfsec
+        return self
+
+    def __isub__(self, offset):
+        return self.__iadd__(-offset)
+
+    def __add__(self, offset):
+        return self.copy().__iadd__(offset)
+
+    def __sub__(self, other):
+        if isinstance(other, (UTCTime, BULKIO.PrecisionUTCTime)):
+            return difference(self, other)
+        return self.copy().__iadd__(-other)
+
+    def __cmp__(self, other):
+        if not isinstance(other, (UTCTime, BULKIO.PrecisionUTCTime)):
+            return -1
+        return cmp((self.twsec, self.tfsec), (other.twsec, other.tfsec))
+
+    def __str__(self):
+        return toString(self)
+
+    def __repr__(self):
+        return 'UTCTime(%d, %d, %r, %d, %r)' % (self.tcmode, self.tcstatus, self.toff, self.twsec, self.tfsec)
+
 # Insert the arithmetic functions as operators on the PrecisionUTCTime class
 BULKIO.PrecisionUTCTime.__add__ = add
 BULKIO.PrecisionUTCTime.__iadd__ = iadd
@@ -0,0 +1,548 @@
+#
+# This file is protected by Copyright. Please refer to the COPYRIGHT file
+# distributed with this source distribution.
+#
+# This file is part of REDHAWK bulkioInterfaces.
+#
+# REDHAWK bulkioInterfaces is free software: you can redistribute it and/or modify it under
+# the terms of the GNU Lesser General Public License as published by the Free
+# Software Foundation, either version 3 of the License, or (at your option) any
+# later version.
+#
+# REDHAWK bulkioInterfaces is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE.  See the GNU Lesser General Public License for more
+# details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this program.  If not, see http://www.gnu.org/licenses/.
+#
+"""
+Alternate transports for connections between co-located Python BulkIO ports.
+
+Output ports normally push data to their connections through omniORB, which
+marshals every call even when the input port is in the same process or on the
+same host. At connection time, an output port may instead select:
+
+   local : the input port is a servant in the same process; pushes are direct
+           method calls on the servant, with no marshaling.
+
+   pyshm : the input port is a Python port on the same host; data is written
+           into a memory-mapped ring buffer (in /dev/shm) and a named pipe
+           carries the location of each message to a reader thread in the
+           input port's process.
+
+The shared memory transport is negotiated via the ExtendedCF
+NegotiableProvidesPort interface, which only Python input ports advertise
+this transport type on; other peers fall back to CORBA.
+"""
+
+import os
+import copy
+import mmap
+import array
+import errno
+import select
+import socket
+import struct
+import tempfile
+import threading
+import collections
+import uuid
+
+import omniORB
+from omniORB import CORBA
+from ossie.cf import CF, ExtendedCF
+from ossie import properties
+
+from bulkio.bulkioInterfaces import BULKIO
+
+# Transport type name for the Python shared memory transport
+SHM_TRANSPORT = 'pyshm'
+
+# Default size of the ring buffer; large enough to hold the largest packet a
+# numeric output port sends by default
+SHM_BUFFER_SIZE = 4 * 1024 * 1024
+
+# Maximum time, in seconds, to wait for a reader thread to exit when its
+# transport is stopped; it may be blocked delivering a packet to an input port
+# whose queue is full
+_STOP_TIMEOUT = 1.0
+
+_NEGOTIABLE_REPO_ID = 'IDL:ExtendedCF/NegotiableProvidesPort:1.0'
+
+# Message types, sent over the named pipe with the offset and length of the
+# message body in the ring buffer
+_MSG_SRI = 1
+_MSG_PACKET = 2
+_MSG_CLOSE = 3
+_MESSAGE = struct.Struct('=BII')
+
+# Packet header: time stamp fields, end-of-stream and stream ID length
+_PACKET_HEADER = struct.Struct('=hhddd?I')
+
+def getLocalServant(obj):
+    """
+    Returns the servant for object reference `obj` if it is implemented in
+    this process, or None.
+    """
+    try:
+        orb = CORBA.ORB_init()
+        poa = orb.resolve_initial_references('RootPOA')
+        return poa.reference_to_servant(obj)
+    except Exception:
+        # Not a local object (or not activated on the root POA)
+        return None
+
+def packData(data, typecode):
+    """
+    Packs a sequence of numbers into a binary string of element type
+    `typecode`; strings are returned as-is.
+    """
+    if isinstance(data, str):
+        return data
+    if typecode in 'qQ':
+        # array does not support 64-bit integers in Python 2
+        return struct.pack('=%d%s' % (len(data), typecode), *data)
+    return array.array(typecode, data).tostring()
+
+def unpackData(data, typecode):
+    """
+    Unpacks a binary string of element type `typecode` into a list.
+    """
+    if typecode in 'qQ':
+        count = len(data) / struct.calcsize(typecode)
+        return list(struct.unpack('=%d%s' % (count, typecode), data))
+    return array.array(typecode, data).tolist()
+
+def _shmDirectory():
+    if os.path.isdir('/dev/shm'):
+        return '/dev/shm'
+    return tempfile.gettempdir()
+
+def _readFully(fd, size):
+    # Read exactly `size` bytes from `fd`, or return None on end-of-file
+    result = ''
+    while len(result) < size:
+        try:
+            chunk = os.read(fd, size - len(result))
+        except OSError, e:
+            if e.errno == errno.EINTR:
+                continue
+            raise
+        if not chunk:
+            return None
+        result += chunk
+    return result
+
+
+class LocalTransport(object):
+    """
+    Output transport for an input port servant in the same process.
+    """
+    transportType = 'local'
+
+    def __init__(self, servant):
+        self._servant = servant
+        self._congestionListener = None
+
+    def congested(self):
+        """
+        Returns True if the input port reports that it is congested.
+        """
+        congested = getattr(self._servant, 'congested', None)
+        return bool(congested and congested())
+
+    def setCongestionListener(self, callback):
+        """
+        Forwards changes in the input port's congestion state to `callback`,
+        replacing any previous listener (None to remove).
+        """
+        if not hasattr(self._servant, 'addCongestionListener'):
+            return
+        if self._congestionListener:
+            self._servant.removeCongestionListener(self._congestionListener)
+        self._congestionListener = callback
+        if callback:
+            self._servant.addCongestionListener(callback)
+
+    def pushSRI(self, H):
+        # The caller may modify the SRI after pushing it, which would otherwise
+        # change the input port's copy (CORBA always passes a copy)
+        self._servant.pushSRI(copy.deepcopy(H))
+
+    def pushPacket(self, *args):
+        # Arguments differ by port type (e.g., XML has no time stamp); shallow
+        # copies are sufficient, because data elements are numbers or the data
+        # is an immutable string, and much cheaper than marshaling
+        self._servant.pushPacket(*[copy.copy(arg) for arg in args])
+
+    def transportInfo(self):
+        return []
+
+    def disconnect(self):
+        self.setCongestionListener(None)
+
+
+class ShmOutputTransport(object):
+    """
+    Writer side of the shared memory transport.
+
+    The ring buffer and named pipes are created by the writer and opened by
+    the reader during negotiation, after which they are unlinked so that
+    nothing is left behind if either process exits. Space in the buffer is
+    allocated in order, and freed as the reader acknowledges each message
+    via a second pipe; when the buffer is full, the writer waits for the
+    reader to catch up. Packets that are too large for the buffer are sent
+    via CORBA, once all earlier messages have been processed.
+
+    If the reader goes away, the transport releases the buffer and pipes,
+    notifies its failure listener, and sends everything via CORBA from then
+    on.
+    """
+    transportType = SHM_TRANSPORT
+
+    def __init__(self, port, typecode, size=SHM_BUFFER_SIZE):
+        self._port = port
+        self._typecode = typecode
+        self._size = size
+        self.transportId = None
+        self._negotiablePort = None
+
+        base = os.path.join(_shmDirectory(), 'bulkio-%d-%s' % (os.getpid(), uuid.uuid4()))
+        self._paths = [base+'.buf', base+'.msg', base+'.ack']
+        self._bufferPath, self._messagePath, self._ackPath = self._paths
+
+        fd = os.open(self._bufferPath, os.O_RDWR|os.O_CREAT|os.O_EXCL, 0600)
+        try:
+            os.ftruncate(fd, size)
+            self._buffer = mmap.mmap(fd, size)
+        finally:
+            os.close(fd)
+        os.mkfifo(self._messagePath, 0600)
+        os.mkfifo(self._ackPath, 0600)
+        # Open the acknowledgement pipe first, non-blocking, so that the
+        # reader's open for writing does not block
+        self._ackFd = os.open(self._ackPath, os.O_RDONLY|os.O_NONBLOCK)
+        self._messageFd = None
+        self._failed = False
+        self._failureListener = None
+
+        # Allocated regions of the buffer, in order, as (offset, size)
+        self._pending = collections.deque()
+        self._head = 0
+
+    def getNegotiationProperties(self):
+        return properties.props_from_dict({'hostname': socket.gethostname(),
+                                           'buffer': self._bufferPath,
+                                           'messages': self._messagePath,
+                                           'acks': self._ackPath,
+                                           'size': self._size})
+
+    def connect(self, negotiablePort, transportId):
+        # The reader already has the message pipe open, so this does not block
+        self._messageFd = os.open(self._messagePath, os.O_WRONLY)
+        self._negotiablePort = negotiablePort
+        self.transportId = transportId
+        self._unlink()
+
+    def transportInfo(self):
+        return properties.props_from_dict({'transportId': self.transportId,
+                                           'size': self._size})
+
+    def setFailureListener(self, callback):
+        """
+        Calls `callback` with the exception that occurred if the reader goes
+        away and the transport falls back to CORBA, replacing any previous
+        listener (None to remove).
+        """
+        self._failureListener = callback
+
+    def pushSRI(self, H):
+        body = omniORB.cdrMarshal(BULKIO._tc_StreamSRI, H)
+        if not self._send(_MSG_SRI, body):
+            self._port.pushSRI(H)
+
+    def pushPacket(self, data, T, EOS, streamID):
+        header = _PACKET_HEADER.pack(T.tcmode, T.tcstatus, T.toff, T.twsec, T.tfsec, EOS, len(streamID))
+        body = header + streamID + packData(data, self._typecode)
+        if not self._send(_MSG_PACKET, body):
+            self._port.pushPacket(data, T, EOS, streamID)
+
+    def disconnect(self):
+        if self._messageFd is not None:
+            try:
+                os.write(self._messageFd, _MESSAGE.pack(_MSG_CLOSE, 0, 0))
+            except OSError:
+                # Reader is already gone
+                pass
+            os.close(self._messageFd)
+            self._messageFd = None
+        if self._negotiablePort is not None:
+            try:
+                self._negotiablePort.disconnectTransport(self.transportId)
+            except Exception:
+                # The remote side may have already cleaned up
+                pass
+            self._negotiablePort = None
+        self._close()
+
+    def _close(self):
+        for fd in (self._messageFd, self._ackFd):
+            if fd is not None:
+                os.close(fd)
+        self._messageFd = self._ackFd = None
+        if self._buffer is not None:
+            self._buffer.close()
+            self._buffer = None
+        self._unlink()
+
+    def _fail(self, error):
+        # The reader has exited (or its pipes are otherwise unusable); any
+        # messages it did not acknowledge are lost
+        self._failed = True
+        self._pending.clear()
+        self._close()
+        if self._failureListener:
+            self._failureListener(error)
+
+    def _unlink(self):
+        for path in self._paths:
+            try:
+                os.unlink(path)
+            except OSError:
+                pass
+
+    def _send(self, msgType, body):
+        # Returns False if the message must be sent by other means
+        if self._failed:
+            return False
+        try:
+            size = len(body)
+            if size > self._size:
+                # Wait for the reader to finish all previous messages, so that
+                # the caller's fallback is delivered in order
+                while self._pending:
+                    self._reclaim(True)
+                return False
+
+            offset = self._allocate(size)
+            self._buffer[offset:offset+size] = body
+            os.write(self._messageFd, _MESSAGE.pack(msgType, offset, size))
+            return True
+        except (IOError, OSError), e:
+            self._fail(e)
+            return False
+
+    def _allocate(self, size):
+        self._reclaim(False)
+        while True:
+            offset = self._fit(size)
+            if offset is not None:
+                self._pending.append((offset, size))
+                self._head = offset + size
+                return offset
+            self._reclaim(True)
+
+    def _fit(self, size):
+        # Returns the offset at which `size` bytes can be written, or None if
+        # there is not enough free space
+        if not self._pending:
+            return 0
+        tail = self._pending[0][0]
+        if self._head > tail:
+            # Used region is [tail, head); try the end first, then wrap around
+            if self._head + size <= self._size:
+                return self._head
+            elif size < tail:
+                return 0
+        elif self._head + size < tail:
+            # Used region wraps around; free space is [head, tail)
+            return self._head
+        return None
+
+    def _reclaim(self, block):
+        # Process acknowledgements from the reader, optionally waiting for at
+        # least one
+        if block:
+            select.select([self._ackFd], [], [])
+        try:
+            acks = os.read(self._ackFd, 4096)
+        except OSError, e:
+            if e.errno in (errno.EAGAIN, errno.EINTR):
+                return
+            raise
+        if not acks:
+            if block:
+                raise IOError(errno.EPIPE, 'Shared memory transport reader has exited')
+            return
+        for ii in xrange(len(acks)):
+            self._pending.popleft()
+
+
+class ShmInputTransport(object):
+    """
+    Reader side of the shared memory transport.
+
+    A thread reads message locations from the pipe, unpacks each message from
+    the ring buffer and delivers it to the input port via the normal
+    pushSRI() and pushPacket() methods, then acknowledges it so the writer
+    can reuse the space.
+
+    The thread exits when the writer sends a close message, when stop() is
+    called, or when the writer's process goes away without disconnecting
+    (detected as an error on the acknowledgement pipe, whose read end the
+    writer holds for the life of the transport). On exit, the thread releases
+    the pipes and buffer, and the input port is notified via its
+    _transportExited() method.
+    """
+    def __init__(self, port, transportId, props, logger=None):
+        self._port = port
+        self.transportId = transportId
+        self._log = logger
+
+        fd = os.open(props['buffer'], os.O_RDWR)
+        try:
+            self._buffer = mmap.mmap(fd, props['size'])
+        finally:
+            os.close(fd)
+        # Open the message pipe read-write, which neither blocks waiting for
+        # the writer nor sees end-of-file until this side closes it
+        self._messageFd = os.open(props['messages'], os.O_RDWR)
+        self._ackFd = os.open(props['acks'], os.O_WRONLY)
+
+        # Self-pipe used by stop() to wake the reader thread; the descriptors
+        # are only closed by the reader thread, with the lock held, so that
+        # stop() never writes to a closed (or reused) descriptor
+        self._lock = threading.Lock()
+        self._wakeRead, self._wakeWrite = os.pipe()
+
+        self._thread = threading.Thread(target=self._run)
+        self._thread.setDaemon(True)
+        self._thread.start()
+
+    def stop(self, timeout=_STOP_TIMEOUT):
+        with self._lock:
+            if self._wakeWrite is not None:
+                os.write(self._wakeWrite, '\x01')
+        if self._thread is threading.currentThread():
+            return
+        # If the thread is still delivering a message, it exits (and cleans up)
+        # once that completes
+        self._thread.join(timeout)
+        if self._thread.isAlive() and self._log:
+            self._log.warn("Shared memory transport '%s' reader is still busy after %s seconds",
+                           self.transportId, timeout)
+
+    def _wait(self, poller):
+        # Returns True if there is a message to read, or False if the reader
+        # should exit
+        while True:
+            try:
+                events = dict(poller.poll())
+            except select.error, e:
+                if e.args[0] == errno.EINTR:
+                    continue
+                raise
+            if self._wakeRead in events:
+                return False
+            if events.get(self._messageFd, 0) & select.POLLIN:
+                return True
+            if self._ackFd in events:
+                # The writer has closed its end of the acknowledgement pipe
+                # without disconnecting (e.g., its process exited)
+                if self._log:
+                    self._log.debug("Shared memory transport '%s' writer has exited", self.transportId)
+                return False
+
+    def _run(self):
+        poller = select.poll()
+        poller.register(self._wakeRead, select.POLLIN)
+        poller.register(self._messageFd, select.POLLIN)
+        # Errors are always reported; no other events are of interest
+        poller.register(self._ackFd, 0)
+        try:
+            while self._wait(poller):
+                message = _readFully(self._messageFd, _MESSAGE.size)
+                if message is None:
+                    break
+                msgType, offset, size = _MESSAGE.unpack(message)
+                if msgType == _MSG_CLOSE:
+                    break
+                try:
+                    self._dispatch(msgType, self._buffer[offset:offset+size])
+                except Exception, e:
+                    if self._log:
+                        self._log.exception("Error delivering shared memory message: %s", e)
+                # Acknowledge only after the message is delivered, so that data
+                # the writer sends via CORBA when the buffer is too small is
+                # never received out of order
+                try:
+                    os.write(self._ackFd, '\x01')
+                except OSError:
+                    # Writer is gone
+                    break
+        finally:
+            self._close()
+            self._port._transportExited(self.transportId, self)
+
+    def _close(self):
+        with self._lock:
+            for fd in (self._messageFd, self._ackFd, self._wakeRead, self._wakeWrite):
+                os.close(fd)
+            self._messageFd = self._ackFd = None
+            self._wakeRead = self._wakeWrite = None
+            self._buffer.close()
+
+    def _dispatch(self, msgType, body):
+        if msgType == _MSG_SRI:
+            self._port.pushSRI(omniORB.cdrUnmarshal(BULKIO._tc_StreamSRI, body))
+        elif msgType == _MSG_PACKET:
+            tcmode, tcstatus, toff, twsec, tfsec, EOS, length = _PACKET_HEADER.unpack_from(body)
+            start = _PACKET_HEADER.size
+            streamID = body[start:start+length]
+            T = BULKIO.PrecisionUTCTime(tcmode, tcstatus, toff, twsec, tfsec)
+            data = self._port._unpackTransportData(body[start+length:])
+            self._port.pushPacket(data, T, EOS, streamID)
+
+
+def negotiateShmTransport(connection, port, typecode, logger=None):
+    """
+    Attempts to establish a shared memory transport to the input port
+    `connection`, returning the output transport on success or None if the
+    port does not support it or is on a different host.
+    """
+    try:
+        if not connection._is_a(_NEGOTIABLE_REPO_ID):
+            return None
+        negotiable = connection._narrow(ExtendedCF.NegotiableProvidesPort)
+        supported = negotiable._get_supportedTransports()
+    except Exception:
+        return None
+
+    for info in supported:
+        if info.transportType != SHM_TRANSPORT:
+            continue
+        props = properties.props_to_dict(info.transportProperties)
+        if props.get('hostname', None) != socket.gethostname():
+            return None
+
+        try:
+            transport = ShmOutputTransport(port, typecode)
+        except Exception, e:
+            if logger:
+                logger.warn("Unable to create shared memory transport: %s", e)
+            return None
+        try:
+            result = negotiable.negotiateTransport(SHM_TRANSPORT, transport.getNegotiationProperties())
+        except ExtendedCF.NegotiationError, e:
+            if logger:
+                logger.warn("Shared memory transport negotiation failed: %s", e.msg)
+            transport.disconnect()
+            return None
+        except Exception:
+            transport.disconnect()
+            return None
+        transport.connect(negotiable, result.transportId)
+        return transport
+    return None
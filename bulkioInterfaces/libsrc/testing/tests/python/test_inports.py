@@ -40,6 +40,24 @@ class SriListener(object):
     def reset(self):
         self.sri = None
 
+class TraceLogger(object):
+    """
+    Minimal logger that records TRACE messages, with a settable enabled state.
+    """
+    def __init__(self):
+        self.enabled = False
+        self.messages = []
+
+    def isEnabledFor(self, level):
+        return self.enabled
+
+    def trace(self, msg, *args):
+        self.messages.append(msg)
+
+    def __getattr__(self, name):
+        # Ignore all other logging calls
+        return lambda *args, **kwargs: None
+
 class InPortTest(object):
     def setUp(self):
         self.port = self.helper.createInPort()
@@ -122,6 +140,58 @@ class InPortTest(object):
         self.assertEqual(True, packet.sriChanged, 'packet.sriChanged should be True')
         self.assertEqual(1, packet.SRI.mode, 'packet.SRI should have complex mode')
 
+    def testGetPackets(self):
+        sri_a = bulkio.sri.create('test_get_packets_a')
+        self.port.pushSRI(sri_a)
+        sri_b = bulkio.sri.create('test_get_packets_b')
+        self.port.pushSRI(sri_b)
+
+        # Interleave packets from two streams
+        self._pushTestPacket(10, bulkio.timestamp.now(), False, sri_a.streamID)
+        self._pushTestPacket(20, bulkio.timestamp.now(), False, sri_b.streamID)
+        self._pushTestPacket(30, bulkio.timestamp.now(), False, sri_a.streamID)
+        self._pushTestPacket(40, bulkio.timestamp.now(), True, sri_b.streamID)
+
+        # Get a limited number of packets
+        packets = self.port.getPackets(2)
+        self.assertEqual(2, len(packets))
+        self.assertEqual([10, 20], [len(pkt.dataBuffer) for pkt in packets])
+        self.assertEqual([sri_a.streamID, sri_b.streamID], [pkt.streamID for pkt in packets])
+        self.assertEqual([True, True], [pkt.sriChanged for pkt in packets])
+        self.assertEqual(2, self.port.getCurrentQueueDepth())
+
+        # Get the rest of the packets
+        packets = self.port.getPackets()
+        self.assertEqual(2, len(packets))
+        self.assertEqual([30, 40], [len(pkt.dataBuffer) for pkt in packets])
+        self.assertEqual([False, True], [pkt.EOS for pkt in packets])
+        self.assertEqual([False, False], [pkt.sriChanged for pkt in packets])
+        self.assertEqual(0, self.port.getCurrentQueueDepth())
+
+        # No packets available
+        self.assertEqual([], self.port.getPackets())
+        self.assertEqual([], self.port.getPackets(timeout=0.1))
+
+    def testTraceLogLevel(self):
+        sri = bulkio.sri.create('test_trace_log_level')
+        self.port.pushSRI(sri)
+
+        # With TRACE disabled, the data path should not log anything
+        logger = TraceLogger()
+        self.port.setLogger(logger)
+        self._pushTestPacket(10, bulkio.timestamp.now(), False, sri.streamID)
+        self.port.getPacket()
+        self.assertEqual([], logger.messages)
+
+        # Enabling TRACE does not take effect until the port is told that the
+        # log level changed
+        logger.enabled = True
+        self._pushTestPacket(10, bulkio.timestamp.now(), False, sri.streamID)
+        self.assertEqual([], logger.messages)
+        self.port.refreshLogLevel()
+        self._pushTestPacket(10, bulkio.timestamp.now(), False, sri.streamID)
+        self.failIf(not logger.messages)
+
     def testSriChanged(self):
         """
         Tests that SRI changes are reported correctly from getPacket().
@@ -160,6 +230,43 @@ class InPortTest(object):
         self.failUnless(packet.inputQueueFlushed)
         self.failUnless(packet.sriChanged)
 
+    def testSriChangedKeywords(self):
+        """
+        Tests that re-pushing an SRI with keywords is only reported as a change
+        when the keywords differ.
+        """
+        listener = SriListener()
+        self.port.setSriChangeListener(listener)
+
+        sri = bulkio.sri.create('sri_changed_keywords')
+        for index in xrange(10):
+            bulkio.sri.setKeyword(sri, 'keyword_%d' % index, float(index))
+        self.port.pushSRI(sri)
+        self._pushTestPacket(1, bulkio.timestamp.now(), False, sri.streamID)
+        packet = self.port.getPacket(bulkio.const.NON_BLOCKING)
+        self.failUnless(packet.sriChanged)
+
+        # Push an identical SRI; no change should be reported
+        self.port.pushSRI(sri)
+        self._pushTestPacket(1, bulkio.timestamp.now(), False, sri.streamID)
+        packet = self.port.getPacket(bulkio.const.NON_BLOCKING)
+        self.failIf(packet.sriChanged)
+        self.failIf(listener.sri is not None)
+
+        # Modify one keyword
+        bulkio.sri.setKeyword(sri, 'keyword_5', -1.0)
+        self.port.pushSRI(sri)
+        self._pushTestPacket(1, bulkio.timestamp.now(), False, sri.streamID)
+        packet = self.port.getPacket(bulkio.const.NON_BLOCKING)
+        self.failUnless(packet.sriChanged)
+        self.assertEqual(-1.0, bulkio.sri.getKeyword(packet.SRI, 'keyword_5'))
+        self.failIf(listener.sri is None)
+
+        # The port's copy must not be affected by later changes to the pushed
+        # SRI
+        bulkio.sri.setKeyword(sri, 'keyword_5', -2.0)
+        self.assertEqual(-1.0, bulkio.sri.getKeyword(packet.SRI, 'keyword_5'))
+
     def testStatistics(self):
         """
         Tests that statistics reports the expected information.
@@ -281,6 +388,148 @@ class InPortTest(object):
         self._pushTestPacket(0, bulkio.timestamp.notSet(), True, stream)
         self.assertEqual(stream_ids, set(self.port._get_statistics().streamIDs))
 
+    def testStatisticsStreamIDsOrder(self):
+        """
+        Tests that statistics report stream IDs in the order they first
+        appeared.
+        """
+        stream_ids = ['sri_c', 'sri_a', 'sri_b']
+        for stream in stream_ids:
+            self.port.pushSRI(bulkio.sri.create(stream))
+            self._pushTestPacket(1, bulkio.timestamp.now(), False, stream)
+        self.assertEqual(stream_ids, self.port._get_statistics().streamIDs)
+
+        # A stream that ends and starts again goes to the end
+        self._pushTestPacket(0, bulkio.timestamp.notSet(), True, 'sri_c')
+        self._pushTestPacket(1, bulkio.timestamp.now(), False, 'sri_c')
+        self.assertEqual(['sri_a', 'sri_b', 'sri_c'], self.port._get_statistics().streamIDs)
+
+    def testStatisticsWindow(self):
+        """
+        Tests the statistics history window, sampling and percentiles.
+        """
+        self.assertRaises(ValueError, self.port.setStatsWindow, 1)
+        self.assertRaises(ValueError, self.port.setStatsSampling, 0)
+
+        self.port.setStatsWindow(4)
+        self.port.setStatsSampling(3)
+        sri = bulkio.sri.create('stats_window')
+        self.port.pushSRI(sri)
+        self._pushTestPacket(16, bulkio.timestamp.now(), False, sri.streamID)
+        history = self.port.stats.receivedStatistics
+        elements = history.elements[0]
+        for ii in xrange(12):
+            self._pushTestPacket(16, bulkio.timestamp.now(), False, sri.streamID)
+
+        # Only every third packet is recorded, but the recorded points include
+        # the elements of the skipped packets
+        self.assertEqual(4, history.count)
+        self.assertEqual([elements * 3] * 4, list(history.elements))
+
+        stats = self.port._get_statistics()
+        self.assertEqual([sri.streamID], stats.streamIDs)
+        keywords = dict((dt.id, dt.value.value()) for dt in stats.keywords)
+        for name in ('queueDepthP50', 'queueDepthP95', 'queueDepthP99'):
+            self.failUnless(name in keywords)
+        self.failUnless(keywords['queueDepthP50'] <= keywords['queueDepthP99'])
+
+    def testFlushPolicy(self):
+        """
+        Tests the partial queue flush policies.
+        """
+        self.assertEqual((bulkio.const.FLUSH_ALL, 0), self.port.getFlushPolicy())
+        self.assertRaises(ValueError, self.port.setFlushPolicy, 'bad_policy')
+        self.assertRaises(ValueError, self.port.setFlushPolicy, bulkio.const.FLUSH_DROP_OLDEST, 0)
+        self.assertRaises(ValueError, self.port.setFlushPolicy, bulkio.const.FLUSH_KEEP_EVERY, 1)
+
+        self.port.setMaxQueueDepth(4)
+        sri = bulkio.sri.create('flush_policy')
+        self.port.pushSRI(sri)
+
+        def overflow():
+            for length in xrange(1, 6):
+                self._pushTestPacket(length, bulkio.timestamp.now(), False, sri.streamID)
+            packets = self.port.getPackets()
+            return [(len(pkt.dataBuffer), pkt.inputQueueFlushed) for pkt in packets]
+
+        # Dropping the two oldest packets only flags the first one kept
+        self.port.setFlushPolicy(bulkio.const.FLUSH_DROP_OLDEST, 2)
+        self.assertEqual((bulkio.const.FLUSH_DROP_OLDEST, 2), self.port.getFlushPolicy())
+        self.assertEqual([(3, True), (4, False), (5, False)], overflow())
+
+        # The new packet is dropped, and the stream's next packet is flagged
+        self.port.setFlushPolicy(bulkio.const.FLUSH_DROP_NEWEST)
+        self.assertEqual([(1, False), (2, False), (3, False), (4, False)], overflow())
+        self._pushTestPacket(6, bulkio.timestamp.now(), False, sri.streamID)
+        packet = self.port.getPacket()
+        self.assertEqual(6, len(packet.dataBuffer))
+        self.failUnless(packet.inputQueueFlushed)
+
+        # Every other packet is kept, flagging each one after a gap
+        self.port.setFlushPolicy(bulkio.const.FLUSH_KEEP_EVERY)
+        self.assertEqual([(2, True), (4, True), (5, False)], overflow())
+
+        # End-of-stream is never dropped
+        self.port.setFlushPolicy(bulkio.const.FLUSH_DROP_NEWEST)
+        for length in xrange(1, 5):
+            self._pushTestPacket(length, bulkio.timestamp.now(), False, sri.streamID)
+        self._pushTestPacket(0, bulkio.timestamp.notSet(), True, sri.streamID)
+        packets = self.port.getPackets()
+        self.assertEqual(5, len(packets))
+        self.failUnless(packets[-1].EOS)
+
+        # The dropped samples are reported in the statistics
+        keywords = dict((dt.id, dt.value.value()) for dt in self.port._get_statistics().keywords)
+        self.failUnless(keywords['samplesDropped'] > 0)
+
+    def testWatermarks(self):
+        """
+        Tests congestion signalling based on queue watermarks.
+        """
+        self.assertEqual(None, self.port.getWatermarks())
+        self.assertRaises(ValueError, self.port.setWatermarks, 0)
+        self.assertRaises(ValueError, self.port.setWatermarks, 4, 4)
+
+        changes = []
+        self.port.addCongestionListener(changes.append)
+        self.port.setMaxQueueDepth(10)
+        self.port.setWatermarks(4, 1)
+        self.assertEqual((4, 1), self.port.getWatermarks())
+
+        sri = bulkio.sri.create('watermarks')
+        self.port.pushSRI(sri)
+        for ii in xrange(3):
+            self._pushTestPacket(1, bulkio.timestamp.now(), False, sri.streamID)
+        self.failIf(self.port.congested())
+        self.assertEqual(BULKIO.ACTIVE, self.port._get_state())
+
+        # Reaching the high watermark congests the port
+        self._pushTestPacket(1, bulkio.timestamp.now(), False, sri.streamID)
+        self.failUnless(self.port.congested())
+        self.assertEqual(BULKIO.BUSY, self.port._get_state())
+        self.assertEqual([True], changes)
+
+        # The port remains congested until the queue drains to the low
+        # watermark
+        self.port.getPacket()
+        self.port.getPacket()
+        self.failUnless(self.port.congested())
+        self.port.getPackets(1)
+        self.failIf(self.port.congested())
+        self.assertEqual([True, False], changes)
+
+        # Disabling watermarks ends congestion
+        for ii in xrange(3):
+            self._pushTestPacket(1, bulkio.timestamp.now(), False, sri.streamID)
+        self.assertEqual([True, False, True], changes)
+        self.port.setWatermarks(None)
+        self.failIf(self.port.congested())
+        self.assertEqual([True, False, True, False], changes)
+
+        self.port.removeCongestionListener(changes.append)
+        self.port.setWatermarks(1)
+        self.assertEqual(4, len(changes))
+
     def testSriChangedInvalidStream(self):
         """
         Tests that the callback is triggered and SRI changes are reported for
@@ -478,6 +727,34 @@ class InPortTest(object):
         self.assertFalse(packet.EOS)
         self.assertTrue(packet.sriChanged)
 
+    def testQueueFlushSriChange(self):
+        """
+        Tests that an SRI change is reported on the packet that causes a queue
+        flush.
+        """
+        sri = bulkio.sri.create('flush_sri_change')
+        sri.blocking = False
+        self.port.pushSRI(sri)
+        self.port.setMaxQueueDepth(1)
+
+        # Consume the initial SRI change, then fill the queue with a packet
+        # that does not have an SRI change
+        self._pushTestPacket(1, bulkio.timestamp.now(), False, sri.streamID)
+        packet = self.port.getPacket(bulkio.const.NON_BLOCKING)
+        self.assertTrue(packet.sriChanged)
+        self._pushTestPacket(1, bulkio.timestamp.now(), False, sri.streamID)
+
+        # Change the SRI and push another packet, causing a flush
+        sri.mode = 1
+        self.port.pushSRI(sri)
+        self._pushTestPacket(2, bulkio.timestamp.now(), False, sri.streamID)
+
+        packet = self.port.getPacket(bulkio.const.NON_BLOCKING)
+        self.failIf(packet.dataBuffer is None)
+        self.assertTrue(packet.inputQueueFlushed)
+        self.assertTrue(packet.sriChanged)
+        self.assertEqual(1, packet.SRI.mode)
+
     def testQueueSize(self):
         """
         Tests that the max queue size can be set to a non-default value or
@@ -511,6 +788,91 @@ class InPortTest(object):
             self.failIf(packet.dataBuffer is None)
             self.assertFalse(packet.inputQueueFlushed)
 
+    def testStreamQueueSize(self):
+        """
+        Tests that a per-stream queue depth only flushes the packets of the
+        stream that exceeds it
+        """
+        sri_burst = bulkio.sri.create('stream_burst')
+        self.port.pushSRI(sri_burst)
+        sri_steady = bulkio.sri.create('stream_steady')
+        self.port.pushSRI(sri_steady)
+
+        self.port.setMaxStreamQueueDepth(4)
+        self.assertEqual(4, self.port.getMaxStreamQueueDepth())
+
+        # Interleave packets for the steady stream with a burst that exceeds
+        # the per-stream depth several times over
+        self._pushTestPacket(1, bulkio.timestamp.now(), False, sri_steady.streamID)
+        for _ in xrange(10):
+            self._pushTestPacket(1, bulkio.timestamp.now(), False, sri_burst.streamID)
+        self._pushTestPacket(1, bulkio.timestamp.now(), False, sri_steady.streamID)
+        self.assertEqual(4, self.port.getCurrentQueueDepth())
+
+        # The steady stream's packets are unaffected; only the last 2 packets
+        # of the burst remain, and the first reports the flush
+        packet = self.port.getPacket(bulkio.const.NON_BLOCKING)
+        self.assertEqual(sri_steady.streamID, packet.streamID)
+        self.assertFalse(packet.inputQueueFlushed)
+
+        packet = self.port.getPacket(bulkio.const.NON_BLOCKING)
+        self.assertEqual(sri_burst.streamID, packet.streamID)
+        self.assertTrue(packet.inputQueueFlushed)
+
+        packet = self.port.getPacket(bulkio.const.NON_BLOCKING)
+        self.assertEqual(sri_burst.streamID, packet.streamID)
+        self.assertFalse(packet.inputQueueFlushed)
+
+        packet = self.port.getPacket(bulkio.const.NON_BLOCKING)
+        self.assertEqual(sri_steady.streamID, packet.streamID)
+        self.assertFalse(packet.inputQueueFlushed)
+        self.assertEqual(0, self.port.getCurrentQueueDepth())
+
+        # Restore the port-wide queue depth
+        self.port.setMaxStreamQueueDepth(None)
+        self.assertEqual(None, self.port.getMaxStreamQueueDepth())
+
+    def testStreamScheduling(self):
+        """
+        Tests round-robin and weighted selection of the current stream
+        """
+        stream_ids = ['stream_a', 'stream_b', 'stream_c']
+        for stream_id in stream_ids:
+            self.port.pushSRI(bulkio.sri.create(stream_id))
+
+        self.assertEqual(bulkio.const.SCHEDULE_FIFO, self.port.getStreamScheduling())
+        self.assertRaises(ValueError, self.port.setStreamScheduling, 'bad_mode')
+        self.port.setStreamScheduling(bulkio.const.SCHEDULE_ROUND_ROBIN)
+        self.assertEqual(bulkio.const.SCHEDULE_ROUND_ROBIN, self.port.getStreamScheduling())
+
+        # Stream A sends a burst before the others; with FIFO scheduling, all
+        # of its packets would be read first
+        for _ in xrange(4):
+            self._pushTestPacket(1, bulkio.timestamp.now(), False, 'stream_a')
+        for stream_id in stream_ids[1:]:
+            for _ in xrange(2):
+                self._pushTestPacket(1, bulkio.timestamp.now(), False, stream_id)
+
+        order = []
+        for _ in xrange(5):
+            stream = self.port.getCurrentStream(bulkio.const.NON_BLOCKING)
+            order.append(stream.streamID)
+            packet = self.port._nextPacket(bulkio.const.NON_BLOCKING, stream.streamID)
+            self.assertEqual(stream.streamID, packet.streamID)
+        self.assertEqual(['stream_a', 'stream_b', 'stream_c', 'stream_a', 'stream_b'], order)
+
+        # Give stream A two turns at a time
+        self.assertRaises(ValueError, self.port.setStreamWeight, 'stream_a', 0)
+        self.port.setStreamWeight('stream_a', 2)
+        for _ in xrange(4):
+            self._pushTestPacket(1, bulkio.timestamp.now(), False, 'stream_b')
+        order = []
+        for _ in xrange(5):
+            stream = self.port.getCurrentStream(bulkio.const.NON_BLOCKING)
+            order.append(stream.streamID)
+            self.port._nextPacket(bulkio.const.NON_BLOCKING, stream.streamID)
+        self.assertEqual(['stream_c', 'stream_a', 'stream_a', 'stream_b', 'stream_b'], order)
+
     def testSRIqueueBlock(self):
         """
         Tests that a queue can be flushed and allow packets to refill the queue, post flush.
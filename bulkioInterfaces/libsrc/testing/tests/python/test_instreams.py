@@ -21,6 +21,8 @@
 
 import unittest
 
+import numpy
+
 from omniORB.any import to_any
 
 from ossie.cf import CF
@@ -139,6 +141,37 @@ class InStreamTest(object):
         # The original stream should report end-of-stream
         self.failUnless(stream.eos())
 
+    def testReadBlocks(self):
+        # Push packets for two streams, ending the first
+        sri = bulkio.sri.create('read_blocks')
+        self.port.pushSRI(sri)
+        other = bulkio.sri.create('read_blocks_other')
+        self.port.pushSRI(other)
+        self._pushTestPacket(10, bulkio.timestamp.now(), False, sri.streamID)
+        self._pushTestPacket(15, bulkio.timestamp.now(), False, other.streamID)
+        self._pushTestPacket(20, bulkio.timestamp.now(), False, sri.streamID)
+        self._pushTestPacket(30, bulkio.timestamp.now(), True, sri.streamID)
+
+        stream = self.port.getStream(sri.streamID)
+        self.failIf(not stream)
+
+        # Read a limited number of blocks
+        blocks = stream.tryreadBlocks(2)
+        self.assertEqual([10, 20], [len(block.buffer) for block in blocks])
+        self.failUnless(blocks[0].sriChanged)
+        self.failIf(blocks[1].sriChanged)
+
+        # Read the remaining block, which ends the stream; the packet for the
+        # other stream should still be queued
+        blocks = stream.readBlocks()
+        self.assertEqual([30], [len(block.buffer) for block in blocks])
+        self.failIf(stream.eos())
+        self.assertEqual(1, self.port.getCurrentQueueDepth())
+
+        # No more data
+        self.assertEqual([], stream.readBlocks())
+        self.failUnless(stream.eos())
+
     def testSriChanges(self):
         stream_id = 'sri_changes'
 
@@ -433,6 +466,32 @@ class BufferedInStreamTest(InStreamTest):
         self.assertEqual(26, timestamps[1].offset)
         self.assertEqual(False, timestamps[1].synthetic)
 
+    def testTimeDrift(self):
+        sri = bulkio.sri.create('time_drift')
+        sri.xdelta = 0.0625;
+        self.port.pushSRI(sri)
+
+        # Push packets of size 32, which should advance the time by exactly 2
+        # seconds each; make the second packet 0.25 seconds late, and the third
+        # 0.125 seconds late
+        ts = bulkio.timestamp.create(4000.0, 0.5)
+        self._pushTestPacket(32, ts, False, sri.streamID)
+        self._pushTestPacket(32, ts+2.25, False, sri.streamID)
+        self._pushTestPacket(32, ts+4.125, False, sri.streamID)
+
+        stream = self.port.getStream(sri.streamID)
+        self.failIf(not stream)
+        block = stream.read(96)
+        self.failIf(not block)
+        self.assertEqual(3, len(block.getTimestamps()))
+        self.assertEqual(0.125, block.getNetTimeDrift())
+        self.assertEqual(0.25, block.getMaxTimeDrift())
+
+        # Adding a time stamp must update the drift values
+        block.addTimestamp(ts+5.5, 96)
+        self.assertEqual(-0.5, block.getNetTimeDrift())
+        self.assertEqual(-0.625, block.getMaxTimeDrift())
+
     def testDisableDiscard(self):
         stream_id = "disable_discard"
 
@@ -463,6 +522,25 @@ class BufferedInStreamTest(InStreamTest):
         block = stream.tryread(512)
         self.failUnless(not block)
 
+    def testReadBlocksBuffered(self):
+        sri = bulkio.sri.create('read_blocks_buffered')
+        self.port.pushSRI(sri)
+        self._pushTestPacket(100, bulkio.timestamp.now(), False, sri.streamID)
+        self._pushTestPacket(100, bulkio.timestamp.now(), False, sri.streamID)
+        self._pushTestPacket(100, bulkio.timestamp.now(), False, sri.streamID)
+
+        # Read part of the first packet, so that the rest of it is buffered
+        stream = self.port.getStream(sri.streamID)
+        self.failIf(not stream)
+        block = stream.read(60)
+        self.failIf(not block)
+
+        # The remainder of the buffered packet should be returned first
+        blocks = stream.tryreadBlocks()
+        self.assertEqual([40, 100, 100], [len(block.buffer) for block in blocks])
+        self.assertEqual([], stream.tryreadBlocks())
+
+
 class NumericInStreamTest(BufferedInStreamTest):
     def testSriModeChanges(self):
         stream_id = "sri_mode_changes"
@@ -523,6 +601,11 @@ class NumericInStreamTest(BufferedInStreamTest):
         self.failUnless(block.complex)
         self.assertEqual(64, block.cxsize)
 
+        # The complex view is converted once, then cached
+        cxdata = block.cxdata
+        self.assertEqual(64, len(cxdata))
+        self.failUnless(block.cxdata is cxdata)
+
     def testReadTimestampsComplex(self):
         # Create a new complex stream and push several packets with known
         # timestamps
@@ -579,6 +662,115 @@ class NumericInStreamTest(BufferedInStreamTest):
         self.assertEqual(4, timestamps[1].offset)
         self.assertEqual(False, timestamps[1].synthetic)
 
+    def testReadNumpy(self):
+        self.port.enableNumpy(True)
+        sri = bulkio.sri.create('read_numpy')
+        self.port.pushSRI(sri)
+        for _ in xrange(3):
+            self._pushTestPacket(100, bulkio.timestamp.now(), False, sri.streamID)
+
+        stream = self.port.getStream(sri.streamID)
+        self.failIf(not stream)
+
+        # A read within one packet should be a view of the packet's array
+        block = stream.read(50)
+        self.failIf(not block)
+        self.failUnless(isinstance(block.data, numpy.ndarray))
+        self.assertEqual(numpy.dtype(self.port.TRANSFER_TYPE), block.data.dtype)
+        self.assertEqual(50, block.size)
+        self.failIf(block.data.base is None)
+
+        # A read spanning multiple packets should still be a single array
+        block = stream.read(250)
+        self.failIf(not block)
+        self.failUnless(isinstance(block.data, numpy.ndarray))
+        self.assertEqual(numpy.dtype(self.port.TRANSFER_TYPE), block.data.dtype)
+        self.assertEqual(250, block.size)
+        self.assertEqual(3, len(block.getTimestamps()))
+
+        # Complex float data should be a complex view of the real data
+        sri.mode = 1
+        self.port.pushSRI(sri)
+        self._pushTestPacket(100, bulkio.timestamp.now(), False, sri.streamID)
+        block = stream.read()
+        self.failIf(not block)
+        self.failUnless(block.complex)
+        self.assertEqual(50, len(block.cxdata))
+        if block.data.dtype.kind == 'f':
+            self.assertEqual('c', block.cxdata.dtype.kind)
+            self.failUnless(numpy.may_share_memory(block.data, block.cxdata))
+
+    def testReadOverlapNumpy(self):
+        self.port.enableNumpy(True)
+        sri = bulkio.sri.create('read_overlap_numpy')
+        sri.xdelta = 0.0625
+        self.port.pushSRI(sri)
+
+        # Push packets of size 32 with known data and timestamps
+        ts = bulkio.timestamp.create(4000.0, 0.5)
+        for index in xrange(4):
+            data = range(index*32, (index+1)*32)
+            self.helper.pushPacket(self.port, self.helper.pack(data), ts+(index*2.0), False, sri.streamID)
+
+        stream = self.port.getStream(sri.streamID)
+        self.failIf(not stream)
+
+        # Read a block that spans the first two packets, consuming only half
+        block = stream.read(48, 24)
+        self.failIf(not block)
+        self.assertEqual(range(48), block.data.tolist())
+        timestamps = block.getTimestamps()
+        self.assertEqual(2, len(timestamps))
+        self.assertEqual(32, timestamps[1].offset)
+
+        # The next read overlaps the first; the time stamp at the start should
+        # be synthesized from the first packet
+        second = stream.read(48, 24)
+        self.failIf(not second)
+        self.assertEqual(range(24, 72), second.data.tolist())
+        timestamps = second.getTimestamps()
+        self.assertEqual(3, len(timestamps))
+        self.assertEqual(True, timestamps[0].synthetic)
+        self.assertEqual(ts+1.5, timestamps[0].time)
+        self.assertEqual(8, timestamps[1].offset)
+        self.assertEqual(40, timestamps[2].offset)
+
+        # Subsequent reads must not modify previously returned data
+        block = stream.read(80)
+        self.failIf(not block)
+        self.assertEqual(range(48, 128), block.data.tolist())
+        self.assertEqual(range(24, 72), second.data.tolist())
+
+
+class ByteInStreamTest(NumericInStreamTest):
+    def testReadByteArray(self):
+        self.port.enableByteArray(True)
+        sri = bulkio.sri.create('read_bytearray')
+        self.port.pushSRI(sri)
+        data = self.helper.pack(range(-64, 64) if self.port.TRANSFER_TYPE == 'b' else range(128))
+        self.helper.pushPacket(self.port, data, bulkio.timestamp.now(), False, sri.streamID)
+        self.helper.pushPacket(self.port, data, bulkio.timestamp.now(), False, sri.streamID)
+
+        stream = self.port.getStream(sri.streamID)
+        self.failIf(not stream)
+
+        # Data should be returned as the raw bytes, even across packets
+        block = stream.read(192)
+        self.failIf(not block)
+        self.failUnless(isinstance(block.data, bytearray))
+        self.assertEqual(data + data[:64], str(block.data))
+
+        # Switch back to lists of integers; data that was already received by
+        # the stream is not affected
+        self.port.enableByteArray(False)
+        block = stream.read()
+        self.failIf(not block)
+        self.assertEqual(data[64:], str(block.data))
+        self.helper.pushPacket(self.port, data, bulkio.timestamp.now(), False, sri.streamID)
+        block = stream.read()
+        self.failIf(not block)
+        self.assertEqual(self.helper.unpack(data), block.data)
+
 
 class InXMLStreamTest(InStreamTest, unittest.TestCase):
     helper = XMLTestHelper()
@@ -606,8 +798,8 @@ def register_test(name, testbase, **kwargs):
 
 register_test('InBitStreamTest', BufferedInStreamTest, helper=BitTestHelper())
 register_test('InFileStreamTest', InStreamTest, helper=FileTestHelper())
-register_test('InCharStreamTest', NumericInStreamTest, helper=CharTestHelper())
-register_test('InOctetStreamTest', NumericInStreamTest, helper=OctetTestHelper())
+register_test('InCharStreamTest', ByteInStreamTest, helper=CharTestHelper())
+register_test('InOctetStreamTest', ByteInStreamTest, helper=OctetTestHelper())
 register_test('InShortStreamTest', NumericInStreamTest, helper=ShortTestHelper())
 register_test('InUShortStreamTest', NumericInStreamTest, helper=UShortTestHelper())
 register_test('InLongStreamTest', NumericInStreamTest, helper=LongTestHelper())
@@ -19,9 +19,13 @@
 # along with this program.  If not, see http://www.gnu.org/licenses/.
 #
 
+import os
 import unittest
+import threading
+import time
 
-from ossie.cf import CF
+from omniORB import CORBA
+from ossie.cf import CF, ExtendedCF
 
 import bulkio
 from bulkio.bulkioInterfaces import BULKIO
@@ -52,6 +56,11 @@ class OutPortTest(object):
         self.__servants.append(stub)
         return stub
 
+    def _createInPort(self):
+        port = self.helper.createInPort()
+        self.__servants.append(port)
+        return port
+
     def _disconnectPorts(self):
         for connection in self.port._get_connections():
             self.port.disconnectPort(connection.connectionId)
@@ -123,6 +132,76 @@ class OutPortTest(object):
         self.assertEqual(0, len(connections))
         self.assertEqual(BULKIO.IDLE, self.port._get_state())
 
+    def testLocalTransport(self):
+        # The stub is in the same process, so it should be called directly
+        status = self.port._get_connectionStatus()
+        self.assertEqual(1, len(status))
+        self.assertEqual('local', status[0].transportType)
+
+        # Changes to the SRI after it is pushed must not be visible to the
+        # receiver, the same as with CORBA
+        sri = bulkio.sri.create('local_transport')
+        self.port.pushSRI(sri)
+        sri.xdelta = 0.5
+        self.assertEqual(1, len(self.stub.H))
+        self.assertEqual(1.0, self.stub.H[0].xdelta)
+
+        # Disconnecting sends an EOS via the transport
+        self.port.disconnectPort('test_connection')
+        self.assertEqual(1, len(self.stub.packets))
+        self.failUnless(self.stub.packets[0].EOS)
+        self.assertEqual([], self.port._get_connectionStatus())
+
+    def testCongestion(self):
+        # Replace the stub with an input port in the same process, which
+        # reports its congestion state directly
+        self.port.disconnectPort('test_connection')
+        inport = self._createInPort()
+        inport.setWatermarks(2)
+        self.port.connectPort(inport._this(), 'test_connection')
+        self.failIf(self.port.congested('test_connection'))
+        self.failIf(self.port.congested('bad_connection'))
+
+        changes = []
+        def listener(connectionId, congested):
+            changes.append((connectionId, congested))
+        self.port.addCongestionListener(listener)
+
+        stream = self.port.createStream('congestion')
+        self.failIf(stream.congested())
+        for ii in xrange(2):
+            self._pushTestPacket(1, bulkio.timestamp.now(), False, stream.streamID)
+        self.failUnless(self.port.congested('test_connection'))
+        self.failUnless(stream.congested())
+        self.assertEqual([('test_connection', True)], changes)
+
+        # Draining the input port notifies the listener
+        inport.getPackets()
+        self.failIf(self.port.congested('test_connection'))
+        self.assertEqual([('test_connection', True), ('test_connection', False)], changes)
+
+        self.port.removeCongestionListener(listener)
+
+    def testActiveSRIsKeywordRename(self):
+        sri = bulkio.sri.create('active_sris_keyword_rename')
+        bulkio.sri.setKeyword(sri, 'old_name', 1.0)
+        self.port.pushSRI(sri)
+
+        # Renaming a keyword without changing its value must replace the
+        # port's copy of the SRI
+        sri.keywords[0].id = 'new_name'
+        self.port.pushSRI(sri)
+        active_sris = self.port._get_activeSRIs()
+        self.assertEqual(1, len(active_sris))
+        self.assertEqual(['new_name'], [dt.id for dt in active_sris[0].keywords])
+
+        # A connection made afterwards should get the renamed keyword
+        stub2 = self._createStub()
+        self.port.connectPort(stub2._this(), 'connection_2')
+        self._pushTestPacket(1, bulkio.timestamp.now(), False, sri.streamID)
+        self.assertEqual(1, len(stub2.H))
+        self.assertEqual(['new_name'], [dt.id for dt in stub2.H[-1].keywords])
+
     def testStatistics(self):
         # Even if there are no active SRIs, there should still be statistics
         # for existing connections
@@ -142,6 +221,12 @@ class OutPortTest(object):
         self.failUnless(stats.elementsPerSecond > 0.0)
         bits_per_element = int(round(stats.bitsPerSecond / stats.elementsPerSecond))
         self.assertEqual(self.helper.BITS_PER_ELEMENT, bits_per_element)
+        self.assertEqual([sri.streamID], stats.streamIDs)
+
+        # Push latency is measured without fan-out, too
+        keywords = dict((dt.id, dt.value) for dt in stats.keywords)
+        self.failUnless('averageLatency' in keywords)
+        self.failUnless(keywords['latencyP50'].value() <= keywords['latencyP99'].value())
 
         # Test that statistics are returned for all connections
         stub2 = self._createStub()
@@ -212,6 +297,123 @@ class OutPortTest(object):
         self.assertEqual(3, len(stub2.packets))
         self.assertEqual(9, self.helper.packetLength(stub2.packets[-1].data))
 
+    def testFanout(self):
+        stub2 = self._createStub()
+        self.port.connectPort(stub2._this(), 'connection_2')
+        self.port.enableFanout(threads=2)
+        self.failUnless(self.port.fanoutEnabled())
+
+        sri = bulkio.sri.create('fanout_stream')
+        self.port.pushSRI(sri)
+        for length in xrange(1, 11):
+            self._pushTestPacket(length, bulkio.timestamp.now(), False, sri.streamID)
+
+        # Disconnecting waits for the queued packets, then sends end-of-stream
+        self.port.disconnectPort('connection_2')
+        self.assertEqual(1, len(stub2.H))
+        self.assertEqual(11, len(stub2.packets))
+        self.assertEqual(range(1, 11), [self.helper.packetLength(p.data) for p in stub2.packets[:-1]])
+        self.failUnless(stub2.packets[-1].EOS)
+
+        # Disabling fan-out waits for all queued pushes
+        self.port.disableFanout()
+        self.failIf(self.port.fanoutEnabled())
+        self.assertEqual(1, len(self.stub.H))
+        self.assertEqual(range(1, 11), [self.helper.packetLength(p.data) for p in self.stub.packets])
+
+        # Latency includes the time spent in the fan-out queue
+        uses_stats = self.port._get_statistics()
+        keywords = dict((dt.id, dt.value) for dt in uses_stats[0].statistics.keywords)
+        self.failUnless('averageLatency' in keywords)
+        self.failUnless(keywords['latencyP50'].value() <= keywords['latencyP99'].value())
+
+        self.assertRaises(ValueError, self.port.enableFanout, policy='bad_policy')
+
+    def testFanoutDropNewest(self):
+        lengths = self._testFanoutPolicy(bulkio.const.FANOUT_DROP_NEWEST)
+        self.assertEqual([1, 2, 3, 0], lengths)
+
+    def testFanoutDropOldest(self):
+        lengths = self._testFanoutPolicy(bulkio.const.FANOUT_DROP_OLDEST)
+        self.assertEqual([1, 4, 5, 0], lengths)
+
+    def testFanoutDropOldestNonDroppable(self):
+        entered, release = self._stallStub()
+        self.port.enableFanout(threads=1, queueDepth=2, policy=bulkio.const.FANOUT_DROP_OLDEST)
+        sri = bulkio.sri.create('fanout_non_droppable')
+        self.port.pushSRI(sri)
+        self._pushTestPacket(1, bulkio.timestamp.now(), False, sri.streamID)
+        entered.wait(1.0)
+        self.failUnless(entered.isSet())
+
+        try:
+            # Fill the queue with SRI updates, which are never dropped; with
+            # nothing older to discard, the new packet is dropped instead
+            for index in xrange(2):
+                sri.xdelta *= 2.0
+                self.port.pushSRI(sri)
+            self._pushTestPacket(2, bulkio.timestamp.now(), False, sri.streamID)
+            self.assertEqual(2, self.port._fanout.pending('test_connection'))
+
+            uses_stats = self.port._get_statistics()
+            keywords = dict((dt.id, dt.value) for dt in uses_stats[0].statistics.keywords)
+            self.assertEqual(1, keywords['packetsDropped'].value())
+        finally:
+            release.set()
+        self.port.disableFanout()
+        self.assertEqual([1], [self.helper.packetLength(p.data) for p in self.stub.packets])
+        self.assertEqual(3, len(self.stub.H))
+
+    def testFanoutReleasePort(self):
+        self.port.enableFanout(threads=2)
+        threads = list(self.port._fanout._threads)
+        sri = bulkio.sri.create('fanout_release')
+        self.port.pushSRI(sri)
+        self._pushTestPacket(1, bulkio.timestamp.now(), False, sri.streamID)
+
+        # Releasing the port delivers the queued pushes and stops the workers
+        self.port.releasePort()
+        self.failIf(self.port.fanoutEnabled())
+        for thread in threads:
+            self.failIf(thread.isAlive())
+        self.assertEqual(1, len(self.stub.packets))
+
+    def _stallStub(self):
+        # Stall the stub in its first pushPacket call, so that subsequent
+        # pushes back up in the connection's queue
+        entered = threading.Event()
+        release = threading.Event()
+        queue_packet = self.stub._queuePacket
+        def stalled_queue_packet(packet):
+            entered.set()
+            release.wait()
+            queue_packet(packet)
+        self.stub._queuePacket = stalled_queue_packet
+        return entered, release
+
+    def _testFanoutPolicy(self, policy):
+        entered, release = self._stallStub()
+        self.port.enableFanout(threads=1, queueDepth=2, policy=policy)
+        sri = bulkio.sri.create('fanout_policy')
+        self.port.pushSRI(sri)
+        self._pushTestPacket(1, bulkio.timestamp.now(), False, sri.streamID)
+        entered.wait(1.0)
+        self.failUnless(entered.isSet())
+
+        # Two packets fit in the queue and two are dropped; end-of-stream is
+        # always queued
+        for length in xrange(2, 6):
+            self._pushTestPacket(length, bulkio.timestamp.now(), False, sri.streamID)
+        self._pushTestPacket(0, bulkio.timestamp.notSet(), True, sri.streamID)
+
+        uses_stats = self.port._get_statistics()
+        keywords = dict((dt.id, dt.value) for dt in uses_stats[0].statistics.keywords)
+        self.assertEqual(2, keywords['packetsDropped'].value())
+
+        release.set()
+        self.port.disableFanout()
+        return [self.helper.packetLength(p.data) for p in self.stub.packets]
+
     def _addStreamFilter(self, streamId, connectionId):
         desc = bulkio.connection_descriptor_struct(connectionId, streamId, self.port.name)
         self.connectionTable.append(desc)
@@ -312,6 +514,172 @@ class NumericOutPortTest(ChunkingOutPortTest):
             self.assertEqual(expected, elapsed, 'Incorrect time stamp delta')
             last = packet
 
+    def testAdaptivePush(self):
+        # Make the stub reject packets larger than a limit well below the
+        # port's static maximum
+        limit = 1000
+        queue_packet = self.stub._queuePacket
+        def limited_queue_packet(packet):
+            if self.helper.packetLength(packet.data) > limit:
+                raise CORBA.MARSHAL()
+            queue_packet(packet)
+        self.stub._queuePacket = limited_queue_packet
+
+        self.port.enableAdaptivePush(True)
+        self.failUnless(self.port.adaptivePushEnabled())
+        stream_id = 'adaptive_push'
+        sri = bulkio.sri.create(stream_id)
+        sri.xdelta = 0.125
+        self.port.pushSRI(sri)
+
+        # All of the data should be received, in sub-packets that were
+        # accepted, with the correct time stamps
+        time = bulkio.timestamp.create(0.0, 0.0)
+        self._pushTestPacket(4096, time, False, stream_id)
+        self.failUnless(len(self.stub.packets) > 1)
+        self.assertEqual(4096, sum(self.helper.packetLength(p.data) for p in self.stub.packets))
+        last = self.stub.packets[0]
+        for packet in self.stub.packets[1:]:
+            self.failUnless(self.helper.packetLength(packet.data) <= limit)
+            expected = self.helper.packetLength(last.data) * sri.xdelta
+            self.assertEqual(expected, packet.T - last.T, 'Incorrect time stamp delta')
+            last = packet
+
+        # The learned size is reported in the statistics
+        uses_stats = self.port._get_statistics()
+        keywords = dict((dt.id, dt.value) for dt in uses_stats[0].statistics.keywords)
+        push_size = keywords['maxSamplesPerPush'].value()
+        self.failUnless(push_size <= limit)
+
+        # The next packet is split using the learned size
+        self.stub.packets = []
+        self._pushTestPacket(4096, time, True, stream_id)
+        self.assertEqual(4096, sum(self.helper.packetLength(p.data) for p in self.stub.packets))
+        for packet in self.stub.packets[:-1]:
+            self.assertEqual(push_size, self.helper.packetLength(packet.data))
+        self.failUnless(self.stub.packets[-1].EOS)
+
+    def testSharedMemoryTransport(self):
+        # Negotiate directly with an input port, because connectPort() would
+        # select the local transport for an input port in the same process
+        in_port = self._createInPort()
+        in_port.startPort()
+        objref = in_port._this()
+        port_transport = bulkio.transport.negotiateShmTransport(objref, objref, self.port.PortTransferType)
+        self.failIf(port_transport is None, 'Shared memory transport negotiation failed')
+        self.assertEqual(bulkio.transport.SHM_TRANSPORT, port_transport.transportType)
+
+        try:
+            stream_id = 'shm_transport'
+            sri = bulkio.sri.create(stream_id)
+            sri.xdelta = 0.25
+            port_transport.pushSRI(sri)
+
+            # Send enough data to wrap around the buffer several times
+            packets = 50
+            data = self.helper.createData(32768)
+            time = bulkio.timestamp.create(100.0, 0.5)
+            for index in xrange(packets):
+                port_transport.pushPacket(data, time, index == (packets - 1), stream_id)
+
+            for index in xrange(packets):
+                packet = in_port.getPacket(1.0)
+                self.assertEqual(stream_id, packet.streamID)
+                self.assertEqual(32768, len(packet.dataBuffer))
+                self.assertEqual(time, packet.T)
+                self.assertEqual(0.25, packet.SRI.xdelta)
+                self.assertEqual(index == (packets - 1), packet.EOS)
+        finally:
+            port_transport.disconnect()
+
+        # The input port should have released its side of the transport
+        self.assertRaises(ExtendedCF.NegotiationError, in_port.disconnectTransport, port_transport.transportId)
+
+    def testSharedMemoryTransportWriterExit(self):
+        in_port = self._createInPort()
+        in_port.startPort()
+        objref = in_port._this()
+        port_transport = bulkio.transport.negotiateShmTransport(objref, objref, self.port.PortTransferType)
+        self.failIf(port_transport is None, 'Shared memory transport negotiation failed')
+        reader = in_port._transports[port_transport.transportId]
+
+        # Simulate the writer's process exiting by closing its pipes without
+        # sending a close message or disconnecting the transport
+        os.close(port_transport._messageFd)
+        port_transport._messageFd = None
+        os.close(port_transport._ackFd)
+        port_transport._ackFd = None
+
+        # The reader thread should exit and remove itself from the port
+        reader._thread.join(1.0)
+        self.failIf(reader._thread.isAlive(), 'Reader thread did not exit')
+        self.failIf(port_transport.transportId in in_port._transports)
+        port_transport.disconnect()
+
+    def testSharedMemoryTransportReaderExit(self):
+        in_port = self._createInPort()
+        in_port.startPort()
+        objref = in_port._this()
+        port_transport = bulkio.transport.negotiateShmTransport(objref, objref, self.port.PortTransferType)
+        self.failIf(port_transport is None, 'Shared memory transport negotiation failed')
+
+        # Install the transport on the test connection as connectPort() would
+        self.port._transports['test_connection'] = port_transport
+        port_transport.setFailureListener(self.port._transportFailureListener('test_connection', port_transport))
+
+        # Stop the reader, so that the writer's next message fails
+        in_port._transports[port_transport.transportId].stop()
+
+        # The transport should fall back to CORBA, both for the failed message
+        # and afterwards, and be removed from the output port
+        stream_id = 'shm_reader_exit'
+        sri = bulkio.sri.create(stream_id)
+        port_transport.pushSRI(sri)
+        port_transport.pushPacket(self.helper.createData(16), bulkio.timestamp.now(), False, stream_id)
+        self.failIf('test_connection' in self.port._transports)
+        self.failUnless(port_transport._buffer is None)
+        port_transport.pushPacket(self.helper.createData(16), bulkio.timestamp.now(), True, stream_id)
+        for eos in (False, True):
+            packet = in_port.getPacket(1.0)
+            self.assertEqual(stream_id, packet.streamID)
+            self.assertEqual(16, len(packet.dataBuffer))
+            self.assertEqual(eos, packet.EOS)
+        port_transport.disconnect()
+
+    def testSharedMemoryTransportStopBlocked(self):
+        in_port = self._createInPort()
+        in_port.setMaxQueueDepth(1)
+        in_port.startPort()
+        objref = in_port._this()
+        port_transport = bulkio.transport.negotiateShmTransport(objref, objref, self.port.PortTransferType)
+        self.failIf(port_transport is None, 'Shared memory transport negotiation failed')
+        reader = in_port._transports[port_transport.transportId]
+
+        try:
+            # With a blocking stream, the reader thread blocks delivering the
+            # second packet until the first is read
+            stream_id = 'shm_stop_blocked'
+            sri = bulkio.sri.create(stream_id)
+            sri.blocking = True
+            port_transport.pushSRI(sri)
+            for index in xrange(2):
+                port_transport.pushPacket(self.helper.createData(16), bulkio.timestamp.now(), False, stream_id)
+            wait_until = time.time() + 1.0
+            while in_port.getCurrentQueueDepth() < 1 and time.time() < wait_until:
+                time.sleep(0.01)
+
+            # Stopping should not wait indefinitely for the blocked thread
+            start = time.time()
+            reader.stop(0.1)
+            self.failUnless((time.time() - start) < 0.5)
+
+            # Once the packet is delivered, the thread exits
+            self.failIf(in_port.getPacket(1.0) is None)
+            reader._thread.join(1.0)
+            self.failIf(reader._thread.isAlive(), 'Reader thread did not exit')
+        finally:
+            port_transport.disconnect()
+
     def testPushChunkingSubsizeComplex(self):
         # Set up a 2-dimensional complex stream
         stream_id = 'push_chunking_subsize_complex'
@@ -22,6 +22,9 @@
 import copy
 import unittest
 import math
+import time
+
+import numpy
 
 from omniORB import CORBA
 
@@ -375,6 +378,29 @@ class BufferedOutStreamTest(OutStreamTest):
         self.assertEqual(3, len(self.stub.packets))
         self.assertEqual(len(data), self.helper.packetLength(self.stub.packets[-1].data))
 
+    def testBufferedWriteSmall(self):
+        # Many small writes should be coalesced into buffer-sized packets
+        stream = self.port.createStream("test_buffered_write_small")
+        stream.xdelta = 0.125
+        stream.setBufferSize(64)
+
+        data = self.helper.createStreamData(10)
+        start = bulkio.timestamp.now()
+        for ii in xrange(20):
+            stream.write(data, start + ii * len(data) * stream.xdelta)
+        self.assertEqual(3, len(self.stub.packets))
+        for index, packet in enumerate(self.stub.packets):
+            self.assertEqual(64, self.helper.packetLength(packet.data))
+            # Each packet's time stamp should be the time of its first sample
+            expected = start + index * 64 * stream.xdelta
+            self.assertEqual(expected, packet.T, 'packet %d has incorrect time stamp' % index)
+
+        # The remainder should go out on flush
+        stream.flush()
+        self.assertEqual(4, len(self.stub.packets))
+        self.assertEqual(8, self.helper.packetLength(self.stub.packets[-1].data))
+        self.assertEqual(start + 192 * stream.xdelta, self.stub.packets[-1].T)
+
     def testWriteSkipBuffer(self):
         # Turn on buffering
         stream = self.port.createStream("test_skip_buffer")
@@ -524,6 +550,68 @@ class BufferedOutStreamTest(OutStreamTest):
         stream.setBufferSize(0)
         self.assertEqual(3, len(self.stub.packets), "Disabling buffering did not flush")
 
+    def _waitPackets(self, count, timeout=1.0):
+        end = time.time() + timeout
+        while len(self.stub.packets) < count and time.time() < end:
+            time.sleep(0.01)
+        return len(self.stub.packets)
+
+    def testFlushLatency(self):
+        stream = self.port.createStream("test_flush_latency")
+        self.assertEqual(0.0, stream.flushLatency())
+        self.assertRaises(ValueError, stream.setFlushLatency, -1.0)
+        stream.setBufferSize(1024)
+        stream.setFlushLatency(0.05)
+        self.assertEqual(0.05, stream.flushLatency())
+
+        # Queue data (should not flush right away)
+        data = self.helper.createStreamData(16)
+        stream.write(data, bulkio.timestamp.now())
+        stream.write(data, bulkio.timestamp.now())
+        self.assertEqual(0, len(self.stub.packets))
+
+        # Both writes should go out together once the latency expires
+        self.assertEqual(1, self._waitPackets(1), "Buffered data not flushed within latency")
+        self.assertEqual(32, self.helper.packetLength(self.stub.packets[-1].data))
+        self.assertEqual(False, self.stub.packets[-1].EOS)
+
+        # A second stream on the same port shares the port's timer
+        timer = self.port._flushTimer
+        stream2 = self.port.createStream("test_flush_latency_2")
+        stream2.setBufferSize(1024)
+        stream2.setFlushLatency(0.05)
+        stream2.write(data, bulkio.timestamp.now())
+        self.assertEqual(2, self._waitPackets(2), "Second stream not flushed within latency")
+        self.failUnless(self.port._flushTimer is timer)
+
+        # An explicit flush before the deadline should not cause a second,
+        # empty push when the deadline passes
+        stream.write(data, bulkio.timestamp.now())
+        stream.flush()
+        self.assertEqual(3, len(self.stub.packets))
+        time.sleep(0.1)
+        self.assertEqual(3, len(self.stub.packets))
+
+        # Lowering the latency below the age of buffered data flushes it
+        # immediately; disabling the latency leaves data in the buffer
+        stream.setFlushLatency(0.0)
+        stream.write(data, bulkio.timestamp.now())
+        time.sleep(0.1)
+        self.assertEqual(3, len(self.stub.packets))
+        stream.setFlushLatency(0.05)
+        self.assertEqual(4, len(self.stub.packets))
+
+        # Releasing the port flushes buffered data that is waiting for its
+        # deadline and stops the timer thread
+        stream.setFlushLatency(10.0)
+        stream.write(data, bulkio.timestamp.now())
+        self.assertEqual(4, len(self.stub.packets))
+        timer = self.port._flushTimer
+        self.port.releasePort()
+        self.assertEqual(5, len(self.stub.packets))
+        self.failIf(timer._thread.isAlive(), "Flush timer thread still running")
+        self.failUnless(self.port._flushTimer is None)
+
 class NumericOutStreamTest(BufferedOutStreamTest):
     def testWriteComplex(self):
         stream = self.port.createStream("test_write_complex")
@@ -556,6 +644,60 @@ class NumericOutStreamTest(BufferedOutStreamTest):
         self.assertEqual(100, len(self.stub.packets[-1].data))
         self.assertEqual(data, self.stub.packets[-1].data)
 
+    def testWriteComplexNumpy(self):
+        stream = self.port.createStream("test_write_complex_numpy")
+        stream.complex = True
+
+        # Write a numpy array of complex values, which should be sent as
+        # interleaved real values
+        data = numpy.arange(100) + 1j * numpy.arange(100, 0, -1)
+        stream.write(data, bulkio.timestamp.now())
+        self.assertEqual(1, len(self.stub.packets))
+        result = self.helper.unpack(self.stub.packets[-1].data)
+        self.assertEqual(200, len(result))
+        self.assertEqual(range(100), result[::2])
+        self.assertEqual(range(100, 0, -1), result[1::2])
+
+        # Real numpy arrays are treated as complex values with an imaginary
+        # component of 0
+        data = numpy.arange(100)
+        stream.write(data, bulkio.timestamp.now())
+        self.assertEqual(2, len(self.stub.packets))
+        result = self.helper.unpack(self.stub.packets[-1].data)
+        self.assertEqual(200, len(result))
+        self.assertEqual(range(100), result[::2])
+        self.assertEqual([0] * 100, result[1::2])
+
+
+class ByteOutStreamTest(NumericOutStreamTest):
+    def testWriteBinary(self):
+        stream = self.port.createStream("test_write_binary")
+        data = self.helper.pack(range(100))
+
+        # Binary buffer types should be sent unmodified
+        stream.write(bytearray(data), bulkio.timestamp.now())
+        self.assertEqual(1, len(self.stub.packets))
+        self.assertEqual(data, self.stub.packets[-1].data)
+
+        stream.write(memoryview(data), bulkio.timestamp.now())
+        self.assertEqual(2, len(self.stub.packets))
+        self.assertEqual(data, self.stub.packets[-1].data)
+
+        # Byte-sized numpy arrays are sent without conversion, even if the
+        # signedness does not match
+        stream.write(numpy.arange(100, dtype=numpy.int8), bulkio.timestamp.now())
+        self.assertEqual(3, len(self.stub.packets))
+        self.assertEqual(data, self.stub.packets[-1].data)
+
+        stream.write(numpy.arange(100, dtype=numpy.uint8), bulkio.timestamp.now())
+        self.assertEqual(4, len(self.stub.packets))
+        self.assertEqual(data, self.stub.packets[-1].data)
+
+        # Other numpy arrays are converted to the port's type
+        stream.write(numpy.arange(100, dtype=numpy.float64), bulkio.timestamp.now())
+        self.assertEqual(5, len(self.stub.packets))
+        self.assertEqual(data, self.stub.packets[-1].data)
+
 
 class OutXMLStreamTest(OutStreamTest, unittest.TestCase):
     helper = XMLTestHelper()
@@ -581,8 +723,8 @@ def register_test(name, testbase, **kwargs):
     globals()[name] = type(name, (testbase, unittest.TestCase), kwargs)
 
 register_test('OutFileStreamTest', OutStreamTest, helper=FileTestHelper())
-register_test('OutCharStreamTest', NumericOutStreamTest, helper=CharTestHelper())
-register_test('OutOctetStreamTest', NumericOutStreamTest, helper=OctetTestHelper())
+register_test('OutCharStreamTest', ByteOutStreamTest, helper=CharTestHelper())
+register_test('OutOctetStreamTest', ByteOutStreamTest, helper=OctetTestHelper())
 register_test('OutShortStreamTest', NumericOutStreamTest, helper=ShortTestHelper())
 register_test('OutUShortStreamTest', NumericOutStreamTest, helper=UShortTestHelper())
 register_test('OutLongStreamTest', NumericOutStreamTest, helper=LongTestHelper())
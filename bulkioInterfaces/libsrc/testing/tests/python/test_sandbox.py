@@ -23,6 +23,8 @@ import threading
 import time
 import unittest
 
+import numpy
+
 from omniORB import CORBA
 
 from ossie.utils.sandbox import LocalSandbox
@@ -227,6 +229,31 @@ class StreamSourceTest(unittest.TestCase):
         self.assertEqual(1, len(self.stub.packets))
         self.assertEqual(data, self.stub.packets[-1].data)
 
+    @format('float')
+    def testWriteNumpy(self):
+        # Limit the packet size so that the array has to be split, and use an
+        # odd number of scalars to check that packets contain whole frames
+        self.source.port.maxSamplesPerPush = 13
+        self.source.complex = True
+        self.source.subsize = 3
+        self.source.xdelta = 0.25
+
+        # Create 8 frames of 3 complex values where each alternating
+        # real/imaginary value forms a ramp
+        ramp = numpy.arange(48, dtype=numpy.float32)
+        data = ramp.view(numpy.complex64).reshape(8, 3)
+        ts = bulkio.timestamp.create(1000.0, 0.0)
+        self.source.write(data, ts)
+
+        # 13 scalars rounds down to 2 complex frames (12 scalars) per packet,
+        # with each packet's time advanced by 6 samples
+        self.assertEqual(4, len(self.stub.packets))
+        for index, packet in enumerate(self.stub.packets):
+            self.assertEqual(12, len(packet.data))
+            self.assertEqual(ts + index * 1.5, packet.T)
+        received = sum((p.data for p in self.stub.packets), [])
+        self.assertEqual(ramp.tolist(), received)
+
     @format('bit')
     def testWriteBit(self):
         # No timestamp
@@ -454,6 +481,22 @@ class StreamSinkTest(unittest.TestCase):
         self.assertEqual(data, sink_data.data)
         self.assertEqual((0, ts), sink_data.timestamps[0])
 
+    @format('float')
+    def testReadWakeup(self):
+        sri = bulkio.sri.create('test_read_wakeup')
+        self.port.pushSRI(sri)
+
+        # A blocking read should be woken up by data arriving, rather than
+        # waiting for the timeout; the bound is loose because a timed wait on
+        # a condition in Python 2 polls with up to 50ms of backoff
+        after(0.02, self.port.pushPacket, range(16), bulkio.timestamp.now(), False, sri.streamID)
+        start = time.time()
+        sink_data = self.sink.read(timeout=10.0)
+        elapsed = time.time() - start
+        self.failIf(sink_data is None)
+        self.assertEqual(range(16), sink_data.data)
+        self.failUnless(elapsed < 1.0, 'read took %.3fs' % elapsed)
+
     @format('float')
     def testReadComplex(self):
         # Push directly to the port
@@ -996,6 +1039,83 @@ class StreamSinkTest(unittest.TestCase):
         port = sink.getPort('floatIn')
         self.assertRaises(RuntimeError, sink.getPort, 'shortIn')
 
+    def testMemoryLimit(self):
+        # Limit the sink to 1KB (256 floats) in memory
+        sink = StreamSink(format='float', memoryLimit=1024, sandbox=self.sandbox)
+        port = sink.getPort('floatIn')
+
+        sri = bulkio.sri.create('test_memory_limit')
+        port.pushSRI(sri)
+        timestamps = []
+        for index in xrange(8):
+            ts = bulkio.timestamp.now()
+            timestamps.append((index*100, ts))
+            port.pushPacket(range(index*100, (index+1)*100), ts, index == 7, sri.streamID)
+
+        # Wait for the end-of-stream without consuming the data, then check
+        # that most of it was spilled to disk
+        container = sink._read(1.0, sri.streamID, lambda x: x.eos)
+        self.failIf(container is None)
+        self.failUnless(container.memory <= 1024)
+        self.assertEqual(600*4, container.spilledBytes())
+
+        # Reading should return all of the data, regardless of where it was
+        # stored
+        sink_data = sink.read(timeout=1.0, eos=True)
+        self.failIf(sink_data is None)
+        self.failUnless(sink_data.eos)
+        self.assertEqual(range(800), sink_data.data)
+        self.assertEqual(timestamps, sink_data.timestamps)
+
+    def testMemoryLimitLongLong(self):
+        # Limit the sink to 1KB (128 long longs) in memory, using values that
+        # do not fit in 32 bits
+        sink = StreamSink(format='longlong', memoryLimit=1024, sandbox=self.sandbox)
+        port = sink.getPort('longlongIn')
+
+        sri = bulkio.sri.create('test_memory_limit_longlong')
+        port.pushSRI(sri)
+        base = 1 << 40
+        for index in xrange(4):
+            data = range(base + index*100, base + (index+1)*100)
+            port.pushPacket(data, bulkio.timestamp.now(), index == 3, sri.streamID)
+
+        container = sink._read(1.0, sri.streamID, lambda x: x.eos)
+        self.failIf(container is None)
+        self.failUnless(container.memory <= 1024)
+        self.assertEqual(300*8, container.spilledBytes())
+
+        sink_data = sink.read(timeout=1.0, eos=True)
+        self.failIf(sink_data is None)
+        self.failUnless(sink_data.eos)
+        self.assertEqual(range(base, base + 400), sink_data.data)
+
+    @format('short')
+    def testIterBlocks(self):
+        # Nothing to read
+        self.assertEqual([], list(self.sink.iterblocks(timeout=0.0)))
+
+        sri = bulkio.sri.create('test_iter_blocks')
+        self.port.pushSRI(sri)
+        self.port.pushPacket(range(16), bulkio.timestamp.now(), False, sri.streamID)
+        self.port.pushPacket(range(16, 48), bulkio.timestamp.now(), False, sri.streamID)
+        after(0.1, self.port.pushPacket, range(48, 64), bulkio.timestamp.now(), True, sri.streamID)
+
+        # Each packet should be returned separately, waiting for the last one,
+        # with the end-of-stream on the final block
+        blocks = list(self.sink.iterblocks(timeout=1.0))
+        self.assertEqual(3, len(blocks))
+        self.assertEqual(range(16), blocks[0].data)
+        self.assertEqual(range(16, 48), blocks[1].data)
+        self.assertEqual(range(48, 64), blocks[2].data)
+        self.assertEqual([False, False, True], [block.eos for block in blocks])
+        for block in blocks:
+            self.assertEqual(sri.streamID, block.streamID)
+            self.assertEqual(1, len(block.timestamps))
+
+        # The stream is complete, so there should be nothing left to read
+        self.failUnless(self.sink.read(timeout=0.0) is None)
+
 
 if __name__ == '__main__':
     import runtests
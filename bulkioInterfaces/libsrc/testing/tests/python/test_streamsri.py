@@ -121,6 +121,33 @@ class StreamSRITest(unittest.TestCase):
         c_sri.keywords = [kv2]
         self.assertEqual( bulkio.sri.compare( a_sri, c_sri ), False, " bulkio.sri.compare method - different - keywords name mismatch  ")
 
+    def testFingerprint(self):
+        a_sri = bulkio.sri.create('fingerprint')
+        a_sri.keywords.append(CF.DataType('string', to_any('first')))
+        a_sri.keywords.append(CF.DataType('number', to_any(2.0)))
+        b_sri = bulkio.sri.create('fingerprint')
+        b_sri.keywords.append(CF.DataType('string', to_any('first')))
+        b_sri.keywords.append(CF.DataType('number', to_any(2.0)))
+        self.assertEqual(bulkio.sri.fingerprint(a_sri), bulkio.sri.fingerprint(b_sri))
+
+        # Fingerprints must differ whenever compare() reports a difference
+        for field, value in (('hversion', 2), ('xstart', 3.0), ('xdelta', 100.0),
+                             ('xunits', BULKIO.UNITS_FREQUENCY), ('subsize', 100),
+                             ('ystart', 3.0), ('ydelta', 100.0), ('yunits', BULKIO.UNITS_TIME),
+                             ('mode', 1), ('streamID', 'other'), ('blocking', True)):
+            c_sri = bulkio.sri.create('fingerprint')
+            c_sri.keywords = list(b_sri.keywords)
+            setattr(c_sri, field, value)
+            self.failIf(bulkio.sri.compare(a_sri, c_sri))
+            self.assertNotEqual(bulkio.sri.fingerprint(a_sri), bulkio.sri.fingerprint(c_sri), "fingerprint unchanged - %s" % field)
+
+        bulkio.sri.setKeyword(b_sri, 'number', 3.0)
+        self.assertNotEqual(bulkio.sri.fingerprint(a_sri), bulkio.sri.fingerprint(b_sri))
+        bulkio.sri.setKeyword(b_sri, 'number', 2.0)
+        self.assertEqual(bulkio.sri.fingerprint(a_sri), bulkio.sri.fingerprint(b_sri))
+        bulkio.sri.setKeyword(b_sri, 'new', 1)
+        self.assertNotEqual(bulkio.sri.fingerprint(a_sri), bulkio.sri.fingerprint(b_sri))
+
     def testHasKeyword(self):
         sri = bulkio.sri.create('has_keyword')
         sri.keywords.append(CF.DataType('string', to_any('first')))
@@ -202,6 +202,55 @@ class PrecisionUTCTimeTest(unittest.TestCase):
         self.assertEqual(t1 - reference, 8.875)
         self.assertEqual(reference - t1, -8.875)
 
+    def testAddOffsets(self):
+        # Each result must be identical to adding the offset individually,
+        # including offsets that are not exact binary fractions
+        reference = bulkio.timestamp.create(100.0, 0.5)
+        offsets = [0.0, 0.25, 1.75, -3.875, 1e-7 * 3, 12345.678901]
+        results = bulkio.timestamp.addOffsets(reference, offsets)
+        self.assertEqual(len(offsets), len(results))
+        for offset, result in zip(offsets, results):
+            expected = reference + offset
+            self.assertEqual(expected.twsec, result.twsec)
+            self.assertEqual(expected.tfsec, result.tfsec)
+            self.assertEqual(reference.tcmode, result.tcmode)
+            self.assertEqual(reference.tcstatus, result.tcstatus)
+
+        self.assertEqual([], bulkio.timestamp.addOffsets(reference, []))
+
+    def testUTCTime(self):
+        reference = bulkio.timestamp.create(100.0, 0.5, BULKIO.TCM_SDDS)
+        t1 = bulkio.timestamp.UTCTime.fromPrecisionUTCTime(reference)
+        self.assertEqual(100, t1.twsec)
+        self.assertEqual(0.5, t1.tfsec)
+        self.assertEqual(BULKIO.TCM_SDDS, t1.tcmode)
+
+        # Arithmetic must track PrecisionUTCTime exactly over many steps
+        expected = copy.copy(reference)
+        xdelta = 1.0 / 3e6
+        for ii in xrange(1000):
+            t1 += 1024 * xdelta
+            expected = expected + 1024 * xdelta
+        result = t1.toPrecisionUTCTime()
+        self.failUnless(isinstance(result, BULKIO.PrecisionUTCTime))
+        self.assertEqual(expected.twsec, result.twsec)
+        self.assertEqual(expected.tfsec, result.tfsec)
+        self.assertEqual(expected.tcmode, result.tcmode)
+
+        # Negative offsets borrow from the whole seconds
+        t1 -= 2.75
+        expected = expected - 2.75
+        self.assertEqual(expected.twsec, t1.twsec)
+        self.assertEqual(expected.tfsec, t1.tfsec)
+
+        # Non-modifying operators return a new object
+        t2 = t1 + 8.875
+        self.failIf(t2 is t1)
+        self.assertEqual(t2 - t1, 8.875)
+        self.assertEqual(t1 - t2.toPrecisionUTCTime(), -8.875)
+        self.failUnless(t1 < t2)
+        self.assertEqual(t1, t1.copy())
+
     def testString(self):
         # Test the default epoch (Unix time)
         tstamp = bulkio.timestamp.create(0.0, 0.0)
@@ -35,6 +35,29 @@ class SriListener(object):
         self.sri = None
 
 
+class AttachablePortStub(object):
+    def __init__(self, prefix):
+        self.prefix = prefix
+        self.attached = {}
+
+    def _is_a(self, repo_id):
+        return True
+
+    def _narrow(self, type_):
+        return self
+
+    def pushSRI(self, H, T):
+        pass
+
+    def attach(self, streamDef, userid):
+        attachId = '%s_%s' % (self.prefix, streamDef.id)
+        self.attached[attachId] = streamDef
+        return attachId
+
+    def detach(self, attachId):
+        del self.attached[attachId]
+
+
 class AttachableAPI(unittest.TestCase):
     def __init__( self, methodName='runTest' ):
         unittest.TestCase.__init__(self, methodName)
@@ -64,6 +87,53 @@ class AttachableAPI(unittest.TestCase):
         logger=logging.getLogger("test1")
         scon.setLogger(logger)
 
+    def test_attachment_tables(self):
+        port = bulkio.OutSDDSPort("dataSDDS_out")
+        stub1 = AttachablePortStub("conn1")
+        stub2 = AttachablePortStub("conn2")
+        port.connectPort(stub1, "connection_1")
+        port.connectPort(stub2, "connection_2")
+
+        # Each stream is attached to every connection
+        for streamid in ("stream1", "stream2", "stream3"):
+            port.addStream(self.getSddsStreamDef(streamid))
+        self.assertEqual(3, len(stub1.attached))
+        self.assertEqual(3, len(stub2.attached))
+        self.assertEqual(["conn1_stream2", "conn2_stream2"], sorted(port.attachmentIds("stream2")))
+        self.assertEqual([], port.attachmentIds("missing"))
+        self.assertEqual(6, len(port.attachmentIds()))
+        self.assertEqual(["stream2"], [sdef.id for sdef in port.getStreamDefinition("conn1_stream2")])
+
+        # Detach by attach ID only affects that attachment
+        port.detach(attachId="conn1_stream2")
+        self.failIf("conn1_stream2" in stub1.attached)
+        self.assertEqual(["conn2_stream2"], port.attachmentIds("stream2"))
+        self.assertEqual([], port.getStreamDefinition("conn1_stream2"))
+
+        # Detach by connection ID removes all of the connection's attachments
+        port.detach(connectionId="connection_2")
+        self.assertEqual({}, stub2.attached)
+        self.assertEqual(["conn1_stream1"], port.attachmentIds("stream1"))
+        self.assertEqual([], port.attachmentIds("stream2"))
+
+        # Reconnecting reattaches all streams to the new connection
+        port.disconnectPort("connection_2")
+        port.connectPort(stub2, "connection_2")
+        self.assertEqual(3, len(stub2.attached))
+
+        # Removing a stream detaches it from every connection
+        port.removeStream("stream3")
+        self.failIf("conn1_stream3" in stub1.attached)
+        self.failIf("conn2_stream3" in stub2.attached)
+        self.assertEqual(["stream1", "stream2"], sorted(sdef.id for sdef in port.attachedStreams()))
+
+        # A connection filter limits each stream to the listed connections
+        filter_table = [bulkio.connection_descriptor_struct("connection_1", "stream1", "dataSDDS_out"),
+                        bulkio.connection_descriptor_struct("connection_2", "stream2", "dataSDDS_out")]
+        port.updateConnectionFilter(filter_table)
+        self.assertEqual(["conn1_stream1"], port.attachmentIds("stream1"))
+        self.assertEqual(["conn2_stream2"], port.attachmentIds("stream2"))
+
 if __name__ == '__main__':
     suite = unittest.TestSuite()
     for x in [ AttachableAPI  ] :
@@ -22,6 +22,8 @@ import time
 import collections
 import struct
 
+import numpy
+
 from bulkio.bulkioInterfaces import BULKIO
 from redhawk.burstioInterfaces import BURSTIO__POA
 
@@ -42,6 +44,8 @@ class BurstPacket(object):
         self._data = burst.data
         self._blockOccurred = blockOccurred
         self._traits = traits
+        # Native-typed array of the data, converted on first use
+        self._array = None
 
     def getStreamID(self):
         return self._sri.streamID
@@ -50,13 +54,22 @@ class BurstPacket(object):
         return len(self._data)
 
     def getData(self):
-        return self._traits.toArray(self._data)
+        """
+        Returns the burst data as a native-typed numpy array.
+
+        The data is converted once and the same array is returned on every
+        call; it should be copied before modifying it. For byte types, the
+        array shares memory with the received data and is read-only.
+        """
+        if self._array is None:
+            self._array = self._traits.toArray(self._data)
+        return self._array
 
     def isComplex(self):
         return (self._sri.mode == 1)
 
     def getComplexData(self):
-        return self._traits.toComplexArray(self._data)
+        return self._traits.toComplexArray(self.getData())
 
     def getEOS(self):
         return self._eos
@@ -74,6 +87,55 @@ class BurstPacket(object):
         return self._data
 
 
+class PackedBursts(object):
+    """
+    A batch of bursts in structure-of-arrays form, as returned by
+    InPort.getPackedBursts().
+
+    The data of all bursts is concatenated into a single native-typed numpy
+    array, so that vectorized code can process many small bursts at once. The
+    data for burst i is getData()[offsets[i]:offsets[i+1]], where offsets is
+    the array returned by getOffsets().
+    """
+    def __init__(self, bursts, blockOccurred, traits):
+        self._sris = [burst.SRI for burst in bursts]
+        self._times = [burst.T for burst in bursts]
+        self._eos = numpy.fromiter((burst.EOS for burst in bursts), dtype=bool, count=len(bursts))
+        self._data, self._offsets = traits.toPackedArray([burst.data for burst in bursts])
+        self._blockOccurred = blockOccurred
+        self._traits = traits
+
+    def __len__(self):
+        return len(self._sris)
+
+    def getData(self):
+        return self._data
+
+    def getOffsets(self):
+        return self._offsets
+
+    def getSizes(self):
+        return numpy.diff(self._offsets)
+
+    def getBurstData(self, index):
+        return self._data[self._offsets[index]:self._offsets[index+1]]
+
+    def getStreamIDs(self):
+        return [sri.streamID for sri in self._sris]
+
+    def getSRIs(self):
+        return self._sris
+
+    def getTimes(self):
+        return self._times
+
+    def getEOS(self):
+        return self._eos
+
+    def blockOccurred(self):
+        return self._blockOccurred
+
+
 class InPort(object):
     DEFAULT_QUEUE_THRESHOLD = 100
 
@@ -234,6 +296,29 @@ class InPort(object):
             self._queueLock.release()
         return bursts
 
+    def getPackedBursts(self, timeout=-1.0):
+        """
+        Removes all queued bursts and returns them as a PackedBursts object,
+        with their data concatenated into a single numpy array.
+
+        Returns None if no bursts are available within `timeout`.
+        """
+        self._queueLock.acquire()
+        try:
+            if not self._waitBurst(timeout):
+                return None
+            bursts = self._queue
+            self._queue = collections.deque()
+            for burst in bursts:
+                if burst.EOS:
+                    self._streamIDs.discard(burst.SRI.streamID)
+            block_occurred = self._blockOccurred
+            self._blockOccurred = False
+            self._queueNotFull.notifyAll()
+        finally:
+            self._queueLock.release()
+        return PackedBursts(bursts, block_occurred, self._traits)
+
     def blockOccurred(self):
         self._queueLock.acquire()
         try:
@@ -214,7 +214,8 @@ class OutPort(UsesPort, BULKIO__POA.UsesPortStatisticsProvider):
 
         # Default to all connections receiving all streams interleaved
         self._routingMode = ROUTE_ALL_INTERLEAVED
-        self._routes = {}
+        # Set of (streamID, connectionID) routes
+        self._routes = set()
 
     def start(self):
         self._monitor.start()
@@ -266,13 +267,11 @@ class OutPort(UsesPort, BULKIO__POA.UsesPortStatisticsProvider):
         self._portLog = logger
 
     def updateConnectionFilter(self, filterTable):
-        new_routes = {}
+        new_routes = set()
         for route in filterTable:
             if route.port_name != self._name:
                 continue
-            if not route.stream_id in self._routes:
-                new_routes[route.stream_id] = set()
-            new_routes[route.stream_id].add(route.connection_id)
+            new_routes.add((route.stream_id, route.connection_id))
 
         self._connectionMutex.acquire()
         try:
@@ -283,17 +282,14 @@ class OutPort(UsesPort, BULKIO__POA.UsesPortStatisticsProvider):
     def addConnectionFilter(self, streamID, connectionID):
         self._connectionMutex.acquire()
         try:
-            if not streamID in self._routes:
-                self._routes[streamID] = set()
-            self._routes[streamID].add(connectionID)
+            self._routes.add((streamID, connectionID))
         finally:
             self._connectionMutex.release()
 
     def removeConnectionFilter(self, streamID, connectionID):
         self._connectionMutex.acquire()
         try:
-            if streamID in self._routes:
-                self._routes[streamID].discard(connectionID)
+            self._routes.discard((streamID, connectionID))
         finally:
             self._connectionMutex.release()
 
@@ -461,7 +457,7 @@ class OutPort(UsesPort, BULKIO__POA.UsesPortStatisticsProvider):
     def _isStreamRoutedToConnection(self, streamID, connectionID):
         if ROUTE_CONNECTION_STREAMS != self._routingMode:
             return True
-        return connectionID in self._routes.get(streamID, set())
+        return (streamID, connectionID) in self._routes
 
 
 class BurstByteOut(OutPort):
@@ -17,6 +17,8 @@
 # You should have received a copy of the GNU Lesser General Public License
 # along with this program.  If not, see http://www.gnu.org/licenses/.
 #
+import itertools
+
 import numpy
 
 from redhawk.burstioInterfaces import BURSTIO
@@ -41,8 +43,35 @@ class Traits(object):
     def toArray(self, data):
         """
         Returns the CORBA-formatted input data as a native-typed numpy array.
+
+        If `data` is already a numpy array of the native type, it is returned
+        as-is.
+        """
+        if isinstance(data, numpy.ndarray):
+            return numpy.asarray(data, dtype=self.NativeType)
+        # Sequences arrive as lists, which fromiter converts in a single pass
+        # without inspecting the element types first
+        return numpy.fromiter(data, dtype=self.NativeType, count=len(data))
+
+    def toPackedArray(self, sequences):
         """
-        return numpy.array(data, dtype=self.NativeType)
+        Concatenates a list of CORBA-formatted sequences into a single
+        native-typed numpy array.
+
+        Returns a tuple of the array and the offsets of each sequence within
+        it. The offsets array has one more element than `sequences`, so that
+        sequence i occupies [offsets[i], offsets[i+1]).
+        """
+        offsets = numpy.zeros(len(sequences)+1, dtype=numpy.intp)
+        sizes = numpy.fromiter((len(data) for data in sequences), dtype=numpy.intp, count=len(sequences))
+        numpy.cumsum(sizes, out=offsets[1:])
+        return self._concatenate(sequences, offsets[-1]), offsets
+
+    def _concatenate(self, sequences, total):
+        if sequences and isinstance(sequences[0], numpy.ndarray):
+            return numpy.asarray(numpy.concatenate(sequences), dtype=self.NativeType)
+        values = itertools.chain.from_iterable(sequences)
+        return numpy.fromiter(values, dtype=self.NativeType, count=total)
 
     def toComplexArray(self, data):
         """
@@ -60,11 +89,20 @@ class CharTraits(Traits):
     Traits class for types that serialize as string data in CORBA.
     """
     def toArray(self, data):
-        return numpy.fromstring(data, dtype=self.NativeType)
+        # The string is used as the array's buffer, without copying; as a
+        # result, the returned array is read-only
+        if isinstance(data, numpy.ndarray):
+            return numpy.asarray(data, dtype=self.NativeType)
+        return numpy.frombuffer(data, dtype=self.NativeType)
 
     # Clone the parent toArray docstring
     toArray.__doc__ = Traits.toArray.__doc__
 
+    def _concatenate(self, sequences, total):
+        if sequences and isinstance(sequences[0], numpy.ndarray):
+            return Traits._concatenate(self, sequences, total)
+        return numpy.frombuffer(''.join(sequences), dtype=self.NativeType)
+
 class FPTraits(Traits):
     """
     Traits class for floating point types, which support native complex types.
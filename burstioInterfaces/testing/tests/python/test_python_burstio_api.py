@@ -314,6 +314,39 @@ class BaseVectorPort(unittest.TestCase):
         self.assertEqual(bursts, [],"getBursts Failed - should be empty list")
 
 
+    def test_packed_bursts(self):
+        bio = self.bio_in_module("xxx")
+        bio.start()
+
+        packed = bio.getPackedBursts( self.NON_BLOCKING )
+        self.assertEqual(packed,None,"getPackedBursts Failed - should be None")
+
+        bursts = []
+        for ii in xrange(3):
+            sri = self.make_sri_test( "packed-%d" % ii, "id-1" )
+            bursts.append( self.burst_type( sri, self.seq, utils.now(), ii == 2 ) )
+        bio.pushBursts( bursts )
+
+        packed = bio.getPackedBursts( self.NON_BLOCKING )
+        self.assertNotEqual(packed,None,"getPackedBursts Failed - should NOT be None")
+        self.assertEqual(len(packed),3,"getPackedBursts Failed - burst count mismatch")
+        self.assertEqual(bio.getQueueDepth(),0,"getPackedBursts Failed - queue should be empty")
+        self.assertEqual(packed.getOffsets().tolist(),[0,50,100,150],"Packed offsets mismatch")
+        self.assertEqual(packed.getEOS().tolist(),[False,False,True],"Packed EOS mismatch")
+        self.assertEqual(packed.getStreamIDs(),["packed-0","packed-1","packed-2"],"Packed stream IDs mismatch")
+
+        # Each burst's slice of the packed data must match the individually
+        # converted data
+        expected = bio._traits.toArray(self.seq)
+        for ii in xrange(3):
+            self.assertTrue(numpy.array_equal(packed.getBurstData(ii), expected),"Packed data mismatch")
+
+        # Converted packet data is cached
+        bio.pushBursts( bursts[:1] )
+        pkt = bio.getBurst( self.NON_BLOCKING )
+        self.assertTrue(pkt.getData() is pkt.getData(),"BurstPacket data not cached")
+        self.assertTrue(numpy.array_equal(pkt.getData(), expected),"BurstPacket data mismatch")
+
     def test_outport_api(self):
 
         bio = self.bio_out_module("xxx")
@@ -424,9 +457,17 @@ class BaseVectorPort(unittest.TestCase):
         desc_list.append( connection_descriptor_struct( port_name=pname, connection_id="connection_3", stream_id="stream-3-1" ) )
         desc_list.append( connection_descriptor_struct( port_name=pname, connection_id="connection_3", stream_id="stream-3-2" ) )
         desc_list.append( connection_descriptor_struct( port_name=pname, connection_id="connection_4", stream_id="stream-4-1" ) )
+        desc_list.append( connection_descriptor_struct( port_name=pname, connection_id="connection_2", stream_id="stream-1-1" ) )
 
         bio.updateConnectionFilter( desc_list );
 
+        # A stream may be routed to more than one connection
+        bio.setRoutingMode( ROUTE_CONNECTION_STREAMS );
+        self.assertTrue( bio._isStreamRoutedToConnection( "stream-1-1", "connection_1") );
+        self.assertTrue( bio._isStreamRoutedToConnection( "stream-1-1", "connection_2") );
+        self.assertFalse( bio._isStreamRoutedToConnection( "stream-1-1", "connection_3") );
+        self.assertFalse( bio._isStreamRoutedToConnection( "stream-4-1", "connection_1") );
+
         bio.addConnectionFilter( "stream-4-2", "connection-4");
         bio.addConnectionFilter( "stream-4-3", "connection-4");
 
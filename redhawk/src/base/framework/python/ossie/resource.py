@@ -453,6 +453,11 @@ class Resource(object):
     def releaseObject(self):
         self._resourceLog.trace("releaseObject()")
         self.stopPropertyChangeMonitor()
+        # Check all ports for a releasePort() method, and call it if one exists
+        for portdef in self.__ports.itervalues():
+            port = portdef.__get__(self)
+            if hasattr(port, 'releasePort'):
+                port.releasePort()
         # disable logging that uses EventChannels
         ossie.logger.SetEventChannelManager(None)
         # release all event channels
@@ -512,6 +517,15 @@ class Resource(object):
             if isinstance(attr, _port):
                 self.__ports[attr.name] = attr
 
+    def __refreshPortLogLevels(self):
+        # Ports may cache the enabled state of their loggers to keep logging
+        # out of their data paths; check all ports for a refreshLogLevel()
+        # method, and call it if one exists
+        for portdef in self.__ports.itervalues():
+            port = portdef.__get__(self)
+            if hasattr(port, 'refreshLogLevel'):
+                port.refreshLogLevel()
+
     #########################################
     #  Common resource logging API
 
@@ -606,6 +620,9 @@ class Resource(object):
         # assign an event channel manager to the logging library
         ossie.logger.SetEventChannelManager( self._ecm )
 
+        # ports may have been given new loggers since construction
+        self.__refreshPortLogLevels()
+
         if not self._origLevelSet:
             self._origLevelSet = True;
             self._origLogCfgURL = logcfg_url;
@@ -646,6 +663,7 @@ class Resource(object):
             self._logLevel = newLogLevel
             self.logLevel = ossie.logger.ConvertToLog4Level( newLogLevel )
             self._baseLog.setLevel(self.logLevel)
+            self.__refreshPortLogLevels()
 
     def setLogLevel(self, logid, newLogLevel ):
 
@@ -662,6 +680,7 @@ class Resource(object):
             if logid == self._logid:
                 self._logLevel = newLogLevel
                 self.logLevel = ossie.logger.ConvertToLog4Level( newLogLevel )
+            self.__refreshPortLogLevels()
 
     def getLogLevel(self, logid ):
         if not self._baseLog.isLoggerInHierarchy(logid):
@@ -682,6 +701,7 @@ class Resource(object):
                 ossie.logger.SetLogLevel(_b_id, -1)
                 _b_id = logging.getLogger(_b_id).parent.name
         self.setLoggingContext(self._origLogCfgURL, self._origLogLevel, self._origCtx)
+        self.__refreshPortLogLevels()
 
     def getLogConfig(self):
         return self.logConfig
@@ -697,6 +717,7 @@ class Resource(object):
             if tcfg:
                 self.logConfig = tcfg
                 lvl=self._get_log_level()
+                self.__refreshPortLogLevels()
         else:
             pass
 
@@ -25,6 +25,7 @@ import array
 import threading
 import bulkio_helpers
 import time
+import tempfile
 import logging
 from new import classobj
 from ossie.utils.redhawk.base import attach
@@ -37,6 +38,21 @@ from ossie.utils import _uuid
 logging.basicConfig()
 log = logging.getLogger(__name__)
 
+# Element types used to store ArraySink data that exceeds its memory limit,
+# keyed by port type name; char and octet data is received as strings
+_SPILL_TYPECODES = {
+    'dataChar': 'c',
+    'dataOctet': 'c',
+    'dataShort': 'h',
+    'dataUshort': 'H',
+    'dataLong': 'i',
+    'dataUlong': 'I',
+    'dataLongLong': 'q',
+    'dataUlongLong': 'Q',
+    'dataFloat': 'f',
+    'dataDouble': 'd',
+}
+
 class ArraySource(object):
     """
     Simple class used to push data into a port from a given array of data.
@@ -202,7 +218,7 @@ class ArraySink(object):
     Simple class used to receive data from a port and store it in a python
     array.
     """
-    def __init__(self, porttype):
+    def __init__(self, porttype, memoryLimit=None, spillDirectory=None):
         """
         Instantiates a new object responsible for writing data from the port
         into an array.
@@ -215,6 +231,12 @@ class ArraySink(object):
 
         Inputs:
             <porttype>        The BULKIO__POA data type
+            <memoryLimit>     Maximum number of bytes of data to hold in
+                              memory; packets received beyond the limit are
+                              stored in a temporary file until retrieved. If
+                              None (the default), there is no limit.
+            <spillDirectory>  Directory for the temporary file (default is
+                              the system temporary directory)
         """
         self.port_type = porttype
         self.sri=bulkio_helpers.defaultSRI
@@ -224,6 +246,14 @@ class ArraySink(object):
         self.breakBlock = False
         self.port_lock = threading.Lock()
         self.port_cond = threading.Condition(self.port_lock)
+        self._memoryLimit = memoryLimit
+        self._spillDirectory = spillDirectory
+        self._typecode = _SPILL_TYPECODES.get(getattr(porttype, '__name__', None), None)
+        if self._typecode:
+            self._itemsize = struct.calcsize('='+self._typecode)
+        self._spillFile = None
+        self._spillOffset = 0
+        self._spilledCount = 0
     
     class estimateStruct():
         len_data=0
@@ -235,6 +265,54 @@ class ArraySink(object):
     def _isActive(self):
         return not self.gotEOS and not self.breakBlock
 
+    def _length(self):
+        # Total number of elements received, in memory or spilled
+        return len(self.data) + self._spilledCount
+
+    def _shouldSpill(self, data):
+        if self._memoryLimit is None or not self._typecode:
+            return False
+        # Once anything has been spilled, all subsequent data must be too, to
+        # preserve ordering
+        if self._spilledCount:
+            return True
+        return (len(self.data) + len(data)) * self._itemsize > self._memoryLimit
+
+    def _spill(self, data):
+        if self._spillFile is None:
+            self._spillFile = tempfile.TemporaryFile(prefix='arraysink-', dir=self._spillDirectory)
+            self._spillOffset = 0
+        self._spillFile.seek(0, os.SEEK_END)
+        self._spillFile.write(struct.pack('=%d%s' % (len(data), self._typecode), *data))
+        self._spilledCount += len(data)
+
+    def _unspill(self, count):
+        # Moves up to count of the oldest spilled elements back into memory
+        count = min(count, self._spilledCount)
+        if count <= 0:
+            return
+        size = count * self._itemsize
+        self._spillFile.seek(self._spillOffset)
+        self.data.extend(struct.unpack('=%d%s' % (count, self._typecode), self._spillFile.read(size)))
+        self._spillOffset += size
+        self._spilledCount -= count
+        if not self._spilledCount:
+            self._spillFile.close()
+            self._spillFile = None
+
+    def _refill(self):
+        # After data has been consumed, brings spilled data back into memory
+        # as the limit allows
+        if self._spilledCount:
+            self._unspill(self._memoryLimit / self._itemsize - len(self.data))
+
+    def _popFirst(self):
+        if not self.data:
+            self._unspill(1)
+        value = self.data.pop(0)
+        self._refill()
+        return value
+
     def reset(self):
         if not self._isActive():
             self.gotEOS = False
@@ -286,8 +364,11 @@ class ArraySink(object):
         try:
             self.gotEOS = EOS
             if len(data) != 0:
-                self.timestamps.append([len(self.data), ts])
-            self.data += data
+                self.timestamps.append([self._length(), ts])
+            if self._shouldSpill(data):
+                self._spill(data)
+            else:
+                self.data += data
             self.port_cond.notifyAll()
         finally:
             self.port_cond.release()
@@ -297,6 +378,7 @@ class ArraySink(object):
         estimate = self.estimateStruct()
         try:
             estimate = self.estimateStruct(self.data, self.timestamps)
+            estimate.len_data = self._length()
         finally:
             self.port_cond.release()
         return estimate
@@ -306,10 +388,10 @@ class ArraySink(object):
         try:
             if length is None:
                 # No length specified; get all of the data.
-                length = len(self.data)
+                length = self._length()
                 
             # have not received any data yet (and I need a minimum amount)
-            if self.sri == None and len(self.data) == 0 and length != 0:
+            if self.sri == None and self._length() == 0 and length != 0:
                 self.port_cond.wait()
             
             if self.sri != None and self.sri.subsize != 0:
@@ -319,10 +401,13 @@ class ArraySink(object):
                     return (None,None)
 
             # Wait for there to be enough data.
-            while len(self.data) < length and self._isActive():
+            while self._length() < length and self._isActive():
                 self.port_cond.wait()
 
-            if len(self.data) > length:
+            # Bring any spilled data that is being returned back into memory
+            self._unspill(length - len(self.data))
+
+            if self._length() > length:
                 # More data is available than was requested. Return only
                 # as much data as was asked for, and the associated
                 # timestamps.
@@ -345,6 +430,7 @@ class ArraySink(object):
                     for idx in range(length/frameLength):
                         retval.append(self.data[idx*frameLength:(idx+1)*frameLength])
                 del self.data[:length]
+                self._refill()
                 return (retval, rettime)
 
             # No length was provided, or length is equal to the length of data.
@@ -405,10 +491,10 @@ class ArraySink(object):
         if timeout == -1:
             self.port_lock.acquire()
             try:
-                while not self.data:
+                while not self._length():
                     self.port_lock.wait(3)
                 else:
-                    return self.data.pop(0)
+                    return self._popFirst()
             finally:
                 self.port_lock.release()
             raise NoDataException()
@@ -416,13 +502,13 @@ class ArraySink(object):
         until = time.time() + timeout
         self.port_lock.acquire()
         try:
-            while not self.data:
+            while not self._length():
                 remain = until - time.time()
                 if remain <= 0:
                     break
                 self.port_lock.wait(remain)
             else:
-                return self.data.pop(0)
+                return self._popFirst()
         finally:
             self.port_lock.release()
         raise NoDataException()
@@ -1773,13 +1773,19 @@ class DataSink(_SinkBase):
     """
       To use a different sink (for custom data processing), assign the new class to sinkClass
       To use a different sink for XML data, assign the new class to sinkXmlClass
+      To bound the memory used by received data, set memoryLimit to a number of
+        bytes; data beyond the limit is stored in a temporary file in
+        spillDirectory until it is retrieved
     """
-    def __init__(self, sinkClass=bulkio_data_helpers.ArraySink, sinkXmlClass=bulkio_data_helpers.XmlArraySink):
+    def __init__(self, sinkClass=bulkio_data_helpers.ArraySink, sinkXmlClass=bulkio_data_helpers.XmlArraySink,
+                 memoryLimit=None, spillDirectory=None):
         warnings.warn("DataSink is deprecated, use StreamSink instead", DeprecationWarning)
         fmts=['char','short','long','float','double','longlong','octet','ushort', 'ulong', 'ulonglong', 'file','xml' ]
         _SinkBase.__init__(self, formats=fmts)
         self.sinkClass = sinkClass
         self.sinkXmlClass = sinkXmlClass
+        self._memoryLimit = memoryLimit
+        self._spillDirectory = spillDirectory
 
     def getPort(self, portName):
         if _domainless._DEBUG == True:
@@ -1790,6 +1796,9 @@ class DataSink(_SinkBase):
             # Set up output array sink
             if str(portName) == "xmlIn":
                 self._sink = self.sinkXmlClass(eval(self._sinkPortType))
+            elif self._memoryLimit is not None:
+                self._sink = self.sinkClass(eval(self._sinkPortType), memoryLimit=self._memoryLimit,
+                                            spillDirectory=self._spillDirectory)
             else:
                 self._sink = self.sinkClass(eval(self._sinkPortType))
 
@@ -2153,6 +2153,29 @@ class BulkioTest(unittest.TestCase):
         self.assertEquals(_tstamps[2][1].twsec, _tstamps[2][0]*sink.sri().xdelta+_startTime)
         self.assertEquals(_tstamps[3][1].twsec, _tstamps[3][0]*sink.sri().xdelta+_startTime)
 
+    def test_DataSinkMemoryLimit(self):
+        """
+        Verify that DataSink stores data beyond its memory limit on disk, and
+        returns it all when retrieved
+        """
+        with warnings.catch_warnings():
+            warnings.filterwarnings('ignore', 'DataSink is deprecated, use StreamSink instead')
+            warnings.filterwarnings('ignore', 'DataSource is deprecated, use StreamSource')
+            source = sb.DataSource(bytesPerPush=1024)
+            sink = sb.DataSink(memoryLimit=4096)
+        source.connect(sink, usesPortName='floatOut')
+        sb.start()
+
+        source.push(range(4096), EOS=True)
+        sink._sink.waitEOS()
+        estimate = sink.getDataEstimate()
+        self.assertEquals(estimate.len_data, 4096)
+        self.assertTrue(len(sink._sink.data) * 4 <= 4096)
+
+        data, tstamps = sink.getData(tstamps=True)
+        self.assertEquals(data, range(4096))
+        self.assertEquals([offset for offset, ts in tstamps], range(0, 4096, 256))
+
     def test_DataSourceSampleRateInt(self):
         """
         Verify that DataSource handles integer values for sampleRate when
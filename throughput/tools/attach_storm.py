@@ -0,0 +1,132 @@
+#!/usr/bin/python
+#
+# This file is protected by Copyright. Please refer to the COPYRIGHT file
+# distributed with this source distribution.
+#
+# This file is part of REDHAWK throughput.
+#
+# REDHAWK throughput is free software: you can redistribute it and/or modify it under
+# the terms of the GNU Lesser General Public License as published by the Free
+# Software Foundation, either version 3 of the License, or (at your option) any
+# later version.
+#
+# REDHAWK throughput is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE.  See the GNU Lesser General Public License for more
+# details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this program.  If not, see http://www.gnu.org/licenses/.
+"""
+Stress benchmark for attachment bookkeeping in the Python SDDS output port.
+
+Connects an SDDS output port to a number of in-process stub input ports (no
+CORBA transport), then measures the time to attach a number of streams to all
+connections, to look up every attachment by ID, and to tear the attachments
+down again by connection and by stream. This models the "attach storm" that
+follows a restart of a component with many multicast streams. The attach and
+detach rate of an SDDS input port is measured as well.
+
+Usage: attach_storm.py [-s streams] [-c connections]
+"""
+import sys
+import time
+import getopt
+import itertools
+
+import bulkio
+from bulkio.bulkioInterfaces import BULKIO
+
+class NullAttachablePort(object):
+    """
+    Minimal stand-in for a connected SDDS input port that accepts every
+    attach request.
+    """
+    _ids = itertools.count()
+
+    def _is_a(self, repo_id):
+        return True
+
+    def _narrow(self, type_):
+        return self
+
+    def pushSRI(self, H, T):
+        pass
+
+    def attach(self, streamDef, userid):
+        return 'attach_%d' % self._ids.next()
+
+    def detach(self, attachId):
+        pass
+
+def create_stream(streamId):
+    return BULKIO.SDDSStreamDefinition(id=streamId,
+                                       dataFormat=BULKIO.SDDS_SB,
+                                       multicastAddress='0.0.0.0',
+                                       vlan=0,
+                                       port=0,
+                                       sampleRate=0,
+                                       timeTagValid=False,
+                                       privateInfo='')
+
+def timed(func, *args):
+    start = time.time()
+    func(*args)
+    return time.time() - start
+
+def attach_streams(port, streams):
+    for stream in streams:
+        port.addStream(stream)
+
+def lookup_attachments(port, streams):
+    for stream in streams:
+        for attachId in port.attachmentIds(stream.id):
+            port.getStreamDefinition(attachId)
+
+def detach_connections(port, connections):
+    for connectionId in connections:
+        port.detach(connectionId=connectionId)
+
+def remove_streams(port, streams):
+    for stream in streams:
+        port.removeStream(stream.id)
+
+def attach_detach_input(port, streams):
+    ids = [port.attach(stream, '') for stream in streams]
+    for attachId in ids:
+        port.detach(attachId)
+
+if __name__ == '__main__':
+    streams = 500
+    connections = 20
+
+    opts, args = getopt.getopt(sys.argv[1:], 's:c:')
+    for key, value in opts:
+        if key == '-s':
+            streams = int(value)
+        elif key == '-c':
+            connections = int(value)
+
+    port = bulkio.OutSDDSPort('dataSDDS_out')
+    connection_ids = ['connection_%d' % index for index in xrange(connections)]
+    for connection_id in connection_ids:
+        port.connectPort(NullAttachablePort(), connection_id)
+    stream_defs = [create_stream('stream_%d' % index) for index in xrange(streams)]
+    attachments = streams * connections
+
+    elapsed = timed(attach_streams, port, stream_defs)
+    print 'Attach:  %.0f attachments/sec' % (attachments / elapsed)
+    elapsed = timed(lookup_attachments, port, stream_defs)
+    print 'Lookup:  %.0f attachments/sec' % (attachments / elapsed)
+
+    # Detach half of the connections one at a time, then remove the streams
+    # along with their remaining attachments
+    half = connection_ids[:connections/2]
+    elapsed = timed(detach_connections, port, half)
+    print 'Detach (by connection): %.0f attachments/sec' % (streams * len(half) / elapsed)
+    elapsed = timed(remove_streams, port, stream_defs)
+    print 'Remove (by stream): %.0f streams/sec' % (streams / elapsed)
+
+    port = bulkio.InSDDSPort('dataSDDS_in')
+    elapsed = timed(attach_detach_input, port, stream_defs)
+    print 'Input attach/detach: %.0f streams/sec' % (streams / elapsed)
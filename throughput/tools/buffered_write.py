@@ -0,0 +1,77 @@
+#!/usr/bin/python
+#
+# This file is protected by Copyright. Please refer to the COPYRIGHT file
+# distributed with this source distribution.
+#
+# This file is part of REDHAWK throughput.
+#
+# REDHAWK throughput is free software: you can redistribute it and/or modify it under
+# the terms of the GNU Lesser General Public License as published by the Free
+# Software Foundation, either version 3 of the License, or (at your option) any
+# later version.
+#
+# REDHAWK throughput is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE.  See the GNU Lesser General Public License for more
+# details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this program.  If not, see http://www.gnu.org/licenses/.
+#
+"""
+Microbenchmark for small writes to a buffered Python BulkIO output stream.
+
+Measures the sample rate of many small writes to an output stream with
+buffering enabled, where the cost is dominated by coalescing the writes into
+buffer-sized packets. The output port has no connections, so the push itself
+is nearly free.
+
+Usage: buffered_write.py [-n writes] [-s samples] [-b buffer size] [-t type]
+
+Types: float (default), octet, bit
+"""
+import sys
+import time
+import getopt
+
+import bulkio
+
+PORTS = {
+    'float': (bulkio.OutFloatPort, lambda n: [0.0]*n),
+    'octet': (bulkio.OutOctetPort, lambda n: '\x00'*n),
+    'bit':   (bulkio.OutBitPort, lambda n: bulkio.bitbuffer(bits=n)),
+}
+
+def measure(port_type, data, writes, buffer_size):
+    port = port_type('buffered_out')
+    stream = port.createStream('buffered_write')
+    stream.setBufferSize(buffer_size)
+    stream.xdelta = 0.125
+    T = bulkio.timestamp.now()
+
+    start = time.time()
+    for ii in xrange(writes):
+        stream.write(data, T)
+    stream.flush()
+    return time.time() - start
+
+if __name__ == '__main__':
+    writes = 100000
+    samples = 16
+    buffer_size = 16384
+    type_name = 'float'
+
+    opts, args = getopt.getopt(sys.argv[1:], 'n:s:b:t:')
+    for key, value in opts:
+        if key == '-n':
+            writes = int(value)
+        elif key == '-s':
+            samples = int(value)
+        elif key == '-b':
+            buffer_size = int(value)
+        elif key == '-t':
+            type_name = value
+
+    port_type, create = PORTS[type_name]
+    elapsed = measure(port_type, create(samples), writes, buffer_size)
+    print '%s: %.0f writes/sec, %.1f Msamples/sec' % (type_name, writes / elapsed, writes * samples / elapsed / 1e6)
@@ -0,0 +1,101 @@
+#!/usr/bin/python
+#
+# This file is protected by Copyright. Please refer to the COPYRIGHT file
+# distributed with this source distribution.
+#
+# This file is part of REDHAWK throughput.
+#
+# REDHAWK throughput is free software: you can redistribute it and/or modify it under
+# the terms of the GNU Lesser General Public License as published by the Free
+# Software Foundation, either version 3 of the License, or (at your option) any
+# later version.
+#
+# REDHAWK throughput is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE.  See the GNU Lesser General Public License for more
+# details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this program.  If not, see http://www.gnu.org/licenses/.
+#
+"""
+Microbenchmark for the Python BulkIO input port packet queue.
+
+Pushes small packets directly into an input port's servant (no CORBA
+transport) from one or more producer threads while a consumer thread reads
+them with getPacket(), and reports the packet rate. With --serial, all of the
+packets are pushed first and then drained from the same thread, which measures
+the queue overhead without any thread contention.
+
+Usage: bulkio_inport_queue.py [-n packets] [-s samples] [-p producers] [--serial]
+"""
+import sys
+import time
+import getopt
+import threading
+
+import bulkio
+from bulkio.bulkioInterfaces import BULKIO
+
+def run_serial(port, packets, data, sri):
+    T = bulkio.timestamp.now()
+    streamID = sri.streamID
+    start = time.time()
+    for ii in xrange(packets):
+        port.pushPacket(data, T, False, streamID)
+    for ii in xrange(packets):
+        port.getPacket()
+    return time.time() - start
+
+def run_threaded(port, packets, data, sri, producers):
+    T = bulkio.timestamp.now()
+    streamID = sri.streamID
+    per_producer = packets / producers
+
+    def produce():
+        for ii in xrange(per_producer):
+            port.pushPacket(data, T, False, streamID)
+
+    threads = [threading.Thread(target=produce) for ii in xrange(producers)]
+    start = time.time()
+    for thread in threads:
+        thread.start()
+    for ii in xrange(per_producer * producers):
+        port.getPacket(bulkio.const.BLOCKING)
+    elapsed = time.time() - start
+    for thread in threads:
+        thread.join()
+    return elapsed
+
+if __name__ == '__main__':
+    packets = 200000
+    samples = 16
+    producers = 1
+    serial = False
+
+    opts, args = getopt.getopt(sys.argv[1:], 'n:s:p:', ['serial'])
+    for key, value in opts:
+        if key == '-n':
+            packets = int(value)
+        elif key == '-s':
+            samples = int(value)
+        elif key == '-p':
+            producers = int(value)
+        elif key == '--serial':
+            serial = True
+
+    port = bulkio.InFloatPort('dataFloat_in')
+    port.setMaxQueueDepth(-1)
+    sri = bulkio.sri.create('inport_queue')
+    port.pushSRI(sri)
+    data = [0.0] * samples
+
+    if serial:
+        elapsed = run_serial(port, packets, data, sri)
+    else:
+        elapsed = run_threaded(port, packets, data, sri, producers)
+        packets = (packets / producers) * producers
+
+    print 'Packets:', packets
+    print 'Elapsed:', elapsed, 'sec'
+    print 'Rate:', packets / elapsed, 'packets/sec'
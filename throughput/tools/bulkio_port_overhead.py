@@ -0,0 +1,89 @@
+#!/usr/bin/python
+#
+# This file is protected by Copyright. Please refer to the COPYRIGHT file
+# distributed with this source distribution.
+#
+# This file is part of REDHAWK throughput.
+#
+# REDHAWK throughput is free software: you can redistribute it and/or modify it under
+# the terms of the GNU Lesser General Public License as published by the Free
+# Software Foundation, either version 3 of the License, or (at your option) any
+# later version.
+#
+# REDHAWK throughput is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE.  See the GNU Lesser General Public License for more
+# details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this program.  If not, see http://www.gnu.org/licenses/.
+#
+"""
+Microbenchmark for the fixed per-packet cost of the Python BulkIO ports.
+
+Measures the packet rate of tiny packets through an input port (pushPacket
+followed by getPacket) and through an output port with no connections, where
+the work done is almost entirely per-packet bookkeeping such as logging.
+With -k, an SRI with the given number of keywords is re-pushed, unchanged,
+before every packet, as some components do.
+
+Usage: bulkio_port_overhead.py [-n packets] [-s samples] [-k keywords]
+"""
+import sys
+import time
+import getopt
+
+import bulkio
+
+def create_sri(keywords):
+    sri = bulkio.sri.create('port_overhead')
+    for index in xrange(keywords):
+        bulkio.sri.setKeyword(sri, 'keyword_%d' % index, float(index))
+    return sri
+
+def measure_inport(packets, data, keywords):
+    port = bulkio.InFloatPort('dataFloat_in')
+    port.setMaxQueueDepth(-1)
+    sri = create_sri(keywords)
+    port.pushSRI(sri)
+    T = bulkio.timestamp.now()
+
+    start = time.time()
+    for ii in xrange(packets):
+        if keywords:
+            port.pushSRI(sri)
+        port.pushPacket(data, T, False, sri.streamID)
+        port.getPacket()
+    return time.time() - start
+
+def measure_outport(packets, data, keywords):
+    port = bulkio.OutFloatPort('dataFloat_out')
+    sri = create_sri(keywords)
+    port.pushSRI(sri)
+    T = bulkio.timestamp.now()
+
+    start = time.time()
+    for ii in xrange(packets):
+        if keywords:
+            port.pushSRI(sri)
+        port.pushPacket(data, T, False, sri.streamID)
+    return time.time() - start
+
+if __name__ == '__main__':
+    packets = 200000
+    samples = 16
+    keywords = 0
+
+    opts, args = getopt.getopt(sys.argv[1:], 'n:s:k:')
+    for key, value in opts:
+        if key == '-n':
+            packets = int(value)
+        elif key == '-s':
+            samples = int(value)
+        elif key == '-k':
+            keywords = int(value)
+
+    data = [0.0] * samples
+    for name, func in (('InPort', measure_inport), ('OutPort', measure_outport)):
+        elapsed = func(packets, data, keywords)
+        print '%s: %.0f packets/sec' % (name, packets / elapsed)
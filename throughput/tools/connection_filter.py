@@ -0,0 +1,120 @@
+#!/usr/bin/python
+#
+# This file is protected by Copyright. Please refer to the COPYRIGHT file
+# distributed with this source distribution.
+#
+# This file is part of REDHAWK throughput.
+#
+# REDHAWK throughput is free software: you can redistribute it and/or modify it under
+# the terms of the GNU Lesser General Public License as published by the Free
+# Software Foundation, either version 3 of the License, or (at your option) any
+# later version.
+#
+# REDHAWK throughput is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE.  See the GNU Lesser General Public License for more
+# details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this program.  If not, see http://www.gnu.org/licenses/.
+#
+"""
+Microbenchmark for connection filter (multi-out) routing in the Python BulkIO
+and BurstIO output ports.
+
+Builds a connection filter that routes each of a number of streams to one of a
+number of connections, then measures the packet rate through a BulkIO output
+port connected to in-process stubs (no CORBA transport), where the dominant
+cost is deciding which connections receive each packet. With --burstio, the
+routing check of a BurstIO output port is measured as well.
+
+Usage: connection_filter.py [-n rounds] [-s streams] [-c connections] [--burstio]
+"""
+import sys
+import time
+import getopt
+
+import bulkio
+from bulkio.bulkioInterfaces import BULKIO
+
+class NullPort(object):
+    """
+    Minimal stand-in for a connected input port that discards everything.
+    """
+    def _is_a(self, repo_id):
+        return True
+
+    def _narrow(self, type_):
+        return self
+
+    def pushSRI(self, H):
+        pass
+
+    def pushPacket(self, data, T, EOS, streamID):
+        pass
+
+def create_filter(port_name, streams, connections):
+    # Route each stream to a single connection, round-robin
+    table = []
+    for index in xrange(streams):
+        stream_id = 'stream_%d' % index
+        connection_id = 'connection_%d' % (index % connections)
+        table.append(bulkio.connection_descriptor_struct(connection_id, stream_id, port_name))
+    return table
+
+def measure_bulkio(rounds, streams, connections):
+    port = bulkio.OutFloatPort('dataFloat_out')
+    for index in xrange(connections):
+        port.connectPort(NullPort(), 'connection_%d' % index)
+    port.updateConnectionFilter(create_filter(port.name, streams, connections))
+
+    stream_ids = ['stream_%d' % index for index in xrange(streams)]
+    for stream_id in stream_ids:
+        port.pushSRI(bulkio.sri.create(stream_id))
+
+    data = [0.0] * 16
+    T = bulkio.timestamp.now()
+    start = time.time()
+    for ii in xrange(rounds):
+        for stream_id in stream_ids:
+            port.pushPacket(data, T, False, stream_id)
+    return time.time() - start
+
+def measure_burstio(rounds, streams, connections):
+    from redhawk import burstio
+    port = burstio.BurstFloatOut('burstFloat_out')
+    port.setRoutingMode(burstio.ROUTE_CONNECTION_STREAMS)
+    port.updateConnectionFilter(create_filter('burstFloat_out', streams, connections))
+
+    stream_ids = ['stream_%d' % index for index in xrange(streams)]
+    connection_ids = ['connection_%d' % index for index in xrange(connections)]
+    start = time.time()
+    for ii in xrange(rounds):
+        for stream_id in stream_ids:
+            for connection_id in connection_ids:
+                port._isStreamRoutedToConnection(stream_id, connection_id)
+    return time.time() - start
+
+if __name__ == '__main__':
+    rounds = 10
+    streams = 500
+    connections = 20
+    burstio = False
+
+    opts, args = getopt.getopt(sys.argv[1:], 'n:s:c:', ['burstio'])
+    for key, value in opts:
+        if key == '-n':
+            rounds = int(value)
+        elif key == '-s':
+            streams = int(value)
+        elif key == '-c':
+            connections = int(value)
+        elif key == '--burstio':
+            burstio = True
+
+    packets = rounds * streams
+    elapsed = measure_bulkio(rounds, streams, connections)
+    print 'BulkIO: %.0f packets/sec' % (packets / elapsed)
+    if burstio:
+        elapsed = measure_burstio(rounds, streams, connections)
+        print 'BurstIO: %.0f routing checks/sec' % (packets * connections / elapsed)
@@ -0,0 +1,92 @@
+#!/usr/bin/python
+#
+# This file is protected by Copyright. Please refer to the COPYRIGHT file
+# distributed with this source distribution.
+#
+# This file is part of REDHAWK throughput.
+#
+# REDHAWK throughput is free software: you can redistribute it and/or modify it under
+# the terms of the GNU Lesser General Public License as published by the Free
+# Software Foundation, either version 3 of the License, or (at your option) any
+# later version.
+#
+# REDHAWK throughput is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE.  See the GNU Lesser General Public License for more
+# details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this program.  If not, see http://www.gnu.org/licenses/.
+#
+"""
+Microbenchmark for the port statistics of the Python BulkIO ports.
+
+Measures the rate of statistics updates for an input port (InStats) and for
+a single output port connection (OutStats), as done once per packet, and the
+time to retrieve the statistics. With -w, the history window is resized; with
+-S, only every Nth update is recorded.
+
+Usage: port_statistics.py [-n updates] [-s streams] [-w window] [-S sampling]
+"""
+import sys
+import time
+import getopt
+
+from bulkio.statistics import InStats, OutStats
+
+def configure(stats, window, sampling):
+    if window:
+        stats.setHistoryWindow(window)
+    if sampling:
+        stats.setSampling(sampling)
+
+def measure_instats(updates, stream_ids, window, sampling):
+    stats = InStats('dataFloat_in', bits=32)
+    configure(stats, window, sampling)
+    streams = len(stream_ids)
+    start = time.time()
+    for ii in xrange(updates):
+        stats.update(1024, 0.5, False, stream_ids[ii % streams])
+    elapsed = time.time() - start
+
+    retrieve_start = time.time()
+    for ii in xrange(1000):
+        stats.retrieve()
+    return elapsed, (time.time() - retrieve_start) / 1000
+
+def measure_outstats(updates, stream_ids, window, sampling):
+    stats = OutStats('dataFloat_out', bits=32)
+    configure(stats, window, sampling)
+    stats.add('connection_1')
+    streams = len(stream_ids)
+    start = time.time()
+    for ii in xrange(updates):
+        stats.update(1024, ii % 8, False, stream_ids[ii % streams], 'connection_1', latency=1e-4)
+    elapsed = time.time() - start
+
+    retrieve_start = time.time()
+    for ii in xrange(1000):
+        stats.retrieve()
+    return elapsed, (time.time() - retrieve_start) / 1000
+
+if __name__ == '__main__':
+    updates = 200000
+    streams = 100
+    window = 0
+    sampling = 0
+
+    opts, args = getopt.getopt(sys.argv[1:], 'n:s:w:S:')
+    for key, value in opts:
+        if key == '-n':
+            updates = int(value)
+        elif key == '-s':
+            streams = int(value)
+        elif key == '-w':
+            window = int(value)
+        elif key == '-S':
+            sampling = int(value)
+
+    stream_ids = ['stream_%d' % index for index in xrange(streams)]
+    for name, func in (('InStats', measure_instats), ('OutStats', measure_outstats)):
+        elapsed, retrieve = func(updates, stream_ids, window, sampling)
+        print '%s: %.0f updates/sec, retrieve %.1f usec' % (name, updates / elapsed, retrieve * 1e6)
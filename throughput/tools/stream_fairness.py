@@ -0,0 +1,144 @@
+#!/usr/bin/python
+#
+# This file is protected by Copyright. Please refer to the COPYRIGHT file
+# distributed with this source distribution.
+#
+# This file is part of REDHAWK throughput.
+#
+# REDHAWK throughput is free software: you can redistribute it and/or modify it under
+# the terms of the GNU Lesser General Public License as published by the Free
+# Software Foundation, either version 3 of the License, or (at your option) any
+# later version.
+#
+# REDHAWK throughput is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE.  See the GNU Lesser General Public License for more
+# details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this program.  If not, see http://www.gnu.org/licenses/.
+#
+"""
+Benchmark for multi-stream fairness and throughput in the Python BulkIO input
+port packet queue.
+
+In each round, one stream sends a burst of packets while a number of other
+streams each send a steady trickle, with packets pushed directly into the
+port's servant (no CORBA transport). The benchmark reports:
+
+  loss      : the fraction of the steady streams' packets lost to queue
+              flushes caused by the burst, with the default port-wide queue
+              depth and, if supported, an equal per-stream depth
+  wait      : the mean number of getCurrentStream() turns before a steady
+              stream's packet is read, with FIFO and, if supported,
+              round-robin scheduling
+  throughput: the packet rate when each stream is drained in turn via its
+              own input stream, steady streams first, so that most reads
+              are for packets behind the burst in the queue
+
+Usage: stream_fairness.py [-r rounds] [-s streams] [-b burst] [-d depth]
+"""
+import sys
+import time
+import getopt
+
+import bulkio
+
+def push_burst(port, data, T, burst):
+    for ii in xrange(burst):
+        port.pushPacket(data, T, False, 'burst')
+
+def push_steady(port, data, T, streams, count):
+    for ii in xrange(count):
+        for stream_id in streams:
+            port.pushPacket(data, T, False, stream_id)
+
+def create_port(streams, depth):
+    port = bulkio.InFloatPort('dataFloat_in')
+    port.setMaxQueueDepth(depth)
+    for stream_id in ['burst'] + streams:
+        port.pushSRI(bulkio.sri.create(stream_id))
+    return port
+
+def measure_loss(rounds, streams, burst, depth, per_stream):
+    port = create_port(streams, depth)
+    if per_stream:
+        port.setMaxStreamQueueDepth(depth)
+    data = [0.0] * 16
+    T = bulkio.timestamp.now()
+    received = 0
+    for ii in xrange(rounds):
+        # The burst arrives while the steady streams' packets are queued
+        push_steady(port, data, T, streams, 1)
+        push_burst(port, data, T, burst)
+        for packet in port.getPackets():
+            if packet.streamID != 'burst':
+                received += 1
+    return 1.0 - float(received) / (rounds * len(streams))
+
+def measure_wait(rounds, streams, burst, round_robin):
+    port = create_port(streams, -1)
+    if round_robin:
+        port.setStreamScheduling(bulkio.const.SCHEDULE_ROUND_ROBIN)
+    data = [0.0] * 16
+    T = bulkio.timestamp.now()
+    total_wait = 0
+    count = 0
+    for ii in xrange(rounds):
+        push_burst(port, data, T, burst)
+        push_steady(port, data, T, streams, 1)
+        turn = 0
+        while True:
+            stream = port.getCurrentStream(bulkio.const.NON_BLOCKING)
+            if not stream:
+                break
+            stream.read()
+            turn += 1
+            if stream.streamID != 'burst':
+                total_wait += turn
+                count += 1
+    return float(total_wait) / count
+
+def measure_throughput(rounds, streams, burst):
+    port = create_port(streams, -1)
+    data = [0.0] * 16
+    T = bulkio.timestamp.now()
+    input_streams = [port.getStream(stream_id) for stream_id in streams + ['burst']]
+    packets = 0
+    start = time.time()
+    for ii in xrange(rounds):
+        push_burst(port, data, T, burst)
+        push_steady(port, data, T, streams, 10)
+        packets += burst + 10 * len(streams)
+        for stream in input_streams:
+            while stream.tryread():
+                pass
+    return packets / (time.time() - start)
+
+if __name__ == '__main__':
+    rounds = 20
+    streams = 20
+    burst = 500
+    depth = 100
+
+    opts, args = getopt.getopt(sys.argv[1:], 'r:s:b:d:')
+    for key, value in opts:
+        if key == '-r':
+            rounds = int(value)
+        elif key == '-s':
+            streams = int(value)
+        elif key == '-b':
+            burst = int(value)
+        elif key == '-d':
+            depth = int(value)
+
+    stream_ids = ['steady_%d' % index for index in xrange(streams)]
+    supported = hasattr(bulkio.InFloatPort, 'setStreamScheduling')
+
+    print 'Steady stream loss (port-wide depth): %.1f%%' % (100.0 * measure_loss(rounds, stream_ids, burst, depth, False))
+    if supported:
+        print 'Steady stream loss (per-stream depth): %.1f%%' % (100.0 * measure_loss(rounds, stream_ids, burst, depth, True))
+    print 'Steady stream wait (FIFO): %.1f turns' % measure_wait(rounds, stream_ids, burst, False)
+    if supported:
+        print 'Steady stream wait (round-robin): %.1f turns' % measure_wait(rounds, stream_ids, burst, True)
+    print 'Per-stream drain: %.0f packets/sec' % measure_throughput(rounds, stream_ids, burst)
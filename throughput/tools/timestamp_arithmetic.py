@@ -0,0 +1,121 @@
+#!/usr/bin/python
+#
+# This file is protected by Copyright. Please refer to the COPYRIGHT file
+# distributed with this source distribution.
+#
+# This file is part of REDHAWK throughput.
+#
+# REDHAWK throughput is free software: you can redistribute it and/or modify it under
+# the terms of the GNU Lesser General Public License as published by the Free
+# Software Foundation, either version 3 of the License, or (at your option) any
+# later version.
+#
+# REDHAWK throughput is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE.  See the GNU Lesser General Public License for more
+# details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this program.  If not, see http://www.gnu.org/licenses/.
+#
+"""
+Microbenchmark for time stamp arithmetic in the Python BulkIO library.
+
+Measures the rate of adding offsets to a BULKIO.PrecisionUTCTime, both one at
+a time and, where supported, with the vectorized bulkio.timestamp.addOffsets()
+and in-place bulkio.timestamp.UTCTime. Also measures the sub-packet rate of an
+output port that splits large packets, connected to an in-process stub (no
+CORBA transport), where a new time stamp is computed for every sub-packet.
+
+Usage: timestamp_arithmetic.py [-n count] [-s samples]
+"""
+import sys
+import time
+import getopt
+
+import bulkio
+from bulkio.bulkioInterfaces import BULKIO
+
+class NullPort(object):
+    """
+    Minimal stand-in for a connected input port that discards everything.
+    """
+    def _is_a(self, repo_id):
+        return True
+
+    def _narrow(self, type_):
+        return self
+
+    def pushSRI(self, H):
+        pass
+
+    def pushPacket(self, data, T, EOS, streamID):
+        pass
+
+def measure_add(count):
+    T = bulkio.timestamp.now()
+    start = time.time()
+    for ii in xrange(count):
+        T = T + 0.001
+    return time.time() - start
+
+def measure_sample_offset(count):
+    T = bulkio.timestamp.now()
+    start = time.time()
+    for ii in xrange(count):
+        bulkio.timestamp.addSampleOffset(T, ii, 0.001)
+    return time.time() - start
+
+def measure_add_offsets(count):
+    T = bulkio.timestamp.now()
+    offsets = [ii * 0.001 for ii in xrange(count)]
+    start = time.time()
+    bulkio.timestamp.addOffsets(T, offsets)
+    return time.time() - start
+
+def measure_utctime(count):
+    T = bulkio.timestamp.UTCTime.fromPrecisionUTCTime(bulkio.timestamp.now())
+    start = time.time()
+    for ii in xrange(count):
+        T += 0.001
+    return time.time() - start
+
+def measure_split(count, samples):
+    port = bulkio.OutFloatPort('dataFloat_out')
+    port.connectPort(NullPort(), 'connection_1')
+    port.maxSamplesPerPush = samples
+    sri = bulkio.sri.create('timestamp_arithmetic')
+    sri.xdelta = 1.0 / 3e6
+    port.pushSRI(sri)
+
+    # Push in packets of 1000 sub-packets
+    packets = max(count / 1000, 1)
+    data = [0.0] * (samples * 1000)
+    T = bulkio.timestamp.now()
+    start = time.time()
+    for ii in xrange(packets):
+        port.pushPacket(data, T, False, sri.streamID)
+    return time.time() - start, packets * 1000
+
+if __name__ == '__main__':
+    count = 200000
+    samples = 16
+
+    opts, args = getopt.getopt(sys.argv[1:], 'n:s:')
+    for key, value in opts:
+        if key == '-n':
+            count = int(value)
+        elif key == '-s':
+            samples = int(value)
+
+    tests = [('add', measure_add), ('addSampleOffset', measure_sample_offset)]
+    if hasattr(bulkio.timestamp, 'addOffsets'):
+        tests.append(('addOffsets', measure_add_offsets))
+    if hasattr(bulkio.timestamp, 'UTCTime'):
+        tests.append(('UTCTime', measure_utctime))
+    for name, func in tests:
+        elapsed = func(count)
+        print '%s: %.0f timestamps/sec' % (name, count / elapsed)
+
+    elapsed, pushes = measure_split(count, samples)
+    print 'OutPort split: %.0f sub-packets/sec' % (pushes / elapsed)